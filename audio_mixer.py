@@ -0,0 +1,157 @@
+"""
+Audio Mixer - Aynı kanaldaki join seslerini tek bir akışta eşzamanlı çalar
+Aktif sesler PCM'e çözülür, clipping korumalı toplanır; Opus encode voice client'ta frame başına bir kez yapılır
+"""
+
+import array
+import asyncio
+import threading
+from typing import List, Optional
+
+import discord
+from discord.opus import Decoder
+
+from logger_setup import get_logger
+
+try:
+    import audioop  # Python 3.13'te kaldırıldı (audioop-lts ile geri gelir)
+except ImportError:
+    audioop = None
+
+log = get_logger('bot.mixer')
+
+# 20ms 48kHz stereo 16-bit PCM frame boyutu
+FRAME_SIZE = Decoder.FRAME_SIZE
+_SILENCE = b'\x00' * FRAME_SIZE
+
+
+def mix_frames(a: bytes, b: bytes) -> bytes:
+    """İki PCM frame'i topla, taşan örnekleri int16 sınırında kes"""
+    if audioop is not None:
+        return audioop.add(a, b, 2)
+
+    left = array.array('h', a)
+    right = array.array('h', b)
+    return array.array('h', (
+        max(-32768, min(32767, x + y)) for x, y in zip(left, right)
+    )).tobytes()
+
+
+class _Voice:
+    """Mixer'daki tek bir ses; Opus kaynakları kendi decoder'ı ile PCM'e çözülür"""
+
+    def __init__(self, source: discord.AudioSource):
+        self.source = source
+        self.decoder: Optional[Decoder] = Decoder() if source.is_opus() else None
+
+    def read_pcm(self) -> bytes:
+        data = self.source.read()
+        if not data:
+            return b''
+        if self.decoder is not None:
+            data = self.decoder.decode(data, fec=False)
+        if len(data) < FRAME_SIZE:
+            data = data + _SILENCE[len(data):]
+        return data
+
+
+class MixingAudioSource(discord.AudioSource):
+    """
+    Birden fazla sesi gerçek zamanlı karıştıran PCM audio source.
+    Çalarken yeni ses eklenebilir; aktif ses kalmayınca kapanır ve b'' döner.
+    read() player thread'inde, add() event loop'ta çağrılır.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_voices: int = 4):
+        self.max_voices = max_voices
+
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._voices: List[_Voice] = []
+        self._closed = False
+
+        # Slot boşaldığında / mixer kapandığında event loop'u uyandırır
+        self._changed = asyncio.Event()
+
+        # Player bu mixer'ı bıraktığında set edilir (VoicePool tarafından)
+        self.finished = asyncio.Event()
+
+        # İstatistikler
+        self.voices_mixed = 0
+        self.peak_voices = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def active_voices(self) -> int:
+        return len(self._voices)
+
+    def add(self, source: discord.AudioSource) -> bool:
+        """
+        Sesi canlı karışıma ekle.
+        Returns: Mixer kapalı veya dolu ise False
+        """
+        voice = _Voice(source)
+        with self._lock:
+            if self._closed or len(self._voices) >= self.max_voices:
+                return False
+            self._voices.append(voice)
+            self.voices_mixed += 1
+            self.peak_voices = max(self.peak_voices, len(self._voices))
+        return True
+
+    async def wait_for_slot(self):
+        """Mixer'da yer açılana veya mixer kapanana kadar bekle"""
+        while not self._closed and len(self._voices) >= self.max_voices:
+            self._changed.clear()
+            await self._changed.wait()
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._changed.set)
+        except RuntimeError:
+            # Event loop kapanmış (shutdown)
+            pass
+
+    def read(self) -> bytes:
+        with self._lock:
+            mixed: Optional[bytes] = None
+            finished: List[_Voice] = []
+
+            for voice in self._voices:
+                try:
+                    pcm = voice.read_pcm()
+                except Exception as e:
+                    log.error(f"Mixer ses okuma hatası: {e}")
+                    pcm = b''
+
+                if not pcm:
+                    finished.append(voice)
+                    continue
+                mixed = pcm if mixed is None else mix_frames(mixed, pcm)
+
+            for voice in finished:
+                self._voices.remove(voice)
+
+            if mixed is None:
+                self._closed = True
+
+        for voice in finished:
+            voice.source.cleanup()
+        if finished or mixed is None:
+            self._notify()
+
+        return mixed or b''
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self):
+        with self._lock:
+            self._closed = True
+            voices, self._voices = self._voices, []
+        for voice in voices:
+            voice.source.cleanup()
+        self._notify()
@@ -0,0 +1,372 @@
+"""
+Ingest hattı benchmark'ı
+SUPPORTED_AUDIO_FORMATS'taki her format için farklı süre ve bitrate'lerde sentetik
+(pembe gürültü) girişler üretilir ve iki yol ölçülür:
+    trim       - ingest.trim_file: yerel dosyadan kırpma + webm/opus dönüşümü
+    attachment - ingest.run_job('attachment'): /dosyaekle yolunun Discord'suz hali;
+                 dosyalar yerel HTTP sunucusundan CDN gibi indirilir (pipe veya MP4 ara dosya)
+İşler ingest kuyruğu gibi spawn'lı ProcessPoolExecutor'da, farklı eşzamanlılık
+seviyelerinde çalışır. Her iş için duvar süresi, CPU süresi (FFmpeg dahil), çıktı ve
+paket dosyası boyutu; her format grubu için throughput ve tepe FFmpeg RSS raporlanır.
+Her (çıktı bitrate'i, eşzamanlılık, format) grubu ayrı havuzda çalışır, böylece
+tepe RSS o gruba aittir (worker'lar ölçümden önce ısıtılır).
+
+Kullanım:
+    python benchmarks/bench_ingest.py [--modes trim,attachment] [--concurrency 1,2,4]
+        [--lengths 10,60,180] [--bitrates 64k,192k] [--formats .mp3,.wav]
+        [--opus-bitrates 64k,96k] [--repeat 2] [--corpus dizin] [--faststart]
+        [--json sonuc.json]
+"""
+
+import argparse
+import functools
+import http.server
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Worker süreçleri bu modülü tekrar import eder: log dosyası oluşmasın
+from logger_setup import setup_logging  # noqa: E402
+setup_logging(log_file=os.devnull, log_level='ERROR')
+
+import ingest  # noqa: E402
+from config import BOT_CONFIG, SUPPORTED_AUDIO_FORMATS, get_ffmpeg_path  # noqa: E402
+from ingest import IngestError  # noqa: E402
+from packet_file import sidecar_path  # noqa: E402
+from stats_registry import percentile  # noqa: E402
+
+# Format -> (FFmpeg encoder, bitrate verilebilir mi); kayıpsızlarda bitrate sabittir
+FORMAT_CODECS = {
+    '.mp3': ('libmp3lame', True),
+    '.webm': ('libopus', True),
+    '.mp4': ('aac', True),
+    '.m4a': ('aac', True),
+    '.wav': ('pcm_s16le', False),
+    '.flac': ('flac', False),
+    '.ogg': ('libvorbis', True),
+    '.aac': ('aac', True),
+    '.wma': ('wmav2', True),
+}
+
+# Discord eklerine benzer giriş: 44.1kHz stereo
+SOURCE_ARGS = ('-f', 'lavfi', '-i', 'anoisesrc=color=pink:amplitude=0.25:sample_rate=44100:seed=7')
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _kb(rss: int) -> float:
+    # ru_maxrss Linux'ta KB, macOS'ta byte
+    return rss / 1024 if sys.platform == 'darwin' else float(rss)
+
+
+# ---- Sentetik giriş üretimi ----
+
+def corpus_name(ext: str, seconds: int, bitrate: Optional[str]) -> str:
+    suffix = f'_{bitrate}' if bitrate else ''
+    return f'noise_{seconds}s{suffix}{ext}'
+
+
+def build_corpus(
+    ffmpeg_path: str,
+    directory: str,
+    formats: List[str],
+    lengths: List[int],
+    bitrates: List[str],
+    faststart: bool,
+) -> List[dict]:
+    """Eksik giriş dosyalarını üret (var olanlar tekrar kullanılır)"""
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for ext in formats:
+        codec, has_bitrate = FORMAT_CODECS[ext]
+        for seconds in lengths:
+            for bitrate in (bitrates if has_bitrate else [None]):
+                path = os.path.join(directory, corpus_name(ext, seconds, bitrate))
+                if not os.path.exists(path):
+                    args = [ffmpeg_path, '-y', '-v', 'error', *SOURCE_ARGS, '-t', str(seconds),
+                            '-ac', '2', '-c:a', codec]
+                    if bitrate:
+                        args += ['-b:a', bitrate]
+                    if faststart and ext in ('.mp4', '.m4a'):
+                        args += ['-movflags', '+faststart']
+                    subprocess.run(args + [path], check=True, stdin=subprocess.DEVNULL)
+                corpus.append({
+                    'format': ext,
+                    'seconds': seconds,
+                    'bitrate': bitrate,
+                    'path': path,
+                    'input_bytes': os.path.getsize(path),
+                })
+    return corpus
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _FileServer(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Klip bitince FFmpeg bağlantıyı keser (beklenen durum)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_file_server(directory: str) -> http.server.ThreadingHTTPServer:
+    """Girişleri Discord CDN'i yerine sunan yerel HTTP sunucusu"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = _FileServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---- Worker süreci ----
+
+def _init_worker(opus_bitrate: str):
+    """Çıktı bitrate'ini değiştir (encoder ayarı karşılaştırması için)"""
+    args = list(ingest._ENCODE_ARGS)
+    args[args.index('-b:a') + 1] = opus_bitrate
+    ingest._ENCODE_ARGS = tuple(args)
+
+
+def _warmup(seconds: float) -> int:
+    # Havuzun tüm worker'larını başlatıp import maliyetini ölçümden çıkar
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _bench_job(
+    mode: str,
+    source: str,
+    filename: str,
+    start: float,
+    duration: float,
+    output_dir: str,
+    ffmpeg_path: str,
+    max_bytes: int,
+) -> dict:
+    output_path = os.path.join(output_dir, f'{os.getpid()}_{time.monotonic_ns()}.webm')
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.perf_counter()
+
+    result = {'ok': True, 'error': None, 'timings': {}}
+    try:
+        if mode == 'trim':
+            ingest.trim_file(ffmpeg_path, source, output_path, start, duration)
+        else:
+            _, result['timings'] = ingest.run_job(
+                'attachment', source, filename, start, duration, output_path, ffmpeg_path, max_bytes,
+            )
+    except IngestError as e:
+        result.update(ok=False, error=str(e)[:200])
+
+    wall = time.perf_counter() - started
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    result.update(
+        wall_s=wall,
+        # Python tarafı (HTTP okuma, pipe'a yazma, paket dosyası) + FFmpeg
+        cpu_s=(self_after.ru_utime - self_before.ru_utime + self_after.ru_stime - self_before.ru_stime),
+        ffmpeg_cpu_s=(children_after.ru_utime - children_before.ru_utime
+                      + children_after.ru_stime - children_before.ru_stime),
+        # Bu worker'ın şimdiye kadarki en büyük FFmpeg süreci
+        ffmpeg_rss_kb=_kb(children_after.ru_maxrss),
+        worker_rss_kb=_kb(self_after.ru_maxrss),
+        output_bytes=0,
+        sidecar_bytes=0,
+    )
+    result['cpu_s'] += result['ffmpeg_cpu_s']
+
+    for key, path in (('output_bytes', output_path), ('sidecar_bytes', sidecar_path(output_path))):
+        if os.path.exists(path):
+            result[key] = os.path.getsize(path)
+            os.remove(path)
+    return result
+
+
+# ---- Çalıştırma ----
+
+def run_group(
+    mode: str,
+    concurrency: int,
+    opus_bitrate: str,
+    items: List[dict],
+    args: argparse.Namespace,
+    base_url: str,
+    output_dir: str,
+    ffmpeg_path: str,
+) -> dict:
+    """Tek (mod, eşzamanlılık, çıktı bitrate'i, format) grubunu yeni bir havuzda çalıştır"""
+    pool = ProcessPoolExecutor(
+        max_workers=concurrency,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(opus_bitrate,),
+    )
+    try:
+        list(pool.map(_warmup, [0.2] * concurrency))
+
+        jobs = []
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for item in items:
+                filename = os.path.basename(item['path'])
+                source = item['path'] if mode == 'trim' else base_url + filename
+                future = pool.submit(
+                    _bench_job, mode, source, filename, args.start, args.duration,
+                    output_dir, ffmpeg_path, args.max_bytes,
+                )
+                jobs.append((item, future))
+        results = []
+        for item, future in jobs:
+            result = future.result()
+            result.update(
+                format=item['format'], seconds=item['seconds'], bitrate=item['bitrate'],
+                input_bytes=item['input_bytes'],
+            )
+            results.append(result)
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown(wait=True)
+
+    done = [r for r in results if r['ok']]
+    walls = sorted(r['wall_s'] for r in done)
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'opus_bitrate': opus_bitrate,
+        'format': items[0]['format'],
+        'jobs': len(results),
+        'errors': len(results) - len(done),
+        'elapsed_s': round(elapsed, 3),
+        'jobs_per_s': round(len(done) / elapsed, 2) if elapsed else 0.0,
+        'wall_s': {
+            'p50': round(percentile(walls, 50), 3),
+            'p99': round(percentile(walls, 99), 3),
+            'max': round(walls[-1], 3) if walls else 0.0,
+        },
+        'cpu_s_mean': round(sum(r['cpu_s'] for r in done) / len(done), 3) if done else 0.0,
+        # Tüm işlerin CPU süresi / duvar süresi: 1'den büyükse çekirdekler paralel kullanılıyor
+        'cpu_utilization': round(sum(r['cpu_s'] for r in done) / elapsed, 2) if elapsed else 0.0,
+        'peak_ffmpeg_rss_mb': round(max((r['ffmpeg_rss_kb'] for r in results), default=0) / 1024, 1),
+        'peak_worker_rss_mb': round(max((r['worker_rss_kb'] for r in results), default=0) / 1024, 1),
+        'output_bytes_mean': round(sum(r['output_bytes'] for r in done) / len(done)) if done else 0,
+        'spooled': sum(1 for r in done if 'download' in r['timings']),
+        'results': results,
+    }
+
+
+def print_group(group: dict):
+    wall = group['wall_s']
+    print(
+        f"  {group['format']:<6} iş {group['jobs']:>3} (hata {group['errors']})  "
+        f"{group['jobs_per_s']:>6} iş/s  duvar p50 {wall['p50']:.3f}s p99 {wall['p99']:.3f}s  "
+        f"CPU {group['cpu_s_mean']:.3f}s/iş (×{group['cpu_utilization']})  "
+        f"RSS ffmpeg {group['peak_ffmpeg_rss_mb']}MB  "
+        f"çıktı {group['output_bytes_mean'] / 1024:.0f}KB"
+        + (f"  ara dosya {group['spooled']}" if group['spooled'] else '')
+    )
+    errors = {r['error'] for r in group['results'] if r['error']}
+    for error in sorted(errors):
+        print(f"         ! {error[:120]}")
+
+
+def _environment(ffmpeg_path: str) -> dict:
+    def _first_line(args):
+        try:
+            return subprocess.run(args, capture_output=True, text=True, check=True).stdout.splitlines()[0]
+        except (OSError, subprocess.CalledProcessError, IndexError):
+            return None
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': _first_line(['git', '-C', os.path.dirname(os.path.abspath(__file__)), 'rev-parse', 'HEAD']),
+        'ffmpeg': _first_line([ffmpeg_path, '-version']),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='trim,attachment')
+    parser.add_argument('--concurrency', default='1,2,4', help="Eşzamanlı worker sayıları")
+    parser.add_argument('--formats', default=','.join(SUPPORTED_AUDIO_FORMATS))
+    parser.add_argument('--lengths', default='10,60,180', help="Giriş süreleri (saniye)")
+    parser.add_argument('--bitrates', default='64k,192k', help="Giriş bitrate'leri (kayıpsız formatlarda yok sayılır)")
+    parser.add_argument('--opus-bitrates', default='96k', help="Karşılaştırılacak çıktı (Opus) bitrate'leri")
+    parser.add_argument('--start', type=float, default=5.0, help="Klip başlangıcı (saniye)")
+    parser.add_argument('--duration', type=float, default=float(BOT_CONFIG.get('audio_trim_max_seconds', 15)))
+    parser.add_argument('--max-mb', type=float, default=float(BOT_CONFIG.get('max_file_size_mb', 10)),
+                        help="Ek boyut sınırı (attachment yolu)")
+    parser.add_argument('--repeat', type=int, default=2, help="Her giriş dosyasının grup içinde tekrar sayısı")
+    parser.add_argument('--corpus', help="Girişleri bu klasörde üret/tekrar kullan (varsayılan: geçici)")
+    parser.add_argument('--faststart', action='store_true', help="MP4/M4A girişlerinde moov başta olsun")
+    parser.add_argument('--json', help="Sonucu bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+    args.max_bytes = int(args.max_mb * 1024 * 1024)
+
+    formats = [ext for ext in _parse_list(args.formats) if ext in FORMAT_CODECS]
+    unknown = set(_parse_list(args.formats)) - set(formats)
+    if unknown:
+        print(f"Bilinmeyen format atlandı: {', '.join(sorted(unknown))}")
+
+    ffmpeg_path = get_ffmpeg_path()
+    with tempfile.TemporaryDirectory() as scratch:
+        corpus_dir = args.corpus or os.path.join(scratch, 'corpus')
+        output_dir = os.path.join(scratch, 'out')
+        os.makedirs(output_dir)
+
+        generated = time.perf_counter()
+        corpus = build_corpus(
+            ffmpeg_path, corpus_dir, formats,
+            [int(s) for s in _parse_list(args.lengths)], _parse_list(args.bitrates), args.faststart,
+        )
+        print(f"{len(corpus)} giriş dosyası hazır ({time.perf_counter() - generated:.1f}s): {corpus_dir}")
+
+        server = start_file_server(corpus_dir)
+        base_url = f'http://127.0.0.1:{server.server_port}/'
+        groups = []
+        try:
+            for opus_bitrate in _parse_list(args.opus_bitrates):
+                for mode in _parse_list(args.modes):
+                    for concurrency in [int(c) for c in _parse_list(args.concurrency)]:
+                        print(f"{mode}, eşzamanlılık {concurrency}, çıktı {opus_bitrate}:")
+                        for ext in formats:
+                            items = [item for item in corpus if item['format'] == ext]
+                            group = run_group(
+                                mode, concurrency, opus_bitrate, items, args, base_url, output_dir, ffmpeg_path,
+                            )
+                            print_group(group)
+                            groups.append(group)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        config = {k: v for k, v in vars(args).items() if k != 'json'}
+        with open(args.json, 'w') as f:
+            json.dump(
+                {'environment': _environment(ffmpeg_path), 'config': config, 'corpus': corpus, 'groups': groups},
+                f, indent=2, ensure_ascii=False,
+            )
+
+
+if __name__ == '__main__':
+    main()
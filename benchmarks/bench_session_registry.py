@@ -0,0 +1,69 @@
+"""
+Session Registry mikro benchmark'ı
+Eski doğrusal tarama (dict + liste filtreleme/sıralama) ile SessionRegistry karşılaştırması
+
+Kullanım:
+    python benchmarks/bench_session_registry.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_registry import SessionRegistry  # noqa: E402
+from voice_pool import VoiceSession  # noqa: E402
+
+SESSIONS_PER_GUILD = 5
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def build(n: int):
+    plain = {}
+    registry = SessionRegistry()
+    for i in range(n):
+        guild_id = i // SESSIONS_PER_GUILD
+        session = VoiceSession(guild_id=guild_id, channel_id=i, user_id=0, voice_client=None)
+        session.last_activity = random.random()
+        plain[session.key] = session
+        registry[session.key] = session
+    return plain, registry
+
+
+def linear_count(sessions: dict, guild_id: int) -> int:
+    return len([s for s in sessions.values() if s.guild_id == guild_id])
+
+
+def linear_oldest_idle(sessions: dict, guild_id: int):
+    idle = [s for s in sessions.values() if s.guild_id == guild_id and not s.is_playing]
+    idle.sort(key=lambda s: s.started_at)
+    return idle[0] if idle else None
+
+
+def main():
+    random.seed(1)
+    print(f"{'N':>8} | {'işlem':<12} | {'doğrusal (µs)':>14} | {'registry (µs)':>14}")
+    print('-' * 58)
+
+    for n in SIZES:
+        plain, registry = build(n)
+        guilds = max(1, n // SESSIONS_PER_GUILD)
+        guild_ids = [random.randrange(guilds) for _ in range(1000)]
+        number = 200 if n <= 10_000 else 20
+
+        def run(fn):
+            it = iter(guild_ids * (number // len(guild_ids) + 1))
+            total = timeit.timeit(lambda: fn(next(it)), number=number)
+            return total / number * 1e6
+
+        for label, slow, fast in (
+            ('count', lambda g: linear_count(plain, g), registry.guild_count),
+            ('oldest_idle', lambda g: linear_oldest_idle(plain, g), registry.oldest_idle),
+        ):
+            print(f"{n:>8} | {label:<12} | {run(slow):>14.2f} | {run(fast):>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Voice fleet benchmark'ı
+Aynı sunucuda K kanala eşzamanlı join: tek bot kimliği ile fleet (K worker) karşılaştırması
+
+Kullanım:
+    python benchmarks/bench_voice_fleet.py [--channels 5] [--frames 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Her connect/disconnect INFO satırı ölçümü bozmasın ve gerçek bot.log'a yazılmasın
+from logger_setup import setup_logging  # noqa: E402
+setup_logging(log_file=os.devnull, log_level='ERROR')
+
+from benchmarks.fakes import FAKE_OPUS_FRAME, FakeClient, FakeMember  # noqa: E402
+from packet_file import sidecar_path, write_packet_file  # noqa: E402
+from voice_fleet import VoiceFleet, VoiceWorker  # noqa: E402
+from voice_pool import PlaybackRequest, VoicePool  # noqa: E402
+
+GUILD_ID = 1
+
+
+async def run(channel_count: int, frames: int, workers: int, audio_file: str) -> dict:
+    clients = [FakeClient(f'bot{i}') for i in range(workers)]
+    channels = []
+    for channel_id in range(100, 100 + channel_count):
+        members = [FakeMember(channel_id)]
+        for client in clients:
+            client.add_channel(GUILD_ID, channel_id, members, frame_interval=0.02)
+        # Event'ler ana bot'un (ilk client) cache'inden gelir
+        channels.append(clients[0].get_channel(channel_id))
+
+    fleet = None
+    if workers > 1:
+        fleet = VoiceFleet([VoiceWorker(name=c.name, client=c) for c in clients])
+
+    pool = VoicePool(bot=clients[0], max_sessions_per_guild=channel_count, max_retries=1, fleet=fleet)
+
+    started = time.monotonic()
+    for channel in channels:
+        request = PlaybackRequest(audio_file=audio_file, user_id=channel.id, ffmpeg_path='ffmpeg')
+        await pool.enqueue_playback(channel, request)
+
+    # Her kanal ya çalmayı bitirir ya da bağlanamayıp worker'ı kapanır (linger beklenmez)
+    while time.monotonic() - started < 30:
+        finished = sum(c.plays_finished for c in clients)
+        failed = channel_count - len(pool._queue_workers)  # bağlanamayan worker kendini kaldırır
+        if finished + failed >= channel_count:
+            break
+        await asyncio.sleep(0.005)
+    elapsed = time.monotonic() - started
+
+    played = sum(c.plays_finished for c in clients)
+    await pool.cleanup_all()
+    return {'workers': workers, 'played': played, 'elapsed_s': round(elapsed, 3)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--channels', type=int, default=5)
+    parser.add_argument('--frames', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        audio_file = os.path.join(directory, '1.webm')
+        write_packet_file(sidecar_path(audio_file), [FAKE_OPUS_FRAME] * args.frames)
+
+        for workers in (1, args.channels):
+            result = await run(args.channels, args.frames, workers, audio_file)
+            print(f"workers={result['workers']:>2}  çalınan={result['played']}/{args.channels}  "
+                  f"süre={result['elapsed_s']}s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,262 @@
+"""
+VoicePool yük benchmark'ı
+N sunucu × M kanala K kişilik join fırtınaları; Discord yerine benchmarks/fakes.py
+stand-in'leri (ayarlanabilir bağlantı gecikmesi, hata oranı ve çalma süresi) kullanılır.
+Throughput, join→çalma gecikme yüzdelikleri, enqueue maliyeti, tepe bellek ve
+task/thread sayıları raporlanır; sonunda cleanup döngüsünün her şeyi kapatma süresi ölçülür.
+
+Kullanım:
+    python benchmarks/bench_voice_pool.py [--guilds 50] [--channels 2] [--joins 5] [--waves 3]
+        [--connect-ms 50] [--jitter-ms 25] [--failure-rate 0.05] [--play-ms 200]
+        [--tracemalloc] [--json sonuc.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modül logger'ları import sırasında oluşur: fırtınada binlerce INFO satırı ölçümü bozmasın
+from logger_setup import setup_logging  # noqa: E402
+setup_logging(log_file=os.devnull, log_level='ERROR')
+
+from benchmarks.fakes import FAKE_OPUS_FRAME, FakeClient, FakeMember  # noqa: E402
+from packet_file import sidecar_path, write_packet_file  # noqa: E402
+from stats_registry import StatsRegistry, percentile  # noqa: E402
+from voice_fleet import VoiceFleet, VoiceWorker  # noqa: E402
+from voice_linger import LingerPolicy  # noqa: E402
+from voice_pool import PlaybackRequest, VoicePool  # noqa: E402
+
+FRAME_SECONDS = 0.02
+
+# Bitmemiş iş kalırsa benchmark'ı kesme süresi (saniye)
+DRAIN_TIMEOUT = 120.0
+
+
+class Sampler:
+    """Asyncio task ve thread sayısının tepe değerlerini örnekle"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_tasks = 0
+        self.peak_threads = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self):
+        while True:
+            self.peak_tasks = max(self.peak_tasks, len(asyncio.all_tasks()))
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            await asyncio.sleep(self.interval)
+
+
+def _rss_mb() -> float:
+    # Linux'ta KB, macOS'ta byte
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+async def run(args: argparse.Namespace, audio_file: str) -> dict:
+    # Bir bot kimliği sunucu başına tek kanala bağlanabilir: kanal > 1 ise fleet kullanılır
+    clients = [FakeClient(f'bench{i}', seed=args.seed + i) for i in range(args.channels)]
+    client = clients[0]
+    channels = []
+    for guild_id in range(1, args.guilds + 1):
+        for index in range(args.channels):
+            channel_id = guild_id * 1000 + index
+            # Üye listesi kanallar arasında ortak: dalgalarda katılan kullanıcılar eklenir
+            members = []
+            for fake in clients:
+                fake.add_channel(
+                    guild_id, channel_id, members,
+                    connect_latency=args.connect_ms / 1000,
+                    connect_jitter=args.jitter_ms / 1000,
+                    failure_rate=args.failure_rate,
+                    frame_interval=FRAME_SECONDS,
+                )
+            # Event'ler ana bot'un (ilk client) cache'inden gelir
+            channels.append(client.get_channel(channel_id))
+
+    fleet = None
+    if len(clients) > 1:
+        fleet = VoiceFleet([VoiceWorker(name=c.name, client=c) for c in clients])
+
+    stats = StatsRegistry(window_size=len(channels) * args.joins * args.waves)
+    pool = VoicePool(
+        bot=client,
+        max_sessions_per_guild=args.channels,
+        max_total_sessions=len(channels),
+        max_retries=args.max_retries,
+        session_timeout=args.linger_ms / 1000,
+        linger_policy=LingerPolicy(
+            base_seconds=args.linger_ms / 1000,
+            max_seconds=args.linger_ms / 1000,
+            min_seconds=0.0,
+        ),
+        fleet=fleet,
+        stats=stats,
+    )
+    pool.start_cleanup_task()
+
+    sampler = Sampler()
+    sampler.start()
+    rss_before = _rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    enqueue_us = []
+    user_id = 0
+    started = time.monotonic()
+    for wave in range(args.waves):
+        # Fırtına: tüm kanallara aynı anda K yeni kullanıcı katılır
+        for channel in channels:
+            for _ in range(args.joins):
+                user_id += 1
+                channel.members.append(FakeMember(user_id))
+                request = PlaybackRequest(audio_file=audio_file, user_id=user_id, ffmpeg_path='ffmpeg')
+                call_started = time.perf_counter()
+                await pool.enqueue_playback(channel, request)
+                enqueue_us.append((time.perf_counter() - call_started) * 1e6)
+        if wave < args.waves - 1:
+            await asyncio.sleep(args.wave_gap_ms / 1000)
+
+    # Tüm kuyruklar çalınıp worker'lar linger sonrası kapanana kadar bekle
+    while pool._queue_workers and time.monotonic() - started < DRAIN_TIMEOUT:
+        await asyncio.sleep(0.01)
+    played_at = time.monotonic()
+
+    # Cleanup döngüsü kalan sessionları kapatmalı
+    while pool.total_sessions and time.monotonic() - started < DRAIN_TIMEOUT:
+        await asyncio.sleep(0.01)
+    drained_at = time.monotonic()
+
+    peak_traced_mb = None
+    if args.tracemalloc:
+        peak_traced_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    await sampler.stop()
+
+    snapshot = stats.snapshot()
+    join_latency = snapshot['latency'].get('join_to_play_ms', {})
+    connect_latency = snapshot['latency'].get('connect_ms', {})
+    enqueue_us.sort()
+    played = sum(c.plays_finished for c in clients)
+    elapsed = played_at - started
+    queue_stats = pool.queue_stats.as_dict()
+
+    leftover_sessions = pool.total_sessions
+    await pool.cleanup_all()
+    if fleet:
+        await fleet.close()
+
+    return {
+        'config': {
+            'guilds': args.guilds,
+            'channels_per_guild': args.channels,
+            'joins_per_channel': args.joins,
+            'waves': args.waves,
+            'connect_ms': args.connect_ms,
+            'jitter_ms': args.jitter_ms,
+            'failure_rate': args.failure_rate,
+            'play_ms': args.play_ms,
+            'linger_ms': args.linger_ms,
+            'seed': args.seed,
+        },
+        'joins': len(enqueue_us),
+        'played': played,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(played / elapsed, 1) if elapsed else 0.0,
+        'join_to_play_ms': {k: round(v, 1) for k, v in join_latency.items() if k != 'count'},
+        'connect_ms': {k: round(v, 1) for k, v in connect_latency.items() if k != 'count'},
+        'enqueue_us': {
+            'p50': round(percentile(enqueue_us, 50), 1),
+            'p99': round(percentile(enqueue_us, 99), 1),
+            'max': round(enqueue_us[-1], 1) if enqueue_us else 0.0,
+        },
+        'connect_failures': sum(
+            fake.get_channel(channel.id).connect_failures for fake in clients for channel in channels
+        ),
+        'sessions_opened': stats.get('sessions_opened'),
+        'cleanup_drain_s': round(drained_at - played_at, 3),
+        'leftover_sessions': leftover_sessions,
+        'peak_tasks': sampler.peak_tasks,
+        'peak_threads': sampler.peak_threads,
+        'peak_rss_mb': round(_rss_mb(), 1),
+        'rss_growth_mb': round(_rss_mb() - rss_before, 1),
+        'peak_traced_mb': round(peak_traced_mb, 2) if peak_traced_mb is not None else None,
+        'queue': queue_stats,
+    }
+
+
+def print_report(result: dict):
+    config = result['config']
+    print(
+        f"{config['guilds']} sunucu × {config['channels_per_guild']} kanal × {config['joins_per_channel']} join "
+        f"× {config['waves']} dalga (bağlantı {config['connect_ms']}±{config['jitter_ms']}ms, "
+        f"hata %{config['failure_rate'] * 100:g}, çalma {config['play_ms']}ms)"
+    )
+    print(f"  join / çalınan      : {result['joins']} / {result['played']}  (kuyruk: {result['queue']})")
+    print(f"  süre / throughput   : {result['elapsed_s']}s / {result['throughput_per_s']} çalma/s")
+    latency = result['join_to_play_ms']
+    print(f"  join→çalma (ms)     : p50 {latency.get('p50', 0)}  p99 {latency.get('p99', 0)}  max {latency.get('max', 0)}")
+    connect = result['connect_ms']
+    print(f"  bağlantı (ms)       : p50 {connect.get('p50', 0)}  p99 {connect.get('p99', 0)}  "
+          f"({result['sessions_opened']} session, {result['connect_failures']} başarısız deneme)")
+    enqueue = result['enqueue_us']
+    print(f"  enqueue_playback(µs): p50 {enqueue['p50']}  p99 {enqueue['p99']}  max {enqueue['max']}")
+    print(f"  cleanup kapanışı    : {result['cleanup_drain_s']}s (kalan session: {result['leftover_sessions']})")
+    traced = f", tracemalloc tepe {result['peak_traced_mb']}MB" if result['peak_traced_mb'] is not None else ""
+    print(f"  tepe task / thread  : {result['peak_tasks']} / {result['peak_threads']}")
+    print(f"  bellek              : RSS tepe {result['peak_rss_mb']}MB (+{result['rss_growth_mb']}MB){traced}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--channels', type=int, default=2, help="Sunucu başına kanal")
+    parser.add_argument('--joins', type=int, default=5, help="Dalga başına kanal başına join")
+    parser.add_argument('--waves', type=int, default=3)
+    parser.add_argument('--wave-gap-ms', type=float, default=100)
+    parser.add_argument('--connect-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=25)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--play-ms', type=float, default=200)
+    parser.add_argument('--linger-ms', type=float, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tracemalloc', action='store_true', help="Python tepe belleği (yavaşlatır)")
+    parser.add_argument('--json', help="Sonucu bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        audio_file = os.path.join(directory, '1.webm')
+        frames = max(1, int(args.play_ms / 1000 / FRAME_SECONDS))
+        write_packet_file(sidecar_path(audio_file), [FAKE_OPUS_FRAME] * frames)
+
+        result = await run(args, audio_file)
+
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
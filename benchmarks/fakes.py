@@ -0,0 +1,158 @@
+"""
+Discord gateway / voice stand-in'leri (benchmark'lar için)
+Gerçek Discord kuralını taklit eder: bir bot kimliği sunucu başına tek voice bağlantısı tutabilir
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import discord
+
+# Bir Opus frame'i (TOC: 20ms CELT FB stereo) - fake voice client decode etmez
+FAKE_OPUS_FRAME = b'\xfc\xff\xfe'
+
+
+class FakeMember:
+    def __init__(self, member_id: int, bot: bool = False):
+        self.id = member_id
+        self.bot = bot
+        self.display_name = f'user{member_id}'
+
+
+class FakeGuild:
+    def __init__(self, client: 'FakeClient', guild_id: int):
+        self.id = guild_id
+        self.name = f'guild{guild_id}'
+        self._client = client
+
+    @property
+    def voice_client(self) -> Optional['FakeVoiceClient']:
+        return self._client.voice_clients_by_guild.get(self.id)
+
+
+class FakeVoiceClient:
+    """
+    AudioPlayer yerine geçen voice client.
+    frame_interval > 0 ise frame'leri gerçek zamanlı (20ms) okur; aksi halde hepsini hemen okur.
+    """
+
+    def __init__(self, channel: 'FakeVoiceChannel', frame_interval: float = 0.0):
+        self.channel = channel
+        self.frame_interval = frame_interval
+        self.frames_sent = 0
+        self._connected = True
+        self._playing = False
+        self._stopped = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def is_playing(self) -> bool:
+        return self._playing
+
+    def play(self, source: discord.AudioSource, after=None):
+        self._playing = True
+        self._stopped = False
+
+        def run():
+            error = None
+            try:
+                while self._connected and not self._stopped and source.read():
+                    self.frames_sent += 1
+                    if self.frame_interval:
+                        time.sleep(self.frame_interval)
+            except Exception as e:
+                error = e
+            finally:
+                self._playing = False
+                source.cleanup()
+                self.channel.client.plays_finished += 1
+                if after:
+                    after(error)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self._stopped = True
+
+    async def disconnect(self, force: bool = False):
+        self._connected = False
+        self.channel.client.voice_clients_by_guild.pop(self.channel.guild.id, None)
+        self.channel.disconnects += 1
+
+
+class FakeVoiceChannel:
+    def __init__(
+        self,
+        client: 'FakeClient',
+        guild: FakeGuild,
+        channel_id: int,
+        members: List[FakeMember],
+        connect_latency: float = 0.05,
+        frame_interval: float = 0.0,
+        connect_jitter: float = 0.0,
+        failure_rate: float = 0.0,
+    ):
+        self.client = client
+        self.guild = guild
+        self.id = channel_id
+        self.name = f'channel{channel_id}'
+        self.members = members
+        self.connect_latency = connect_latency
+        self.frame_interval = frame_interval
+        self.connect_jitter = connect_jitter
+        self.failure_rate = failure_rate
+        self.connects = 0
+        self.connect_failures = 0
+        self.disconnects = 0
+
+    async def connect(self, timeout: float = 60.0, reconnect: bool = True) -> FakeVoiceClient:
+        rng = self.client.rng
+        await asyncio.sleep(self.connect_latency + rng.uniform(0, self.connect_jitter))
+        if self.failure_rate and rng.random() < self.failure_rate:
+            # Voice handshake zaman aşımı gibi davran
+            self.connect_failures += 1
+            raise asyncio.TimeoutError()
+        if self.guild.id in self.client.voice_clients_by_guild:
+            raise discord.ClientException('Already connected to a voice channel.')
+        voice_client = FakeVoiceClient(self, self.frame_interval)
+        self.client.voice_clients_by_guild[self.guild.id] = voice_client
+        self.connects += 1
+        return voice_client
+
+
+class FakeClient:
+    """Tek bir bot kimliği: kendi guild/channel cache'i ve voice bağlantıları"""
+
+    def __init__(self, name: str, seed: int = 0):
+        self.name = name
+        self.rng = random.Random(seed)
+        self._guilds: Dict[int, FakeGuild] = {}
+        self._channels: Dict[int, FakeVoiceChannel] = {}
+        self.voice_clients_by_guild: Dict[int, FakeVoiceClient] = {}
+        self.plays_finished = 0
+
+    def add_channel(self, guild_id: int, channel_id: int, members: List[FakeMember], **kwargs) -> FakeVoiceChannel:
+        guild = self._guilds.setdefault(guild_id, FakeGuild(self, guild_id))
+        channel = FakeVoiceChannel(self, guild, channel_id, members, **kwargs)
+        self._channels[channel_id] = channel
+        return channel
+
+    @property
+    def guilds(self) -> List[FakeGuild]:
+        return list(self._guilds.values())
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return self._guilds.get(guild_id)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeVoiceChannel]:
+        return self._channels.get(channel_id)
+
+    def is_ready(self) -> bool:
+        return True
+
+    def is_closed(self) -> bool:
+        return False
@@ -8,6 +8,7 @@ Birden fazla sunucu ve kanalda eşzamanlı çalışır.
 import os
 import sys
 import signal
+import time
 import asyncio
 from typing import Optional
 
@@ -15,28 +16,57 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from logger_setup import setup_logging, get_logger
+from logger_setup import setup_logging, get_logger, shutdown_logging, dropped_log_records
 from voice_pool import VoicePool, PlaybackRequest
-from config import BOT_CONFIG, VOICE_CONFIG, DOWNLOADS_DIR, get_ffmpeg_path
+from voice_linger import LingerPolicy
+from voice_fleet import VoiceFleet
+from cluster import (
+    ClusterLink, ClusterSupervisor, STATS_INTERVAL, EXIT_FATAL, fetch_recommended_shards,
+)
+from playback_queue import QueuePolicy
+from sound_catalog import SoundCatalog, CATALOG_FILENAME
+from ffmpeg_scheduler import FFmpegScheduler
+from ingest_queue import IngestQueue, INGEST_DB_FILENAME
+from sound_store import SoundStore
+from guild_sound_index import GuildSoundIndex
+from user_resolver import UserResolver
+from stats_registry import StatsRegistry
+from metrics import REGISTRY as METRICS, JOINS, LoopLagMonitor, MetricsServer
+from tracing import Tracer
+from storage_layout import (
+    adopt_legacy_sound, is_migrated, list_legacy_sounds, mark_migrated,
+    remove_legacy_sound, remove_legacy_temp_files, TMP_DIRNAME,
+)
+from config import (
+    BOT_CONFIG, VOICE_CONFIG, FFMPEG_CONFIG, INGEST_CONFIG, METRICS_CONFIG, TRACE_CONFIG, DOWNLOADS_DIR,
+    get_ffmpeg_path, get_sound_path,
+)
 
 # Environment variables yükle
 load_dotenv()
 
-# Logging yapılandır
-bot_logger = setup_logging(
-    log_file=BOT_CONFIG.get('log_file', 'bot.log'),
-    log_level=BOT_CONFIG.get('log_level', 'INFO'),
-)
 log = get_logger('bot.main')
 
 
+def _hit_rate(cache) -> float:
+    """hits/misses sayaçları olan bir cache'in isabet oranı"""
+    lookups = cache.hits + cache.misses
+    return cache.hits / lookups if lookups else 0.0
+
+
 class SesAdamBot(commands.Bot):
     """
     Ana bot sınıfı.
     Çoklu ses kanalı desteği ve gelişmiş event handling.
+    Tek süreçte shard'sız çalışır; cluster modu için ShardedSesAdamBot kullanılır.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        shard_ids: Optional[list[int]] = None,
+        shard_count: Optional[int] = None,
+        cluster_link: Optional[ClusterLink] = None,
+    ):
         # Intents yapılandır
         intents = discord.Intents.default()
         intents.message_content = True
@@ -44,17 +74,97 @@ class SesAdamBot(commands.Bot):
         intents.guilds = True
         intents.members = True
         
+        # Shard parametreleri sadece supervisor verdiyse geçilir (AutoShardedBot alt sınıfı)
+        shard_options = {}
+        if shard_count is not None:
+            shard_options = {'shard_ids': shard_ids, 'shard_count': shard_count}
+        
         super().__init__(
             command_prefix=BOT_CONFIG.get('command_prefix', '/'),
             intents=intents,
             heartbeat_timeout=BOT_CONFIG.get('heartbeat_timeout', 60.0),
             guild_ready_timeout=BOT_CONFIG.get('guild_ready_timeout', 5.0),
             reconnect=True,
+            **shard_options,
         )
+        self._shard_ids = shard_ids
+        self._shard_count = shard_count
+        
+        # Cluster modu: supervisor ile IPC bağlantısı (tek süreçte None)
+        self.cluster_link = cluster_link
+        self._cluster_stats_task: Optional[asyncio.Task] = None
+        self._layout_task: Optional[asyncio.Task] = None
+        self._refresh_tasks: set[asyncio.Task] = set()
         
         # Voice Pool - çoklu kanal yönetimi
         self.voice_pool: Optional[VoicePool] = None
         
+        # Artımlı istatistikler - /botstatus ve cluster raporu sadece bunu okur
+        self.stats = StatsRegistry()
+        
+        # FFmpeg setup'ta bir kez kontrol edilir (/botstatus her seferinde aramaz)
+        self.ffmpeg_available = False
+        
+        # Prometheus uç noktası (METRICS_PORT verilmişse) ve event loop gecikmesi ölçümü
+        self.metrics_server: Optional[MetricsServer] = None
+        self.loop_lag = LoopLagMonitor(interval=METRICS_CONFIG.get('loop_lag_interval', 0.5))
+        
+        # Join tracing (cluster modunda her süreç kendi dosyasına yazar)
+        trace_file = TRACE_CONFIG.get('file', 'traces.jsonl')
+        if cluster_link:
+            root, ext = os.path.splitext(trace_file)
+            trace_file = f'{root}.cluster{cluster_link.cluster_id}{ext}'
+        self.tracer = Tracer(
+            trace_file,
+            sample_rate=TRACE_CONFIG.get('sample_rate', 0.0),
+            slow_ms=TRACE_CONFIG.get('slow_ms', 3000.0),
+            max_bytes=TRACE_CONFIG.get('max_bytes', 10 * 1024 * 1024),
+            backup_count=TRACE_CONFIG.get('backup_count', 3),
+        )
+        
+        # Global FFmpeg süreç bütçesi (çalma + ingest ortak)
+        # Limitler host geneli: cluster modunda her süreç sadece kendi payını kullanır
+        share = cluster_link.share if cluster_link else (lambda total: total)
+        self.ffmpeg_scheduler = FFmpegScheduler(
+            max_processes=share(FFMPEG_CONFIG.get('max_processes', 4)),
+            playback_reserve=FFMPEG_CONFIG.get('playback_reserve', 1),
+        )
+        
+        # Ses kataloğu - join başına dosya sistemi kontrolü yerine RAM'den sorgu
+        self.catalog = SoundCatalog(os.path.join(DOWNLOADS_DIR, CATALOG_FILENAME))
+        
+        # Sunucu bazlı ses sahipleri (/seslistesi)
+        self.sound_index = GuildSoundIndex(self.catalog)
+        
+        # Kullanıcı adı çözümleme (TTL'li cache + rate limit'e duyarlı REST kuyruğu)
+        self.user_resolver = UserResolver(
+            self,
+            max_size=BOT_CONFIG.get('user_cache_size', 10000),
+            ttl=BOT_CONFIG.get('user_cache_ttl', 3600.0),
+            negative_ttl=BOT_CONFIG.get('user_cache_negative_ttl', 600.0),
+            max_concurrency=BOT_CONFIG.get('user_fetch_concurrency', 2),
+        )
+        
+        # İçerik adresli ses deposu - aynı klip diskte bir kez tutulur
+        self.sound_store = SoundStore(DOWNLOADS_DIR)
+        
+        # Ingest kuyruğu - indirme/dönüştürme ayrı worker süreçlerinde
+        # (cluster modunda her süreç kendi kuyruğunu tutar; etkileşimler o süreçte biter)
+        db_name = INGEST_DB_FILENAME
+        if cluster_link:
+            root, ext = os.path.splitext(db_name)
+            db_name = f'{root}.cluster{cluster_link.cluster_id}{ext}'
+        self.ingest_queue = IngestQueue(
+            db_path=os.path.join(DOWNLOADS_DIR, db_name),
+            work_dir=os.path.join(DOWNLOADS_DIR, TMP_DIRNAME, INGEST_CONFIG.get('work_dirname', 'ingest')),
+            installer=self.install_sound,
+            ffmpeg_path=get_ffmpeg_path,
+            max_workers=share(INGEST_CONFIG.get('max_workers', 2)),
+            max_bytes=BOT_CONFIG.get('max_file_size_mb', 10) * 1024 * 1024,
+            scheduler=self.ffmpeg_scheduler,
+            store=self.sound_store,
+        )
+        
         # on_ready tekrar çalışmasını önle
         self._ready = False
         
@@ -65,25 +175,87 @@ class SesAdamBot(commands.Bot):
         """Bot başlarken çalışır - cog'ları yükle ve sync et"""
         log.info("Bot setup başlıyor...")
         
+        # Fleet modu: ek bot token'ları varsa her kanal ayrı bir bot kimliğiyle bağlanır
+        fleet = self._create_fleet()
+        if fleet:
+            await fleet.start()
+        
         # Voice Pool oluştur
         self.voice_pool = VoicePool(
             bot=self,
             max_sessions_per_guild=VOICE_CONFIG.get('max_sessions_per_guild', 5),
             session_timeout=VOICE_CONFIG.get('session_timeout', 60.0),
             connection_timeout=VOICE_CONFIG.get('connection_timeout', 15.0),
+            opus_cache_max_bytes=VOICE_CONFIG.get('opus_cache_max_mb', 64) * 1024 * 1024,
+            max_total_sessions=VOICE_CONFIG.get('max_total_sessions', 100),
+            linger_policy=LingerPolicy(
+                base_seconds=VOICE_CONFIG.get('linger_base_seconds', 15.0),
+                max_seconds=VOICE_CONFIG.get('linger_max_seconds', 60.0),
+                rate_window=VOICE_CONFIG.get('linger_rate_window', 300.0),
+                high_join_rate=VOICE_CONFIG.get('linger_high_join_rate', 4.0),
+                low_join_rate=VOICE_CONFIG.get('linger_low_join_rate', 1.0),
+                pressure_ratio=VOICE_CONFIG.get('linger_pressure_ratio', 0.8),
+            ),
+            queue_policy=QueuePolicy(
+                max_size=VOICE_CONFIG.get('queue_max_size', 10),
+                drop_departed=VOICE_CONFIG.get('queue_drop_departed', True),
+                dedupe=VOICE_CONFIG.get('queue_dedupe', True),
+                storm_threshold=VOICE_CONFIG.get('storm_threshold', 5),
+                storm_mode=VOICE_CONFIG.get('storm_mode', 'shorten'),
+                storm_clip_seconds=VOICE_CONFIG.get('storm_clip_seconds', 3.0),
+                storm_sample_every=VOICE_CONFIG.get('storm_sample_every', 3),
+            ),
+            mixer_enabled=VOICE_CONFIG.get('mixer_enabled', False),
+            mixer_max_voices=VOICE_CONFIG.get('mixer_max_voices', 4),
+            fleet=fleet,
+            ffmpeg_scheduler=self.ffmpeg_scheduler,
+            stats=self.stats,
         )
         self.voice_pool.start_cleanup_task()
+        self._register_gauges()
+        self.tracer.start()
         
         # Downloads klasörünü oluştur
         os.makedirs(DOWNLOADS_DIR, exist_ok=True)
         
+        # Ses kataloğunu aç (ilk açılışta mevcut dosyalardan doldurulur)
+        await self.catalog.open(rebuild_dir=DOWNLOADS_DIR)
+        self.catalog.start_flush_task()
+        await asyncio.to_thread(self.sound_store.open)
+        
+        # Cluster modu: katalog değişikliklerini paylaş, istatistikleri yayınla
+        if self.cluster_link:
+            self.catalog.on_change = self.cluster_link.sound_changed
+            self.cluster_link.start(asyncio.get_running_loop(), self._on_remote_sound_changed)
+            self._cluster_stats_task = asyncio.create_task(self._cluster_stats_loop())
+        
+        # Düz klasör düzeninden hash'li düzene online taşıma (cluster modunda tek süreç yapar)
+        primary_cluster = self.cluster_link is None or self.cluster_link.cluster_id == 0
+        if primary_cluster and not await asyncio.to_thread(is_migrated, DOWNLOADS_DIR):
+            self._layout_task = asyncio.create_task(self._migrate_layout())
+        
+        # Ingest kuyruğu (yarım kalan işler kaldığı yerden devam eder)
+        await self.ingest_queue.open()
+        
         # FFmpeg kontrolü
         try:
             ffmpeg_path = get_ffmpeg_path()
+            self.ffmpeg_available = True
             log.info(f"FFmpeg bulundu: {ffmpeg_path}")
         except FileNotFoundError as e:
             log.error(f"FFmpeg bulunamadı: {e}")
         
+        # Metrik uç noktası (cluster modunda her süreç kendi portunda)
+        if METRICS_CONFIG.get('port'):
+            port = METRICS_CONFIG['port'] + (self.cluster_link.cluster_id if self.cluster_link else 0)
+            self.metrics_server = MetricsServer(METRICS, host=METRICS_CONFIG.get('host', '127.0.0.1'), port=port)
+            try:
+                await self.metrics_server.start()
+                self.loop_lag.start()
+            except OSError as e:
+                log.error(f"Metrik uç noktası açılamadı: {e}")
+                self.metrics_server = None
+        
         # Commands cog'unu yükle
         try:
             await self.load_extension('commands.audio')
@@ -93,6 +265,150 @@ class SesAdamBot(commands.Bot):
         
         log.info("Bot setup tamamlandı")
     
+    def _register_gauges(self):
+        """Zaten artımlı tutulan değerleri istatistik görüntüsüne bağla (hepsi O(1) okuma)"""
+        stats = self.stats
+        pool = self.voice_pool
+        stats.register_gauge('sounds', lambda: self.catalog.count)
+        stats.register_gauge('sessions', lambda: pool.total_sessions)
+        stats.register_gauge('playing', lambda: pool.total_playing)
+        stats.register_gauge('queue_depth', lambda: pool.queue_stats.depth)
+        stats.register_gauge('ingest_queued', lambda: self.ingest_queue.stats()['queued'])
+        stats.register_gauge('opus_cache_hit_rate', lambda: _hit_rate(pool.packet_cache))
+        stats.register_gauge('user_cache_hit_rate', lambda: _hit_rate(self.user_resolver))
+        stats.register_gauge('sound_index_hit_rate', lambda: _hit_rate(self.sound_index))
+        
+        METRICS.gauge('sesadam_guilds', "Sunucu sayısı", lambda: stats.guild_count)
+        METRICS.gauge('sesadam_users', "Sunuculardaki toplam üye sayısı", lambda: stats.user_count)
+        METRICS.gauge('sesadam_sounds', "Kayıtlı ses sayısı", lambda: self.catalog.count)
+        METRICS.gauge('sesadam_voice_sessions', "Aktif voice bağlantısı", lambda: pool.total_sessions)
+        METRICS.gauge('sesadam_voice_playing', "Şu an ses çalan bağlantı", lambda: pool.total_playing)
+        METRICS.gauge('sesadam_playback_queue_depth', "Tüm kanallarda bekleyen çalma isteği", lambda: pool.queue_stats.depth)
+        METRICS.gauge('sesadam_playback_queue_max_depth', "En kalabalık kanal kuyruğu", lambda: pool.max_queue_depth)
+        METRICS.gauge('sesadam_playback_queues', "Kuyruğu olan kanal sayısı", lambda: pool.queued_channels)
+        METRICS.gauge('sesadam_ingest_queued', "Bekleyen ingest işi", lambda: self.ingest_queue.stats()['queued'])
+        METRICS.gauge('sesadam_ingest_running', "Çalışan ingest işi", lambda: self.ingest_queue.stats()['running'])
+        METRICS.gauge('sesadam_ffmpeg_active', "Çalışan FFmpeg süreci", lambda: self.ffmpeg_scheduler.stats()['active'])
+        METRICS.gauge('sesadam_ffmpeg_waiting', "FFmpeg slotu bekleyen", lambda: self.ffmpeg_scheduler.stats()['waiting'])
+        METRICS.gauge('sesadam_event_loop_lag_last_seconds', "Son ölçülen event loop gecikmesi", lambda: self.loop_lag.last_lag)
+        METRICS.gauge('sesadam_log_records_dropped', "Log kuyruğu dolduğu için düşürülen kayıt", dropped_log_records)
+    
+    def _create_fleet(self) -> Optional[VoiceFleet]:
+        """DISCORD_WORKER_TOKENS tanımlıysa voice worker fleet'i oluştur"""
+        raw = os.getenv(BOT_CONFIG.get('worker_tokens_env_var', 'DISCORD_WORKER_TOKENS'), '')
+        tokens = [t.strip() for t in raw.split(',') if t.strip()]
+        if not tokens:
+            return None
+        
+        # Worker'lar sadece ses için - mesaj/üye intent'i gerekmez
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.voice_states = True
+        
+        log.info(f"Fleet modu aktif: {len(tokens)} ek voice worker")
+        return VoiceFleet.from_tokens(self, tokens, intents, shard_ids=self._shard_ids, shard_count=self._shard_count)
+    
+    async def install_sound(self, user_id: int, clip_path: str):
+        """Ingest çıktısını kullanıcının sesi olarak kur (eski ses atomik olarak değişir)"""
+        final_output = get_sound_path(user_id)
+        old = self.catalog.get(user_id)
+        
+        # Depoya ekle (içerik zaten varsa kopya yok) ve kullanıcı yoluna hardlink'le
+        digest = await asyncio.to_thread(self.sound_store.put, clip_path)
+        await asyncio.to_thread(self.sound_store.link, digest, final_output)
+        if self.voice_pool:
+            self.voice_pool.invalidate_audio(final_output)
+        await self.catalog.add_sound(user_id, final_output)
+        
+        if old and old.path != final_output:
+            # Taşınmamış eski düzen dosyası
+            await asyncio.to_thread(remove_legacy_sound, old.path)
+            if self.voice_pool:
+                self.voice_pool.invalidate_audio(old.path)
+        if old and old.content_hash != digest:
+            await self.release_sound_object(old.content_hash)
+    
+    async def _migrate_layout(self):
+        """
+        Düz düzendeki sesleri tek tek yeni yerlerine taşı (bot çalışırken).
+        Her ses önce hardlink'lenir, katalog yeni yola çevrilir, sonra eski isim silinir;
+        yarıda kesilirse bir sonraki açılışta kalanlarla devam eder.
+        """
+        try:
+            legacy = await asyncio.to_thread(list_legacy_sounds, DOWNLOADS_DIR)
+            if legacy:
+                log.info(f"Klasör düzeni taşınıyor: {len(legacy)} ses")
+            
+            failed = 0
+            for user_id, legacy_path in legacy:
+                try:
+                    new_path = await asyncio.to_thread(adopt_legacy_sound, DOWNLOADS_DIR, user_id, legacy_path)
+                    await self.catalog.relocate(user_id, legacy_path, new_path)
+                    await asyncio.to_thread(remove_legacy_sound, legacy_path)
+                    if self.voice_pool:
+                        self.voice_pool.invalidate_audio(legacy_path)
+                except OSError as e:
+                    log.error(f"Ses taşınamadı: {legacy_path} ({e})")
+                    failed += 1
+            
+            await asyncio.to_thread(remove_legacy_temp_files, DOWNLOADS_DIR)
+            if failed == 0:
+                await asyncio.to_thread(mark_migrated, DOWNLOADS_DIR)
+                log.info("Klasör düzeni taşıması tamamlandı")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log.error(f"Klasör düzeni taşıma hatası: {e}", exc_info=True)
+    
+    async def release_sound_object(self, content_hash: str):
+        """Hiçbir kullanıcının kullanmadığı depo nesnesini sil (kullanıcı hardlink'leri etkilenmez)"""
+        if self.catalog.references(content_hash) == 0:
+            await asyncio.to_thread(self.sound_store.release, content_hash)
+    
+    def _on_remote_sound_changed(self, user_id: int):
+        """Başka bir cluster kullanıcının sesini değiştirdi - RAM kopyasını ve cache'i tazele"""
+        task = asyncio.create_task(self._refresh_remote_sound(user_id))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._on_refresh_done)
+    
+    async def _refresh_remote_sound(self, user_id: int):
+        # Cache katalog yeniden okunduktan sonra temizlenir: arada gelen join eski yolu tekrar cache'leyemez
+        old = self.catalog.get(user_id)
+        new = await self.catalog.reload_entry(user_id)
+        if self.voice_pool:
+            paths = {get_sound_path(user_id)}
+            paths.update(entry.path for entry in (old, new) if entry)
+            for path in paths:
+                self.voice_pool.invalidate_audio(path)
+    
+    def _on_refresh_done(self, task: asyncio.Task):
+        self._refresh_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            log.error("Uzak ses değişikliği uygulanamadı", exc_info=task.exception())
+    
+    def cluster_stats_snapshot(self) -> dict:
+        """Bu sürecin /botstatus için özet istatistikleri"""
+        return {
+            'guilds': self.stats.guild_count,
+            'users': self.stats.user_count,
+            'sessions': self.voice_pool.total_sessions if self.voice_pool else 0,
+            'playing': self.voice_pool.total_playing if self.voice_pool else 0,
+            'shards': len(self.shards),
+            'latency_ms': round(self.latency * 1000) if self.is_ready() else 0,
+        }
+    
+    async def _cluster_stats_loop(self):
+        """İstatistikleri periyodik olarak supervisor'a gönder"""
+        while True:
+            try:
+                self.cluster_link.publish_stats(self.cluster_stats_snapshot())
+                await asyncio.sleep(STATS_INTERVAL)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log.error(f"Cluster istatistik hatası: {e}", exc_info=True)
+                await asyncio.sleep(STATS_INTERVAL)
+    
     async def on_ready(self):
         """Bot Discord'a bağlandığında çalışır"""
         if self._ready:
@@ -103,8 +419,9 @@ class SesAdamBot(commands.Bot):
         if self.user:
             log.info(f"Bot olarak giriş yapıldı: {self.user} (ID: {self.user.id})")
         
-        # Slash komutlarını senkronize et (sadece istendiğinde)
-        if os.getenv('SYNC_COMMANDS', '').lower() in ('1', 'true', 'yes'):
+        # Slash komutlarını senkronize et (sadece istendiğinde; cluster modunda tek sefer)
+        primary_cluster = self.cluster_link is None or self.cluster_link.cluster_id == 0
+        if primary_cluster and os.getenv('SYNC_COMMANDS', '').lower() in ('1', 'true', 'yes'):
             try:
                 synced = await self.tree.sync()
                 log.info(f"{len(synced)} slash komutu senkronize edildi")
@@ -113,8 +430,9 @@ class SesAdamBot(commands.Bot):
         else:
             log.info("Komut senkronizasyonu atlandı (SYNC_COMMANDS=1 ile etkinleştirin)")
         
-        # İstatistikler
-        log.info(f"Toplam sunucu sayısı: {len(self.guilds)}")
+        # İstatistikler (tek seferlik tam sayım; sonrası olaylarla artımlı)
+        self.stats.reset_guilds(self.guilds)
+        log.info(f"Toplam sunucu sayısı: {self.stats.guild_count}")
         log.info(f"Bot hazır ve çalışıyor!")
         
         # Status ayarla
@@ -136,15 +454,36 @@ class SesAdamBot(commands.Bot):
     async def on_guild_join(self, guild: discord.Guild):
         """Bot yeni sunucuya eklendiğinde çalışır"""
         log.info(f"Yeni sunucuya katıldı: {guild.name} (ID: {guild.id})")
+        self.stats.guild_added(guild.id, guild.member_count)
+    
+    async def on_guild_available(self, guild: discord.Guild):
+        """Sunucu (yeniden) erişilebilir oldu - üye sayısını tazele"""
+        self.stats.guild_added(guild.id, guild.member_count)
     
     async def on_guild_remove(self, guild: discord.Guild):
         """Bot sunucudan ayrıldığında çalışır"""
         log.info(f"Sunucudan ayrıldı: {guild.name} (ID: {guild.id})")
+        self.stats.guild_removed(guild.id)
+        self.sound_index.forget_guild(guild.id)
         
         # Sunucudaki tüm voice bağlantılarını temizle
         if self.voice_pool:
             await self.voice_pool.disconnect_guild(guild.id)
     
+    async def on_member_join(self, member: discord.Member):
+        """Üye sunucuya katıldı - sunucunun ses listesi yeniden hesaplanacak"""
+        self.stats.members_changed(member.guild.id, 1)
+        self.sound_index.member_changed(member.guild.id)
+    
+    async def on_member_remove(self, member: discord.Member):
+        """Üye sunucudan ayrıldı - sunucunun ses listesi yeniden hesaplanacak"""
+        self.stats.members_changed(member.guild.id, -1)
+        self.sound_index.member_changed(member.guild.id)
+    
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        """Kullanıcı adı değişti - cache'teki eski adı düşür"""
+        self.user_resolver.invalidate(after.id)
+    
     async def on_voice_state_update(
         self,
         member: discord.Member,
@@ -155,6 +494,8 @@ class SesAdamBot(commands.Bot):
         Kullanıcı ses kanalına girdiğinde/çıktığında çalışır.
         Ana işlev: Kullanıcı kanala girdiğinde sesini çal.
         """
+        received = time.monotonic()
+        
         # Bot'un kendi voice state değişikliklerini logla
         if self.user and member.id == self.user.id:
             log.debug(
@@ -180,19 +521,27 @@ class SesAdamBot(commands.Bot):
         
         # Kullanıcı ses kanalına katıldı veya kanal değiştirdi
         if before.channel is None or before.channel.id != after.channel.id:
-            await self._handle_user_join(member, after.channel)
+            await self._handle_user_join(member, after.channel, received)
     
-    async def _handle_user_join(self, member: discord.Member, channel: discord.VoiceChannel):
+    async def _handle_user_join(
+        self,
+        member: discord.Member,
+        channel: discord.VoiceChannel,
+        received: Optional[float] = None,
+    ):
         """Kullanıcı ses kanalına katıldığında sesi kuyruğa ekle"""
         user_id = member.id
         
-        # Kullanıcının ses dosyası var mı kontrol et
-        audio_file = f'{DOWNLOADS_DIR}/{user_id}.webm'
+        # Kullanıcının ses dosyası var mı kontrol et (katalog RAM kopyasından)
+        entry = self.catalog.get(user_id)
         
-        if not os.path.isfile(audio_file):
+        if entry is None:
             log.debug(f"Ses dosyası bulunamadı: user={user_id}")
+            JOINS.labels('no_sound').inc()
             return
         
+        audio_file = entry.path
+        
         log.info(
             f"Kullanıcı ses kanalına katıldı, ses kuyruğa ekleniyor",
             extra={
@@ -204,6 +553,14 @@ class SesAdamBot(commands.Bot):
             }
         )
         
+        trace = self.tracer.start_trace(
+            started=received,
+            user_id=user_id,
+            guild_id=member.guild.id,
+            channel_id=channel.id,
+        )
+        trace.add_span('voice_state_update', received or time.monotonic(), time.monotonic())
+        
         try:
             ffmpeg_path = get_ffmpeg_path()
             
@@ -212,14 +569,21 @@ class SesAdamBot(commands.Bot):
                 user_id=user_id,
                 ffmpeg_path=ffmpeg_path,
                 ffmpeg_options=VOICE_CONFIG.get('ffmpeg_options', '-vn -b:a 96k'),
+                trace=trace,
             )
             
             await self.voice_pool.enqueue_playback(channel, request)
+            self.catalog.mark_played(user_id)
+            JOINS.labels('queued').inc()
             
         except FileNotFoundError as e:
             log.error(f"FFmpeg hatası: {e}")
+            JOINS.labels('error').inc()
+            trace.finish('error')
         except Exception as e:
             log.error(f"Ses kuyruğa ekleme hatası: {e}", exc_info=True)
+            JOINS.labels('error').inc()
+            trace.finish('error')
     
     async def on_error(self, event: str, *args, **kwargs):
         """Genel hata yakalama"""
@@ -229,14 +593,46 @@ class SesAdamBot(commands.Bot):
         """Bot kapatılırken çalışır"""
         log.info("Bot kapatılıyor...")
         
+        # Klasör taşıması bir sonraki açılışta kaldığı yerden devam eder
+        if self._layout_task and not self._layout_task.done():
+            self._layout_task.cancel()
+            await asyncio.gather(self._layout_task, return_exceptions=True)
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        
         # Voice pool'u temizle
         if self.voice_pool:
             await self.voice_pool.cleanup_all()
+            if self.voice_pool.fleet:
+                await self.voice_pool.fleet.close()
+        
+        # Çalışan ingest işleri bir sonraki açılışta yeniden kuyruğa alınır
+        await self.ingest_queue.close()
+        
+        # Kapanışta biten trace'leri diske yaz
+        await self.tracer.close()
+        
+        # Bekleyen katalog yazmalarını bitir
+        await self.catalog.close()
+        await asyncio.to_thread(self.sound_store.close)
+        
+        if self._cluster_stats_task and not self._cluster_stats_task.done():
+            self._cluster_stats_task.cancel()
+        if self.cluster_link:
+            self.cluster_link.close()
+        
+        await self.loop_lag.stop()
+        if self.metrics_server:
+            await self.metrics_server.stop()
         
         await super().close()
         log.info("Bot kapatıldı")
 
 
+class ShardedSesAdamBot(SesAdamBot, commands.AutoShardedBot):
+    """Cluster modu: supervisor'ın verdiği shard aralığını tek süreçte yöneten bot"""
+
+
 # Graceful shutdown
 async def graceful_shutdown(bot: SesAdamBot, signal_name: str):
     """Graceful shutdown handler"""
@@ -255,20 +651,23 @@ def setup_signal_handlers(bot: SesAdamBot, loop: asyncio.AbstractEventLoop):
             )
 
 
-def main():
-    """Ana başlatma fonksiyonu"""
-    # Token kontrolü
-    token = os.getenv('DISCORD_BOT_TOKEN')
-    
-    if not token or token == 'YOUR_DISCORD_BOT_TOKEN_HERE':
-        log.error("DISCORD_BOT_TOKEN ayarlanmamış!")
-        log.error("Lütfen .env dosyasına geçerli bir token girin.")
-        sys.exit(1)
-    
-    log.info("Bot başlatılıyor...")
+def run_bot(
+    token: str,
+    shard_ids: Optional[list[int]] = None,
+    shard_count: Optional[int] = None,
+    cluster_link: Optional[ClusterLink] = None,
+) -> int:
+    """
+    Bot'u bu süreçte çalıştır (tek süreç veya tek cluster).
+    Returns: Süreç çıkış kodu
+    """
+    if cluster_link:
+        log.info(f"Cluster {cluster_link.cluster_id} başlatılıyor: shard'lar={shard_ids}")
     
     # Bot instance oluştur
-    bot = SesAdamBot()
+    bot_class = ShardedSesAdamBot if shard_count is not None else SesAdamBot
+    bot = bot_class(shard_ids=shard_ids, shard_count=shard_count, cluster_link=cluster_link)
+    exit_code = 0
     
     try:
         # Event loop
@@ -287,18 +686,68 @@ def main():
         
     except discord.LoginFailure:
         log.error("Geçersiz bot token!")
-        sys.exit(1)
+        exit_code = EXIT_FATAL
     except KeyboardInterrupt:
         log.info("Keyboard interrupt alındı")
     except Exception as e:
         log.error(f"Beklenmeyen hata: {e}", exc_info=True)
-        sys.exit(1)
+        exit_code = 1
     finally:
         try:
             loop.run_until_complete(bot.close())
             loop.close()
         except:
             pass
+        # Kuyrukta kalan loglar yazılsın (cluster süreçleri atexit çalıştırmadan çıkar)
+        shutdown_logging()
+    
+    return exit_code
+
+
+def main():
+    """Ana başlatma fonksiyonu"""
+    # Logging yapılandır (cluster süreçleri kendi dosyalarını run_cluster'da kurar)
+    setup_logging(
+        log_file=BOT_CONFIG.get('log_file', 'bot.log'),
+        log_level=BOT_CONFIG.get('log_level', 'INFO'),
+        queue_size=BOT_CONFIG.get('log_queue_size', 0),
+        overflow_policy=BOT_CONFIG.get('log_overflow', 'drop_debug'),
+    )
+    
+    # Token kontrolü
+    token = os.getenv('DISCORD_BOT_TOKEN')
+    
+    if not token or token == 'YOUR_DISCORD_BOT_TOKEN_HERE':
+        log.error("DISCORD_BOT_TOKEN ayarlanmamış!")
+        log.error("Lütfen .env dosyasına geçerli bir token girin.")
+        sys.exit(1)
+    
+    log.info("Bot başlatılıyor...")
+    
+    cluster_count = BOT_CONFIG.get('cluster_count', 1)
+    if cluster_count <= 1:
+        exit_code = run_bot(token)
+        sys.exit(1 if exit_code else 0)
+    
+    # Cluster modu: her süreç bir shard aralığını yönetir
+    shard_count = BOT_CONFIG.get('shard_count')
+    if not shard_count:
+        try:
+            shard_count = asyncio.run(fetch_recommended_shards(token))
+        except discord.LoginFailure:
+            log.error("Geçersiz bot token!")
+            sys.exit(1)
+    shard_count = max(shard_count, cluster_count)
+    
+    # Katalog tüm cluster'lardan önce bir kez oluşturulsun (süreçler aynı anda rebuild etmesin)
+    catalog = SoundCatalog(os.path.join(DOWNLOADS_DIR, CATALOG_FILENAME))
+    os.makedirs(DOWNLOADS_DIR, exist_ok=True)
+    if catalog.open_sync():
+        catalog.rebuild_from_disk(DOWNLOADS_DIR)
+    catalog.close_sync()
+    
+    supervisor = ClusterSupervisor(token, cluster_count=cluster_count, shard_count=shard_count)
+    sys.exit(supervisor.run())
 
 
 if __name__ == '__main__':
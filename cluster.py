@@ -0,0 +1,341 @@
+"""
+Cluster - Süreç tabanlı gateway sharding
+Supervisor K süreç başlatır; her süreç bir shard aralığını ve kendi VoicePool'unu yönetir.
+Süreçler arası mesajlar (istatistikler, katalog değişiklikleri) supervisor üzerinden Pipe ile taşınır.
+
+Mesajlar (tuple):
+    cluster -> supervisor : ('stats', dict) | ('sound_changed', user_id)
+    supervisor -> cluster : ('cluster_stats', {cluster_id: dict}) | ('sound_changed', user_id)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Callable, Dict, List, Optional
+
+import discord
+
+from logger_setup import get_logger
+
+log = get_logger('bot.cluster')
+
+# Cluster'ların istatistik gönderme aralığı (saniye)
+STATS_INTERVAL = 15.0
+
+# Çöken cluster'ı yeniden başlatma beklemesi (üstel artar, bu değerle sınırlı)
+RESTART_BACKOFF_BASE = 1.0
+RESTART_BACKOFF_MAX = 60.0
+
+# Bu süre ayakta kalan cluster'ın backoff'u sıfırlanır
+RESTART_STABLE_SECONDS = 120.0
+
+# Yeniden başlatılmaması gereken çıkış kodu (ör. geçersiz token)
+EXIT_FATAL = 78
+
+
+def shard_ranges(shard_count: int, cluster_count: int) -> List[List[int]]:
+    """Shard'ları cluster'lara ardışık ve olabildiğince eşit aralıklarla dağıt"""
+    if cluster_count < 1 or shard_count < cluster_count:
+        raise ValueError(f"Geçersiz dağılım: {shard_count} shard, {cluster_count} cluster")
+
+    per_cluster, extra = divmod(shard_count, cluster_count)
+    ranges = []
+    start = 0
+    for cluster_id in range(cluster_count):
+        size = per_cluster + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def cluster_share(total: int, cluster_id: int, cluster_count: int) -> int:
+    """
+    Host genelindeki bir bütçenin (FFmpeg süreci, ingest worker'ı) bu cluster'a düşen payı.
+    Kalan birimler ilk cluster'lara dağıtılır; her cluster en az 1 alır.
+    """
+    per_cluster, extra = divmod(total, cluster_count)
+    return max(1, per_cluster + (1 if cluster_id < extra else 0))
+
+
+async def fetch_recommended_shards(token: str) -> int:
+    """Discord'un önerdiği shard sayısı (GET /gateway/bot)"""
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, _ = await http.get_bot_gateway()
+        return shards
+    finally:
+        await http.close()
+
+
+class ClusterLink:
+    """
+    Cluster sürecinin supervisor ile bağlantısı.
+    Okuma ayrı bir thread'de yapılır, mesajlar event loop'a call_soon_threadsafe ile iletilir.
+    """
+
+    def __init__(self, cluster_id: int, cluster_count: int, shard_ids: List[int], conn: Connection):
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.shard_ids = shard_ids
+
+        self._conn = conn
+        self._send_lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Supervisor'dan gelen son istatistikler: cluster_id -> dict
+        self.cluster_stats: Dict[int, dict] = {}
+
+    def share(self, total: int) -> int:
+        """Host bütçesinden bu cluster'a düşen pay (bkz. cluster_share)"""
+        return cluster_share(total, self.cluster_id, self.cluster_count)
+
+    def start(self, loop: asyncio.AbstractEventLoop, on_sound_changed: Callable[[int], None]):
+        """Supervisor mesajlarını dinlemeye başla"""
+        def read_loop():
+            while not self._closed:
+                try:
+                    message = self._conn.recv()
+                except (EOFError, OSError):
+                    if not self._closed:
+                        log.error("Supervisor bağlantısı koptu")
+                    return
+
+                kind = message[0]
+                try:
+                    if kind == 'cluster_stats':
+                        loop.call_soon_threadsafe(self.cluster_stats.update, message[1])
+                    elif kind == 'sound_changed':
+                        loop.call_soon_threadsafe(on_sound_changed, message[1])
+                except RuntimeError:
+                    # Event loop kapandı
+                    return
+
+        self._reader = threading.Thread(target=read_loop, name='cluster-link', daemon=True)
+        self._reader.start()
+
+    def send(self, message: tuple):
+        """Supervisor'a mesaj gönder (bağlantı koptuysa sessizce geç)"""
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except (OSError, ValueError):
+                pass
+
+    def publish_stats(self, stats: dict):
+        self.cluster_stats[self.cluster_id] = stats
+        self.send(('stats', stats))
+
+    def sound_changed(self, user_id: int):
+        """Diğer cluster'lara kullanıcının sesinin değiştiğini bildir"""
+        self.send(('sound_changed', user_id))
+
+    def aggregate_stats(self) -> dict:
+        """Tüm cluster'ların son istatistiklerinin toplamı"""
+        totals: Dict[str, float] = {}
+        for stats in self.cluster_stats.values():
+            for name, value in stats.items():
+                if isinstance(value, (int, float)):
+                    totals[name] = totals.get(name, 0) + value
+        totals['clusters_reporting'] = len(self.cluster_stats)
+        return totals
+
+    def close(self):
+        self._closed = True
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+
+
+def run_cluster(
+    cluster_id: int,
+    cluster_count: int,
+    shard_ids: List[int],
+    shard_count: int,
+    conn: Connection,
+    token: str,
+):
+    """Cluster süreci giriş noktası (spawn ile yeni süreçte çalışır)"""
+    # Ctrl+C sadece supervisor'a gitsin; cluster'lar supervisor'ın SIGTERM'i ile kapanır
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from bot import run_bot
+    from config import BOT_CONFIG
+    from logger_setup import setup_logging
+
+    # Her cluster kendi log dosyasına yazar (RotatingFileHandler süreçler arası güvenli değil)
+    root, ext = os.path.splitext(BOT_CONFIG.get('log_file', 'bot.log'))
+    setup_logging(
+        log_file=f'{root}.cluster{cluster_id}{ext}',
+        log_level=BOT_CONFIG.get('log_level', 'INFO'),
+        queue_size=BOT_CONFIG.get('log_queue_size', 0),
+        overflow_policy=BOT_CONFIG.get('log_overflow', 'drop_debug'),
+    )
+
+    link = ClusterLink(cluster_id, cluster_count, shard_ids, conn)
+    raise SystemExit(run_bot(token, shard_ids=shard_ids, shard_count=shard_count, cluster_link=link))
+
+
+class _ClusterProcess:
+    """Supervisor'ın tek bir cluster için tuttuğu durum"""
+
+    def __init__(self, cluster_id: int, shard_ids: List[int]):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.conn: Optional[Connection] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF_BASE
+        self.restart_at: Optional[float] = None
+
+
+class ClusterSupervisor:
+    """
+    Cluster süreçlerini başlatır, çökenleri üstel backoff ile yeniden başlatır
+    ve cluster'lar arası mesajları dağıtır.
+    """
+
+    def __init__(self, token: str, cluster_count: int, shard_count: int):
+        self.token = token
+        self.cluster_count = cluster_count
+        self.shard_count = shard_count
+
+        # fork yerine spawn: cluster'lar supervisor'ın thread/loop durumunu devralmasın
+        self._ctx = multiprocessing.get_context('spawn')
+        self._clusters = [
+            _ClusterProcess(cluster_id, shard_ids)
+            for cluster_id, shard_ids in enumerate(shard_ranges(shard_count, cluster_count))
+        ]
+        self._stats: Dict[int, dict] = {}
+        self._stopping = False
+        self._exit_code = 0
+
+    def run(self) -> int:
+        """Tüm cluster'ları başlat ve kapanana kadar izle (blocking)"""
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._on_signal)
+
+        log.info(f"Cluster supervisor başlatılıyor: {self.cluster_count} cluster, {self.shard_count} shard")
+        for cluster in self._clusters:
+            self._spawn(cluster)
+
+        while not self._stopping:
+            conns = [c.conn for c in self._clusters if c.conn is not None]
+            sentinels = [c.process.sentinel for c in self._clusters if c.process and c.process.is_alive()]
+            for ready in wait(conns + sentinels, timeout=1.0):
+                if isinstance(ready, Connection):
+                    self._receive(ready)
+
+            self._check_processes()
+
+        self._shutdown()
+        return self._exit_code
+
+    def _on_signal(self, signum, frame):
+        log.info(f"Supervisor signal {signal.Signals(signum).name} aldı, cluster'lar kapatılıyor...")
+        self._stopping = True
+
+    def _spawn(self, cluster: _ClusterProcess):
+        parent_conn, child_conn = self._ctx.Pipe(duplex=True)
+        process = self._ctx.Process(
+            target=run_cluster,
+            args=(
+                cluster.cluster_id, self.cluster_count, cluster.shard_ids,
+                self.shard_count, child_conn, self.token,
+            ),
+            name=f'cluster-{cluster.cluster_id}',
+            daemon=False,
+        )
+        process.start()
+        child_conn.close()
+
+        cluster.process = process
+        cluster.conn = parent_conn
+        cluster.started_at = time.monotonic()
+        cluster.restart_at = None
+        log.info(f"Cluster {cluster.cluster_id} başlatıldı: pid={process.pid}, shard'lar={cluster.shard_ids}")
+
+    def _receive(self, conn: Connection):
+        cluster = next((c for c in self._clusters if c.conn is conn), None)
+        if cluster is None:
+            return
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            # Süreç kapandı - _check_processes yeniden başlatır
+            conn.close()
+            cluster.conn = None
+            return
+
+        kind = message[0]
+        if kind == 'stats':
+            self._stats[cluster.cluster_id] = message[1]
+            self._broadcast(('cluster_stats', dict(self._stats)))
+        elif kind == 'sound_changed':
+            self._broadcast(message, exclude=cluster)
+
+    def _broadcast(self, message: tuple, exclude: Optional[_ClusterProcess] = None):
+        for cluster in self._clusters:
+            if cluster is exclude or cluster.conn is None:
+                continue
+            try:
+                cluster.conn.send(message)
+            except (OSError, ValueError):
+                pass
+
+    def _check_processes(self):
+        now = time.monotonic()
+        for cluster in self._clusters:
+            process = cluster.process
+            if process is None:
+                if cluster.restart_at is not None and now >= cluster.restart_at and not self._stopping:
+                    self._spawn(cluster)
+                continue
+            if process.is_alive():
+                continue
+
+            exit_code = process.exitcode
+            process.join()
+            cluster.process = None
+            if cluster.conn is not None:
+                cluster.conn.close()
+                cluster.conn = None
+            self._stats.pop(cluster.cluster_id, None)
+
+            if exit_code == EXIT_FATAL:
+                log.error(f"Cluster {cluster.cluster_id} kurtarılamaz hata ile kapandı, supervisor duruyor")
+                self._exit_code = 1
+                self._stopping = True
+                return
+
+            if now - cluster.started_at >= RESTART_STABLE_SECONDS:
+                cluster.backoff = RESTART_BACKOFF_BASE
+            cluster.restarts += 1
+            cluster.restart_at = now + cluster.backoff
+            log.warning(
+                f"Cluster {cluster.cluster_id} kapandı (exit={exit_code}), "
+                f"{cluster.backoff:.0f}s sonra yeniden başlatılacak"
+            )
+            cluster.backoff = min(cluster.backoff * 2, RESTART_BACKOFF_MAX)
+
+    def _shutdown(self):
+        for cluster in self._clusters:
+            if cluster.process and cluster.process.is_alive():
+                cluster.process.terminate()
+        for cluster in self._clusters:
+            if cluster.process:
+                cluster.process.join(timeout=30)
+                if cluster.process.is_alive():
+                    log.warning(f"Cluster {cluster.cluster_id} kapanmadı, öldürülüyor")
+                    cluster.process.kill()
+                    cluster.process.join()
+            if cluster.conn is not None:
+                cluster.conn.close()
+        log.info("Tüm cluster'lar kapatıldı")
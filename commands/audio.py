@@ -4,15 +4,18 @@ Audio Commands - Ses yükleme ve yönetim komutları
 
 import os
 import asyncio
-from typing import Optional
+from typing import List, Optional
 
 import discord
 from discord import app_commands
 from discord.ext import commands
-import yt_dlp as youtube_dl
 
 from logger_setup import get_logger
-from config import DOWNLOADS_DIR, BOT_CONFIG, get_ffmpeg_path
+from config import DOWNLOADS_DIR, BOT_CONFIG, get_sound_path
+from packet_file import remove_sidecar
+from ingest import IngestError
+from ingest_queue import IngestJob, IngestTicket, QUEUED, RUNNING
+from metrics import UPLOAD_SECONDS
 
 log = get_logger('bot.command.audio')
 
@@ -20,26 +23,8 @@ log = get_logger('bot.command.audio')
 MAX_AUDIO_DURATION = BOT_CONFIG.get('audio_trim_max_seconds', 15)  # saniye
 MAX_FILE_SIZE_MB = BOT_CONFIG.get('max_file_size_mb', 10)
 SUPPORTED_FORMATS = ['.mp3', '.webm', '.mp4', '.m4a', '.wav', '.flac', '.ogg', '.aac', '.wma']
-
-
-async def trim_audio(input_path: str, output_path: str, start_time: float = 0, end_time: float = 15):
-    """Ses dosyasını kırp ve webm formatına dönüştür (async)"""
-    duration = min(end_time - start_time, MAX_AUDIO_DURATION)
-    ffmpeg_path = get_ffmpeg_path()
-    
-    process = await asyncio.create_subprocess_exec(
-        ffmpeg_path, '-y', '-i', input_path,
-        '-ss', str(start_time),
-        '-t', str(duration),
-        '-c:a', 'libopus', '-b:a', '96k', '-vbr', 'on',
-        output_path,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    stdout, stderr = await process.communicate()
-    
-    if process.returncode != 0:
-        raise RuntimeError(f"FFmpeg hatası: {stderr.decode()}")
+SOUND_LIST_PAGE_SIZE = 10
+SOUND_LIST_TIMEOUT = 180.0  # Sayfa butonlarının aktif kalma süresi (saniye)
 
 
 def is_supported_format(filename: str) -> bool:
@@ -52,12 +37,158 @@ def ensure_downloads_dir():
     os.makedirs(DOWNLOADS_DIR, exist_ok=True)
 
 
+class SoundListView(discord.ui.View):
+    """
+    /seslistesi sayfalama.
+    Sahip listesi bir kez alınır; isimler sadece gösterilen sayfa için çözülür.
+    """
+    
+    def __init__(self, bot: commands.Bot, guild: discord.Guild, owners: List[int], author_id: int):
+        super().__init__(timeout=SOUND_LIST_TIMEOUT)
+        self.bot = bot
+        self.guild = guild
+        self.owners = owners
+        self.author_id = author_id
+        self.page = 0
+        self.page_count = max(1, -(-len(owners) // SOUND_LIST_PAGE_SIZE))
+        self.message: Optional[discord.Message] = None
+        self._update_buttons()
+    
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+    
+    async def build_embed(self) -> discord.Embed:
+        start = self.page * SOUND_LIST_PAGE_SIZE
+        page_ids = self.owners[start:start + SOUND_LIST_PAGE_SIZE]
+        
+        # Liste üyelere göre filtreli - isimler çoğunlukla üye cache'inden gelir
+        names = await self.bot.user_resolver.display_names(page_ids, self.guild)
+        
+        lines = []
+        for user_id in page_ids:
+            entry = self.bot.catalog.get(user_id)
+            if entry is None:
+                # Liste açıldıktan sonra silindi
+                continue
+            name = names.get(user_id) or f"Bilinmeyen ({user_id})"
+            duration = f", {entry.duration:.1f}s" if entry.duration else ""
+            lines.append(f"• **{name}**: {entry.size_kb} KB{duration}")
+        
+        embed = discord.Embed(
+            title=f"🎵 Yüklenmiş Sesler - {self.guild.name}",
+            description="\n".join(lines) or "📭 Bu sayfada ses kalmadı.",
+            color=discord.Color.blurple(),
+        )
+        embed.set_footer(text=f"Sayfa {self.page + 1}/{self.page_count} • {len(self.owners)} ses")
+        return embed
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Bu listeyi sadece komutu kullanan kişi gezebilir.", ephemeral=True)
+            return False
+        return True
+    
+    async def _show_page(self, interaction: discord.Interaction, page: int):
+        self.page = max(0, min(page, self.page_count - 1))
+        self._update_buttons()
+        await interaction.response.edit_message(embed=await self.build_embed(), view=self)
+    
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, self.page - 1)
+    
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show_page(interaction, self.page + 1)
+    
+    async def on_timeout(self):
+        # Süre dolunca butonları pasifleştir
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
 class AudioCommands(commands.Cog):
     """Ses yükleme ve yönetim komutları"""
     
     def __init__(self, bot: commands.Bot):
         self.bot = bot
     
+    def _invalidate_audio(self, file_path: str):
+        """Voice pool'daki Opus paket cache'ini düşür (dosya değişti/silindi)"""
+        voice_pool = getattr(self.bot, 'voice_pool', None)
+        if voice_pool:
+            voice_pool.invalidate_audio(file_path)
+    
+    def _ingest_status(self, job: IngestJob) -> str:
+        """Kuyruk durumunun kullanıcıya gösterilecek metni"""
+        if job.status == QUEUED:
+            position = self.bot.ingest_queue.position(job)
+            return f"⏳ Sırada ({position}. iş)..." if position > 1 else "⏳ Sırada..."
+        if job.status == RUNNING:
+            return "⏳ İşleniyor..."
+        return "⏳ Kuruluyor..."
+    
+    async def _wait_ingest(self, interaction: discord.Interaction, ticket: IngestTicket, success: str):
+        """
+        Ingest işini takip et: durum değiştikçe mesajı güncelle, bitince sonucu yaz.
+        Üretim worker sürecinde yapılır; komut sadece ilerlemeyi raporlar.
+        """
+        if ticket.cached:
+            # Aynı klip daha önce üretilmiş - indirme/dönüştürme yapılmadan kuruldu
+            self._record_upload(interaction, 'cached')
+            await interaction.followup.send(f"{success} ⚡")
+            return
+        
+        loop = asyncio.get_running_loop()
+        progress_task: Optional[asyncio.Task] = None
+        
+        def on_progress(job: IngestJob):
+            nonlocal progress_task
+            # Bitiş (done/failed) mesajını aşağıdaki sonuç yazar
+            if job.status not in (QUEUED, RUNNING):
+                return
+            # Henüz gönderilmemiş eski durum yenisiyle geçersiz kalır
+            if progress_task and not progress_task.done():
+                progress_task.cancel()
+            progress_task = loop.create_task(interaction.edit_original_response(content=self._ingest_status(job)))
+            progress_task.add_done_callback(self._on_progress_done)
+        
+        prefix = "🔗 Aynı klip zaten işleniyor, sonuç sizin için de kurulacak.\n" if ticket.coalesced else ""
+        await interaction.followup.send(prefix + self._ingest_status(ticket.job))
+        
+        ticket.job.add_listener(on_progress)
+        try:
+            await ticket.wait()
+        except IngestError:
+            self._record_upload(interaction, 'failed')
+            raise
+        finally:
+            ticket.job.remove_listener(on_progress)
+            # Sonuç mesajı son ilerleme düzenlemesinden sonra yazılmalı (üzerine eski durum binmesin)
+            if progress_task:
+                await asyncio.gather(progress_task, return_exceptions=True)
+        
+        self._record_upload(interaction, 'ok')
+        await interaction.edit_original_response(content=success)
+    
+    @staticmethod
+    def _on_progress_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            log.warning(f"İlerleme mesajı güncellenemedi: {task.exception()}")
+    
+    @staticmethod
+    def _record_upload(interaction: discord.Interaction, result: str):
+        """Komutun gönderilmesinden sonuca kadar geçen süre (kullanıcının beklediği)"""
+        command = interaction.command.name if interaction.command else 'unknown'
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        UPLOAD_SECONDS.labels(command, result).observe(elapsed)
+    
     @app_commands.command(name="sesyukle", description="YouTube'dan ses indir")
     @app_commands.describe(
         url="YouTube video linki",
@@ -92,44 +223,16 @@ class AudioCommands(commands.Cog):
             if end - start > MAX_AUDIO_DURATION:
                 end = start + MAX_AUDIO_DURATION
             
-            temp_output = f'{DOWNLOADS_DIR}/{interaction.user.id}_temp.webm'
-            final_output = f'{DOWNLOADS_DIR}/{interaction.user.id}.webm'
-            
-            # Eski dosyayı sil
-            if os.path.exists(final_output):
-                os.remove(final_output)
-            
-            # YouTube'dan indir
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': temp_output,
-                'noplaylist': True,
-                'max_filesize': MAX_FILE_SIZE_MB * 1024 * 1024,
-                'no_warnings': True,
-                'quiet': True,
-                'cookiefile': 'cookies.txt',
-            }
-            
-            await interaction.followup.send("⏳ İndiriliyor...")
-            
-            def _download():
-                with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-                    ydl.extract_info(url, download=True)
-            
-            await asyncio.to_thread(_download)
-            
-            # Sesi kırp
-            await trim_audio(temp_output, final_output, start_time=start, end_time=end)
-            
-            # Geçici dosyayı sil
-            if os.path.exists(temp_output):
-                os.remove(temp_output)
-            
-            log.info(f"Ses başarıyla yüklendi: user={interaction.user.id}")
-            await interaction.edit_original_response(
-                content=f"✅ Ses başarıyla yüklendi! ({start:.1f}s - {end:.1f}s arası)"
+            ticket = await self.bot.ingest_queue.submit(
+                'url', url, start, end - start, interaction.user.id,
+            )
+            await self._wait_ingest(
+                interaction, ticket, f"✅ Ses başarıyla yüklendi! ({start:.1f}s - {end:.1f}s arası)",
             )
+            log.info(f"Ses başarıyla yüklendi: user={interaction.user.id}")
             
+        except IngestError as e:
+            await interaction.edit_original_response(content=f"❌ İndirme hatası: {str(e)[:100]}")
         except Exception as e:
             log.error(f"sesyukle hatası: {e}", exc_info=True)
             await interaction.followup.send(f"❌ İndirme hatası: {str(e)[:100]}")
@@ -175,30 +278,23 @@ class AudioCommands(commands.Cog):
             start = 0 if start_time is None else float(start_time)
             end = MAX_AUDIO_DURATION if end_time is None else float(end_time)
             
-            # Dosya uzantısını al
-            ext = os.path.splitext(attachment.filename)[1]
-            temp_input = f'{DOWNLOADS_DIR}/{interaction.user.id}_temp_input{ext}'
-            final_output = f'{DOWNLOADS_DIR}/{interaction.user.id}.webm'
-            
-            # Eski dosyayı sil
-            if os.path.exists(final_output):
-                os.remove(final_output)
-            
-            # Dosyayı kaydet
-            await attachment.save(temp_input)
-            
-            # Sesi kırp ve dönüştür
-            await trim_audio(temp_input, final_output, start_time=start, end_time=end)
-            
-            # Geçici dosyayı sil
-            if os.path.exists(temp_input):
-                os.remove(temp_input)
+            # Süre kontrolü
+            if end - start > MAX_AUDIO_DURATION:
+                end = start + MAX_AUDIO_DURATION
             
-            log.info(f"Dosya başarıyla yüklendi: user={interaction.user.id}, file={attachment.filename}")
-            await interaction.followup.send(
-                f"✅ **{attachment.filename}** başarıyla yüklendi! ({start:.1f}s - {end:.1f}s)"
+            # Ek worker sürecinde CDN yanıtından doğrudan FFmpeg'e akıtılır (boyut sınırıyla)
+            ticket = await self.bot.ingest_queue.submit(
+                'attachment', attachment.url, start, end - start, interaction.user.id,
+                filename=attachment.filename,
             )
+            await self._wait_ingest(
+                interaction, ticket,
+                f"✅ **{attachment.filename}** başarıyla yüklendi! ({start:.1f}s - {end:.1f}s)",
+            )
+            log.info(f"Dosya başarıyla yüklendi: user={interaction.user.id}, file={attachment.filename}")
             
+        except IngestError as e:
+            await interaction.edit_original_response(content=f"❌ Dosya işlenirken hata: {str(e)[:100]}")
         except Exception as e:
             log.error(f"dosyaekle hatası: {e}", exc_info=True)
             await interaction.followup.send(f"❌ Dosya işlenirken hata: {str(e)[:100]}")
@@ -215,11 +311,19 @@ class AudioCommands(commands.Cog):
             }
         )
         
-        file_path = f'{DOWNLOADS_DIR}/{interaction.user.id}.webm'
+        # Katalogdaki yol (klasör düzeni taşıması sürerken eski yerde olabilir)
+        entry = self.bot.catalog.get(interaction.user.id)
+        file_path = entry.path if entry else get_sound_path(interaction.user.id)
         
         if os.path.exists(file_path):
             try:
                 os.remove(file_path)
+                remove_sidecar(file_path)
+                self._invalidate_audio(file_path)
+                entry = await self.bot.catalog.remove_sound(interaction.user.id)
+                # Son referans buysa depodaki ortak nesne de silinir
+                if entry:
+                    await self.bot.release_sound_object(entry.content_hash)
                 log.info(f"Ses silindi: user={interaction.user.id}")
                 await interaction.followup.send("✅ Ses dosyanız başarıyla kaldırıldı.")
             except Exception as e:
@@ -240,89 +344,48 @@ class AudioCommands(commands.Cog):
             }
         )
         
-        if not os.path.exists(DOWNLOADS_DIR):
-            await interaction.followup.send("📭 Henüz hiç ses dosyası yüklenmemiş.")
+        if interaction.guild is None:
+            await interaction.followup.send("⚠️ Bu komut sadece sunucularda kullanılabilir.")
             return
         
-        files = os.listdir(DOWNLOADS_DIR)
-        webm_files = [f for f in files if f.endswith('.webm') and not f.endswith('_temp.webm')]
-        
-        if not webm_files:
-            await interaction.followup.send("📭 Henüz hiç ses dosyası yüklenmemiş.")
+        # Sadece bu sunucunun üyelerinin sesleri (indeks katalog/üyelik değişene kadar cache'li)
+        owners = self.bot.sound_index.owners(interaction.guild)
+        if not owners:
+            await interaction.followup.send("📭 Bu sunucuda henüz hiç ses dosyası yüklenmemiş.")
             return
         
-        # Kullanıcı bilgilerini al (cache-first, sonra toplu fetch)
-        user_ids = []
-        for filename in webm_files:
-            user_id_str = filename.replace('.webm', '')
-            try:
-                user_ids.append(int(user_id_str))
-            except ValueError:
-                user_ids.append(None)
-        
-        # Cache'den çözümlenemeyenleri toplu fetch et
-        async def resolve_user(uid):
-            if uid is None:
-                return None
-            user = self.bot.get_user(uid)
-            if user:
-                return user
-            try:
-                return await self.bot.fetch_user(uid)
-            except Exception:
-                return None
-        
-        users = await asyncio.gather(*(resolve_user(uid) for uid in user_ids))
-        
-        user_files = []
-        for filename, uid, user in zip(webm_files, user_ids, users):
-            username = user.display_name if user else f"Bilinmeyen ({uid})"
-            
-            file_path = os.path.join(DOWNLOADS_DIR, filename)
-            file_size = os.path.getsize(file_path)
-            file_size_kb = round(file_size / 1024, 1)
-            
-            user_files.append(f"• **{username}**: {file_size_kb} KB")
-        
-        message = "🎵 **Yüklenmiş Sesler:**\n\n" + "\n".join(user_files)
-        
-        # Uzun mesajları böl
-        if len(message) > 2000:
-            chunks = [message[i:i+1900] for i in range(0, len(message), 1900)]
-            for chunk in chunks:
-                await interaction.followup.send(chunk)
-        else:
-            await interaction.followup.send(message)
+        view = SoundListView(self.bot, interaction.guild, owners, interaction.user.id)
+        if view.page_count == 1:
+            await interaction.followup.send(embed=await view.build_embed())
+            return
+        view.message = await interaction.followup.send(embed=await view.build_embed(), view=view, wait=True)
     
     @app_commands.command(name="botstatus", description="Bot durumunu göster")
     async def botstatus(self, interaction: discord.Interaction):
         """Bot durumunu ve istatistikleri göster"""
         await interaction.response.defer()
         
-        # Bot istatistikleri
-        guild_count = len(self.bot.guilds)
-        user_count = sum(g.member_count or 0 for g in self.bot.guilds)
-        
-        # Voice pool istatistikleri (varsa)
+        # Artımlı tutulan istatistiklerin anlık görüntüsü (hiçbir şey baştan sayılmaz)
+        snapshot = self.bot.stats.snapshot()
+        gauges = snapshot['gauges']
+        guild_count = snapshot['guilds']
+        user_count = snapshot['users']
+        total_sessions = gauges.get('sessions') or 0
+        total_playing = gauges.get('playing') or 0
         voice_pool = getattr(self.bot, 'voice_pool', None)
-        if voice_pool:
-            total_sessions = voice_pool.total_sessions
-            total_playing = voice_pool.total_playing
-        else:
-            total_sessions = 0
-            total_playing = 0
         
-        # Ses dosyası sayısı
-        audio_count = 0
-        if os.path.exists(DOWNLOADS_DIR):
-            audio_count = len([f for f in os.listdir(DOWNLOADS_DIR) if f.endswith('.webm')])
+        # Cluster modunda tüm süreçlerin toplamı (supervisor üzerinden gelen son değerler)
+        cluster_link = getattr(self.bot, 'cluster_link', None)
+        if cluster_link:
+            cluster_link.cluster_stats[cluster_link.cluster_id] = self.bot.cluster_stats_snapshot()
+            totals = cluster_link.aggregate_stats()
+            guild_count = int(totals.get('guilds', 0))
+            user_count = int(totals.get('users', 0))
+            total_sessions = int(totals.get('sessions', 0))
+            total_playing = int(totals.get('playing', 0))
         
-        # FFmpeg durumu
-        try:
-            get_ffmpeg_path()
-            ffmpeg_status = "✅ Yüklü"
-        except FileNotFoundError:
-            ffmpeg_status = "❌ Bulunamadı"
+        audio_count = gauges.get('sounds') or 0
+        ffmpeg_status = "✅ Yüklü" if self.bot.ffmpeg_available else "❌ Bulunamadı"
 
         embed = discord.Embed(
             title="🤖 Bot Durumu",
@@ -336,6 +399,47 @@ class AudioCommands(commands.Cog):
         embed.add_field(name="🏓 Gecikme", value=f"{round(self.bot.latency * 1000)}ms", inline=True)
         embed.add_field(name="📼 FFmpeg", value=ffmpeg_status, inline=True)
         
+        ffmpeg_stats = self.bot.ffmpeg_scheduler.stats()
+        embed.add_field(
+            name="🎛️ FFmpeg Süreç",
+            value=f"{ffmpeg_stats['active']}/{ffmpeg_stats['max_processes']} aktif, "
+                  f"{ffmpeg_stats['waiting']} bekliyor",
+            inline=True,
+        )
+        
+        join_latency = snapshot['latency'].get('join_to_play_ms')
+        if join_latency and join_latency['count']:
+            embed.add_field(
+                name="⏱️ Join → Çalma",
+                value=f"p50 {join_latency['p50']:.0f}ms, p99 {join_latency['p99']:.0f}ms",
+                inline=True,
+            )
+        embed.add_field(
+            name="📥 Kuyruk",
+            value=f"{gauges.get('queue_depth') or 0} çalma, {gauges.get('ingest_queued') or 0} yükleme",
+            inline=True,
+        )
+        embed.add_field(
+            name="💾 Cache İsabeti",
+            value=f"opus %{(gauges.get('opus_cache_hit_rate') or 0) * 100:.0f}, "
+                  f"kullanıcı %{(gauges.get('user_cache_hit_rate') or 0) * 100:.0f}",
+            inline=True,
+        )
+        
+        if cluster_link:
+            embed.add_field(
+                name="🧩 Cluster",
+                value=f"{totals['clusters_reporting']}/{cluster_link.cluster_count} aktif, "
+                      f"bu: #{cluster_link.cluster_id} ({len(cluster_link.shard_ids)} shard)",
+                inline=True,
+            )
+        
+        if voice_pool and voice_pool.fleet:
+            workers = voice_pool.fleet.stats()
+            ready = sum(1 for w in workers if w['ready'])
+            load = sum(w['load'] for w in workers)
+            embed.add_field(name="🤖 Voice Worker", value=f"{ready}/{len(workers)} hazır, {load} bağlantı", inline=True)
+        
         await interaction.followup.send(embed=embed)
 
 
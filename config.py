@@ -8,9 +8,12 @@ import shutil
 import functools
 from typing import Dict, Any, Optional
 
+from storage_layout import sound_path
+
 # Bot yapılandırması
 BOT_CONFIG: Dict[str, Any] = {
     'token_env_var': 'DISCORD_BOT_TOKEN',
+    'worker_tokens_env_var': 'DISCORD_WORKER_TOKENS',  # Fleet modu: virgülle ayrılmış ek bot token'ları
     'command_prefix': '/',
     'max_file_size_mb': 10,
     'audio_trim_max_seconds': 15,
@@ -18,13 +21,24 @@ BOT_CONFIG: Dict[str, Any] = {
     'guild_ready_timeout': 5.0,
     'log_level': os.getenv('LOG_LEVEL', 'INFO'),
     'log_file': os.getenv('LOG_FILE', 'bot.log'),
+    # Log kuyruğu: yazım ayrı thread'de (0 ise senkron); dolunca önce DEBUG kayıtları düşer
+    'log_queue_size': int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+    'log_overflow': os.getenv('LOG_OVERFLOW', 'drop_debug'),  # drop_debug, drop_info, drop_new
+    # Cluster modu: >1 ise shard'lar bu kadar sürece bölünür
+    'cluster_count': int(os.getenv('CLUSTER_COUNT', '1')),
+    'shard_count': int(os.getenv('SHARD_COUNT', '0')) or None,  # Boşsa Discord'un önerisi
+    # Kullanıcı adı cache'i (/seslistesi vb.)
+    'user_cache_size': 10000,
+    'user_cache_ttl': 3600.0,           # saniye
+    'user_cache_negative_ttl': 600.0,   # Silinmiş kullanıcılar için
+    'user_fetch_concurrency': 2,        # Eşzamanlı fetch_user isteği
 }
 
 # Voice connection ayarları - Çoklu kanal desteği
 VOICE_CONFIG: Dict[str, Any] = {
     # Çoklu bağlantı ayarları
     'max_sessions_per_guild': 5,  # Sunucu başına maksimum eşzamanlı ses kanalı
-    'session_timeout': 60.0,       # Idle session timeout (saniye)
+    'session_timeout': 60.0,       # Idle session timeout (saniye) - kuyruk worker'ı lingerdeyken uygulanmaz
     'connection_timeout': 15.0,    # Bağlantı timeout
     'max_retries': 3,              # Bağlantı retry sayısı
     
@@ -32,11 +46,64 @@ VOICE_CONFIG: Dict[str, Any] = {
     'ffmpeg_options': '-vn -b:a 96k',
     'audio_quality': '96k',
     'max_playback_time': 30,  # saniye
+    'opus_cache_max_mb': 64,  # Demux edilmiş Opus paket cache limiti (MB)
+    
+    # Linger ayarları - boşta kalan bağlantıyı sıcak tutma
+    'max_total_sessions': 100,     # Global session bütçesi (linger baskı hesabı için)
+    'linger_base_seconds': 15.0,   # Normal kanallarda bekleme süresi
+    'linger_max_seconds': 60.0,    # Yoğun kanallarda maksimum bekleme süresi
+    'linger_rate_window': 300.0,   # Join hızı ölçüm penceresi (saniye)
+    'linger_high_join_rate': 4.0,  # Bu hızın üstünde kanal "sıcak" olur (join/dakika)
+    'linger_low_join_rate': 1.0,   # Bu hızın altına düşünce normale döner (join/dakika)
+    'linger_pressure_ratio': 0.8,  # Bütçe doluluğu bu oranı geçince hemen kapat
+    
+    # Kanal kuyruğu ayarları - join fırtınalarında kuyruk ve yayın süresi sınırı
+    'queue_max_size': 10,          # Kanal başına bekleyen maksimum istek
+    'queue_drop_departed': True,   # Sırası geldiğinde kanaldan ayrılmışsa atla
+    'queue_dedupe': True,          # Aynı kullanıcının tekrar eden join'lerini birleştir
+    'storm_threshold': 5,          # Bu kadar bekleyen istek varsa fırtına modu
+    'storm_mode': 'shorten',       # 'shorten' (kısalt) veya 'sample' (örnekle)
+    'storm_clip_seconds': 3.0,     # shorten modunda ses süresi
+    'storm_sample_every': 3,       # sample modunda her N istekten biri çalınır
+    
+    # Mixer - aynı kanaldaki sesleri sıra beklemeden birlikte çal
+    'mixer_enabled': False,
+    'mixer_max_voices': 4,         # Aynı anda karıştırılan maksimum ses
     
     # Cleanup ayarları
     'cleanup_interval': 30,  # saniye
 }
 
+# FFmpeg süreç bütçesi - tüm çalma / ingest süreçleri için ortak limit
+# (host geneli: cluster modunda cluster'lara bölünür, her cluster en az 1 alır)
+FFMPEG_CONFIG: Dict[str, Any] = {
+    'max_processes': int(os.getenv('FFMPEG_MAX_PROCESSES', '0')) or max(2, os.cpu_count() or 2),
+    'playback_reserve': 1,  # Sadece canlı join çalmaya ayrılan slot sayısı
+}
+
+# Ingest kuyruğu - /sesyukle ve /dosyaekle işleri ayrı worker süreçlerinde üretilir
+# (max_workers host geneli: cluster modunda cluster'lara bölünür, her cluster en az 1 alır)
+INGEST_CONFIG: Dict[str, Any] = {
+    'max_workers': int(os.getenv('INGEST_WORKERS', '2')),  # Eşzamanlı ingest süreci
+    'work_dirname': 'ingest',  # DOWNLOADS_DIR/tmp altında ara çıktı klasörü
+}
+
+# Prometheus metrik uç noktası (port 0 ise kapalı; cluster modunda port + cluster_id)
+METRICS_CONFIG: Dict[str, Any] = {
+    'port': int(os.getenv('METRICS_PORT', '0')),
+    'host': os.getenv('METRICS_HOST', '127.0.0.1'),
+    'loop_lag_interval': 0.5,  # Event loop gecikmesi ölçüm aralığı (saniye)
+}
+
+# Join tracing - aşama bazlı süreler JSONL dosyasına (örnekleme 0 ise kapalı)
+TRACE_CONFIG: Dict[str, Any] = {
+    'sample_rate': float(os.getenv('TRACE_SAMPLE_RATE', '0')),  # 0.01 = join'lerin %1'i
+    'slow_ms': float(os.getenv('TRACE_SLOW_MS', '3000')),  # Bundan yavaş join'ler her zaman yazılır
+    'file': os.getenv('TRACE_FILE', 'traces.jsonl'),
+    'max_bytes': 10 * 1024 * 1024,
+    'backup_count': 3,
+}
+
 # Dosya uzantıları
 SUPPORTED_AUDIO_FORMATS = [
     '.mp3', '.webm', '.mp4', '.m4a', '.wav',
@@ -60,6 +127,11 @@ else:
     DOWNLOADS_DIR = os.getenv('DOWNLOADS_DIR', 'downloads')
 
 
+def get_sound_path(user_id: int) -> str:
+    """Kullanıcının ses dosyası yolu (sounds/ab/cd/<user_id>.webm - klasör listelemeden)"""
+    return sound_path(DOWNLOADS_DIR, user_id)
+
+
 def get_token() -> str:
     """Bot token'ını environment variable'dan al"""
     token = os.getenv(BOT_CONFIG['token_env_var'])
@@ -0,0 +1,161 @@
+"""
+FFmpeg Scheduler - Global FFmpeg süreç bütçesi ve öncelikli sıra
+Canlı join çalma, ingest dönüşümlerinden; ingest de toplu işlerden önce slot alır
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from logger_setup import get_logger
+
+log = get_logger('bot.ffmpeg_scheduler')
+
+
+class Priority(IntEnum):
+    """Küçük değer önce çalışır"""
+    PLAYBACK = 0  # Canlı join sesi (FFmpeg fallback)
+    INGEST = 1    # /sesyukle, /dosyaekle dönüşümleri
+    BATCH = 2     # Toplu / arka plan işleri
+
+
+class _WaitStats:
+    """Bir öncelik sınıfının bekleme istatistikleri"""
+
+    __slots__ = ('acquired', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.acquired += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class FFmpegScheduler:
+    """
+    Eşzamanlı FFmpeg süreçlerini sınırlayan öncelikli semafor.
+    Bekleyenler (öncelik, geliş sırası) ile sıralanır: aynı sınıf içinde FIFO.
+    playback_reserve kadar slot sadece PLAYBACK'e açıktır - ingest patlaması canlı çalmayı aç bırakmaz.
+    """
+
+    def __init__(self, max_processes: int = 4, playback_reserve: int = 1):
+        if max_processes < 1:
+            raise ValueError("max_processes en az 1 olmalı")
+        self.max_processes = max_processes
+        self.playback_reserve = min(playback_reserve, max_processes - 1)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        self._active: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._waiting: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._wait_stats: Dict[Priority, _WaitStats] = {p: _WaitStats() for p in Priority}
+        self.peak_active = 0
+
+    @property
+    def active(self) -> int:
+        """Şu an çalışan FFmpeg süreci sayısı"""
+        return sum(self._active.values())
+
+    @property
+    def waiting(self) -> int:
+        """Slot bekleyen istek sayısı"""
+        return sum(self._waiting.values())
+
+    def _limit_for(self, priority: Priority) -> int:
+        if priority == Priority.PLAYBACK:
+            return self.max_processes
+        return self.max_processes - self.playback_reserve
+
+    def _grant(self, priority: Priority, waited: float):
+        self._active[priority] += 1
+        self._wait_stats[priority].record(waited)
+        self.peak_active = max(self.peak_active, self.active)
+
+    async def acquire(self, priority: Priority):
+        """Slot al (gerekirse sırayı bekle)"""
+        self._loop = asyncio.get_running_loop()
+
+        future = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), time.monotonic(), future))
+        self._waiting[priority] += 1
+        self._dispatch()
+        if future.done():
+            return
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot verildi ama bekleyen iptal edildi - geri bırak
+                self.release(priority)
+            else:
+                self._waiting[priority] -= 1
+                future.cancel()
+            raise
+
+    def release(self, priority: Priority):
+        """Slotu bırak ve sıradaki bekleyene ver (event loop thread'inde çağrılmalı)"""
+        self._active[priority] -= 1
+        self._dispatch()
+
+    def release_threadsafe(self, priority: Priority):
+        """Player thread gibi başka bir thread'den slotu bırak"""
+        try:
+            self._loop.call_soon_threadsafe(self.release, priority)
+        except RuntimeError:
+            # Event loop kapanmış (shutdown)
+            pass
+
+    def _dispatch(self):
+        waiters = self._waiters
+        while waiters:
+            priority, _, enqueued_at, future = waiters[0]
+            if future.cancelled():
+                heapq.heappop(waiters)
+                continue
+            # Baştaki sığmıyorsa arkadakiler de sığmaz (aynı veya daha düşük öncelik)
+            if self.active >= self._limit_for(Priority(priority)):
+                return
+            heapq.heappop(waiters)
+            self._waiting[priority] -= 1
+            self._grant(Priority(priority), time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority):
+        """async with scheduler.slot(Priority.INGEST): ... FFmpeg çalıştır"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self) -> dict:
+        """Aktif/bekleyen süreç sayıları ve sınıf bazlı bekleme süreleri"""
+        classes = {}
+        for priority in Priority:
+            wait = self._wait_stats[priority]
+            classes[priority.name.lower()] = {
+                'active': self._active[priority],
+                'waiting': self._waiting[priority],
+                'acquired': wait.acquired,
+                'avg_wait_ms': round(wait.total_wait / wait.acquired * 1000, 1) if wait.acquired else 0.0,
+                'max_wait_ms': round(wait.max_wait * 1000, 1),
+            }
+        return {
+            'max_processes': self.max_processes,
+            'active': self.active,
+            'waiting': self.waiting,
+            'peak_active': self.peak_active,
+            'classes': classes,
+        }
@@ -0,0 +1,68 @@
+"""
+Guild Sound Index - Sunucu bazlı ses sahipleri indeksi
+/seslistesi için "bu sunucudaki ses sahibi üyeler" listesi; katalog veya sunucu
+üyeliği değişene kadar cache'ten döner
+"""
+
+from typing import Dict, List, Tuple
+
+import discord
+
+from logger_setup import get_logger
+from sound_catalog import SoundCatalog
+
+log = get_logger('bot.guild_sound_index')
+
+
+class GuildSoundIndex:
+    """
+    guild_id -> ses sahibi üye id'leri (sıralı).
+    Geçerlilik sürüm numaralarıyla kontrol edilir: katalog değişince tüm sunucular,
+    üye girip çıkınca sadece o sunucu yeniden hesaplanır (ilk sorguda, lazy).
+    """
+
+    def __init__(self, catalog: SoundCatalog):
+        self.catalog = catalog
+
+        # guild_id -> (katalog sürümü, üyelik sürümü, sahipler)
+        self._cache: Dict[int, Tuple[int, int, List[int]]] = {}
+        self._member_versions: Dict[int, int] = {}
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+
+    def member_changed(self, guild_id: int):
+        """Sunucuya üye girdi/çıktı"""
+        self._member_versions[guild_id] = self._member_versions.get(guild_id, 0) + 1
+
+    def forget_guild(self, guild_id: int):
+        """Bot sunucudan ayrıldı"""
+        self._cache.pop(guild_id, None)
+        self._member_versions.pop(guild_id, None)
+
+    def owners(self, guild: discord.Guild) -> List[int]:
+        """Sunucudaki ses sahibi üyeler (kayıt tarihine göre eskiden yeniye)"""
+        catalog_version = self.catalog.version
+        member_version = self._member_versions.get(guild.id, 0)
+
+        cached = self._cache.get(guild.id)
+        if cached and cached[0] == catalog_version and cached[1] == member_version:
+            self.hits += 1
+            return cached[2]
+
+        self.misses += 1
+        owners = self._build(guild)
+        self._cache[guild.id] = (catalog_version, member_version, owners)
+        return owners
+
+    def _build(self, guild: discord.Guild) -> List[int]:
+        # Küçük taraf üzerinden kesişim: az üyeli sunucuda üyeleri, büyükte sesleri tara
+        if len(guild.members) <= self.catalog.count:
+            entries = [self.catalog.get(m.id) for m in guild.members]
+            entries = [e for e in entries if e is not None]
+        else:
+            entries = [e for e in self.catalog.entries() if guild.get_member(e.user_id) is not None]
+
+        entries.sort(key=lambda e: (e.created_at, e.user_id))
+        return [e.user_id for e in entries]
@@ -0,0 +1,338 @@
+"""
+Ingest - Ses klibi üretim hattı (indir → kırp → webm/opus → paket dosyası)
+Fonksiyonlar blocking'dir; ingest kuyruğunun worker süreçlerinde çalışır
+"""
+
+import os
+import struct
+import subprocess
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import yt_dlp as youtube_dl
+
+from packet_file import write_sidecar
+
+# Çıktı formatı: Discord'un beklediği 48kHz stereo 20ms frame'ler (paket cache'i doğrudan kullanır)
+_ENCODE_ARGS = (
+    '-vn', '-c:a', 'libopus', '-b:a', '96k', '-vbr', 'on',
+    '-ar', '48000', '-ac', '2', '-frame_duration', '20',
+)
+
+# Uzak kaynakta (HTTP) bağlantı koparsa FFmpeg kaldığı byte'tan devam etsin
+_HTTP_INPUT_ARGS = ('-reconnect', '1', '-reconnect_streamed', '1', '-reconnect_delay_max', '5')
+
+# Tek bir FFmpeg dönüşümünün üst süresi (saniye)
+ENCODE_TIMEOUT = 300
+
+_DOWNLOAD_CHUNK = 64 * 1024
+
+# MP4 ailesi: moov atomu dosyanın sonundaysa FFmpeg pipe üzerinden okuyamaz (seek gerekir)
+_MP4_EXTS = ('.mp4', '.m4a')
+
+# Container türüne karar vermek için okunan baş kısım
+_PEEK_BYTES = 64 * 1024
+
+
+@contextmanager
+def _timed(timings: Optional[Dict[str, float]], stage: str):
+    """Aşama süresini timings'e ekle (metrikler için ana sürece döner)"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.monotonic() - started
+
+
+class IngestError(Exception):
+    """Klip üretilemedi (kullanıcıya gösterilebilir mesaj)"""
+
+
+@dataclass
+class StreamSource:
+    """yt-dlp'nin çözdüğü doğrudan ses akışı"""
+    url: str
+    headers: Dict[str, str]
+    duration: Optional[float]
+
+
+def build_ydl_opts(outtmpl: str, max_bytes: int) -> dict:
+    return {
+        'format': 'bestaudio/best',
+        'outtmpl': outtmpl,
+        'noplaylist': True,
+        'max_filesize': max_bytes,
+        'no_warnings': True,
+        'quiet': True,
+        'cookiefile': 'cookies.txt',
+    }
+
+
+def resolve_stream(url: str, ydl_opts: dict) -> Optional[StreamSource]:
+    """
+    Videonun ses akışının doğrudan URL'ini çöz (indirme yapmaz).
+    Parçalı protokollerde (HLS/DASH) None döner - çağıran tam indirmeye düşer.
+    """
+    with youtube_dl.YoutubeDL({**ydl_opts, 'skip_download': True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+        # Seçilen format: tek format veya ses+video birleşimi ise ses kısmı
+        formats = info.get('requested_formats') or [info]
+        audio = next((f for f in formats if f.get('acodec') not in (None, 'none')), formats[0])
+
+        if audio.get('protocol') not in ('http', 'https') or not audio.get('url'):
+            return None
+
+        headers = dict(audio.get('http_headers') or {})
+        cookiejar = getattr(ydl, 'cookiejar', None)
+        if cookiejar is not None and hasattr(cookiejar, 'get_cookie_header'):
+            cookie = cookiejar.get_cookie_header(audio['url'])
+            if cookie:
+                headers['Cookie'] = cookie
+
+        return StreamSource(url=audio['url'], headers=headers, duration=info.get('duration'))
+
+
+def _check_ffmpeg(returncode: int, stderr: bytes):
+    if returncode != 0:
+        raise IngestError(f"FFmpeg hatası: {stderr.decode(errors='replace')[-500:]}")
+
+
+def encode_clip(ffmpeg_path: str, input_args: List[str], output_path: str):
+    """FFmpeg ile klibi webm/opus'a dönüştür ve yanına paket dosyasını yaz"""
+    try:
+        result = subprocess.run(
+            [ffmpeg_path, '-y', *input_args, *_ENCODE_ARGS, output_path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            timeout=ENCODE_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired as e:
+        raise IngestError("FFmpeg zaman aşımı") from e
+
+    _check_ffmpeg(result.returncode, result.stderr)
+
+    # İkinci çıktı: mmap ile çalınacak hazır Opus paket dosyası
+    write_sidecar(output_path)
+
+
+def trim_file(ffmpeg_path: str, input_path: str, output_path: str, start: float, duration: float):
+    """Yerel dosyadan klip üret"""
+    encode_clip(ffmpeg_path, ['-i', input_path, '-ss', str(start), '-t', str(duration)], output_path)
+
+
+def stream_clip(ffmpeg_path: str, source: StreamSource, output_path: str, start: float, duration: float):
+    """
+    Uzak akıştan sadece istenen aralığı oku ve dönüştür (geçici dosya yok).
+    -ss girişten önce verildiği için FFmpeg container index'i ile hedef konuma
+    HTTP range isteğiyle atlar; videonun geri kalanı indirilmez.
+    """
+    header_block = ''.join(f'{name}: {value}\r\n' for name, value in source.headers.items())
+
+    input_args = list(_HTTP_INPUT_ARGS)
+    if header_block:
+        input_args += ['-headers', header_block]
+    input_args += ['-ss', str(start), '-i', source.url, '-t', str(duration)]
+
+    encode_clip(ffmpeg_path, input_args, output_path)
+
+
+def mp4_needs_seek(head: bytes) -> bool:
+    """
+    MP4/M4A baş kısmındaki üst seviye kutulara bak: moov, mdat'tan önce geliyorsa
+    (faststart) dosya sıralı okunabilir. Belirlenemezse güvenli tarafta kalıp True döner.
+    """
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box = struct.unpack_from('>I4s', head, offset)
+        if box == b'moov':
+            return False
+        if box == b'mdat':
+            return True
+        if size == 1:
+            if offset + 16 > len(head):
+                break
+            size = struct.unpack_from('>Q', head, offset + 8)[0]
+        elif size == 0:
+            # Dosya sonuna kadar süren kutu
+            return True
+        if size < 8:
+            break
+        offset += size
+    return True
+
+
+def _open_url(url: str):
+    request = urllib.request.Request(url, headers={'User-Agent': 'SesAdamBot'})
+    return urllib.request.urlopen(request, timeout=30)
+
+
+def _iter_body(response, head: bytes, max_bytes: int) -> Iterator[bytes]:
+    """Yanıt gövdesini parça parça oku; boyut sınırı aşılınca hemen dur"""
+    written = len(head)
+    if written > max_bytes:
+        raise IngestError(f"Dosya çok büyük (>{max_bytes // (1024 * 1024)}MB)")
+    if head:
+        yield head
+    while True:
+        chunk = response.read(_DOWNLOAD_CHUNK)
+        if not chunk:
+            return
+        written += len(chunk)
+        if written > max_bytes:
+            raise IngestError(f"Dosya çok büyük (>{max_bytes // (1024 * 1024)}MB)")
+        yield chunk
+
+
+def pipe_clip(
+    ffmpeg_path: str,
+    chunks: Iterator[bytes],
+    output_path: str,
+    start: float,
+    duration: float,
+):
+    """
+    Girişi FFmpeg'in stdin'ine akıtarak klip üret (diske ara dosya yazılmaz).
+    Klip süresi dolunca FFmpeg girişi kapatır; kalan gövde indirilmez.
+    """
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            [ffmpeg_path, '-y', '-i', 'pipe:0', '-ss', str(start), '-t', str(duration),
+             *_ENCODE_ARGS, output_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        try:
+            for chunk in chunks:
+                try:
+                    process.stdin.write(chunk)
+                except BrokenPipeError:
+                    # FFmpeg istenen aralığı bitirdi
+                    break
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = process.wait(timeout=ENCODE_TIMEOUT)
+        except subprocess.TimeoutExpired as e:
+            raise IngestError("FFmpeg zaman aşımı") from e
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+        stderr.seek(0)
+        _check_ffmpeg(returncode, stderr.read())
+
+    write_sidecar(output_path)
+
+
+def process_url(
+    url: str,
+    start: float,
+    duration: float,
+    output_path: str,
+    ffmpeg_path: str,
+    max_bytes: int,
+    timings: Optional[Dict[str, float]] = None,
+):
+    """YouTube vb. linkten klip üret"""
+    temp_download = f'{output_path}.download'
+    ydl_opts = build_ydl_opts(temp_download, max_bytes)
+
+    # Önce doğrudan akış: sadece istenen aralık indirilir, diske ara dosya yazılmaz
+    with _timed(timings, 'resolve'):
+        stream = resolve_stream(url, ydl_opts)
+    if stream is not None:
+        if stream.duration and start >= stream.duration:
+            raise IngestError(f"Başlangıç zamanı video süresini ({stream.duration:.0f}s) aşıyor")
+        with _timed(timings, 'stream'):
+            stream_clip(ffmpeg_path, stream, output_path, start, duration)
+        return
+
+    # Parçalı akış (HLS/DASH) - tam indirip kırp
+    try:
+        with _timed(timings, 'download'):
+            with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+                ydl.extract_info(url, download=True)
+        with _timed(timings, 'transcode'):
+            trim_file(ffmpeg_path, temp_download, output_path, start, duration)
+    finally:
+        if os.path.exists(temp_download):
+            os.remove(temp_download)
+
+
+def process_attachment(
+    url: str,
+    filename: str,
+    start: float,
+    duration: float,
+    output_path: str,
+    ffmpeg_path: str,
+    max_bytes: int,
+    timings: Optional[Dict[str, float]] = None,
+):
+    """Discord eki (attachment) linkinden klip üret - gövde doğrudan FFmpeg'e akıtılır"""
+    ext = os.path.splitext(filename)[1].lower()
+    with _open_url(url) as response:
+        head = response.read(_PEEK_BYTES)
+
+        if not (ext in _MP4_EXTS and mp4_needs_seek(head)):
+            with _timed(timings, 'stream'):
+                pipe_clip(ffmpeg_path, _iter_body(response, head, max_bytes), output_path, start, duration)
+            return
+
+        # moov sonda: sadece bu durumda geçici dosyaya yazılır
+        temp_input = f'{output_path}.input{ext}'
+        try:
+            with _timed(timings, 'download'):
+                with open(temp_input, 'wb') as f:
+                    for chunk in _iter_body(response, head, max_bytes):
+                        f.write(chunk)
+            with _timed(timings, 'transcode'):
+                trim_file(ffmpeg_path, temp_input, output_path, start, duration)
+        finally:
+            if os.path.exists(temp_input):
+                os.remove(temp_input)
+
+
+def run_job(
+    kind: str,
+    source: str,
+    filename: Optional[str],
+    start: float,
+    duration: float,
+    output_path: str,
+    ffmpeg_path: str,
+    max_bytes: int,
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Worker süreci giriş noktası.
+    Returns: (üretilen klip yolu (yanında .opuspk paket dosyası ile), aşama süreleri)
+    """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    timings: Dict[str, float] = {}
+    try:
+        if kind == 'url':
+            process_url(source, start, duration, output_path, ffmpeg_path, max_bytes, timings)
+        elif kind == 'attachment':
+            process_attachment(source, filename or '', start, duration, output_path, ffmpeg_path, max_bytes, timings)
+        else:
+            raise IngestError(f"Bilinmeyen iş türü: {kind}")
+    except IngestError:
+        raise
+    except Exception as e:
+        # Worker'dan dönen hata pickle edilebilir ve kullanıcıya gösterilebilir olsun
+        raise IngestError(str(e)[:300]) from None
+
+    if not os.path.exists(output_path):
+        raise IngestError("Çıktı dosyası oluşmadı")
+    return output_path, timings
+
@@ -0,0 +1,507 @@
+"""
+Ingest Queue - Kalıcı (SQLite) ses yükleme kuyruğu ve worker süreç havuzu
+İndirme/dönüştürme gateway sürecinin dışında çalışır; aynı (kaynak, başlangıç, süre)
+işleri birleştirilir ve bot yeniden başlasa da yarım kalan işler devam eder
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from logger_setup import get_logger
+from ffmpeg_scheduler import FFmpegScheduler, Priority
+from ingest import IngestError, run_job
+from metrics import INGEST_JOB, INGEST_STAGE
+from packet_file import remove_sidecar
+from sound_store import SoundStore
+
+log = get_logger('bot.ingest_queue')
+
+INGEST_DB_FILENAME = 'ingest.db'
+
+# Bitmiş iş kayıtlarının saklanma süresi (saniye)
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Yeniden başlatmada yarım kalan dosya eki işlerine yazılan hata
+ATTACHMENT_EXPIRED_ERROR = "Bot yeniden başlatıldı, dosya eki bağlantısının süresi doldu. Dosyayı tekrar yükleyin."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key  TEXT    NOT NULL,
+    kind        TEXT    NOT NULL,
+    source      TEXT    NOT NULL,
+    filename    TEXT,
+    start       REAL    NOT NULL,
+    duration    REAL    NOT NULL,
+    status      TEXT    NOT NULL,
+    error       TEXT,
+    created_at  REAL    NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs (status, id);
+CREATE TABLE IF NOT EXISTS ingest_subscribers (
+    job_id   INTEGER NOT NULL,
+    user_id  INTEGER NOT NULL,
+    status   TEXT    NOT NULL,
+    PRIMARY KEY (job_id, user_id)
+);
+"""
+
+# İş durumları
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Abone (kullanıcı) durumları
+PENDING = 'pending'
+INSTALLED = 'installed'
+
+Installer = Callable[[int, str], Awaitable[None]]
+
+
+def dedupe_key(kind: str, source: str, start: float, duration: float) -> str:
+    return f'{kind}|{source}|{start:.3f}|{duration:.3f}'
+
+
+@dataclass
+class IngestJob:
+    """Kuyruktaki tek bir klip üretim işi (birden fazla kullanıcıya kurulabilir)"""
+    id: int
+    kind: str  # 'url' | 'attachment'
+    source: str
+    filename: Optional[str]
+    start: float
+    duration: float
+    status: str = QUEUED
+    error: Optional[str] = None
+
+    # Henüz kurulmamış aboneler (kullanıcı id)
+    pending_users: Set[int] = field(default_factory=set, repr=False)
+    _listeners: List[Callable[['IngestJob'], None]] = field(default_factory=list, repr=False)
+
+    def add_listener(self, callback: Callable[['IngestJob'], None]):
+        """Durum değişince çağrılır (event loop thread'inde)"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[['IngestJob'], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _set_status(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        for callback in list(self._listeners):
+            try:
+                callback(self)
+            except Exception as e:
+                log.error(f"Ingest listener hatası: {e}")
+
+
+@dataclass
+class IngestTicket:
+    """Bir kullanıcının işe aboneliği; sesi kurulunca tamamlanır"""
+    job: IngestJob
+    user_id: int
+    coalesced: bool
+    future: asyncio.Future
+    cached: bool = False  # Klip kaynak cache'inden anında kuruldu
+
+    async def wait(self):
+        """Kullanıcının sesi kurulana kadar bekle (hata olursa IngestError)"""
+        await asyncio.shield(self.future)
+
+
+class IngestQueue:
+    """
+    Kalıcı ingest kuyruğu.
+    İşler SQLite'a yazılır, sırayla (FIFO) ProcessPoolExecutor'da üretilir,
+    sonra her abone kullanıcı için installer ile kurulur.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        work_dir: str,
+        installer: Installer,
+        ffmpeg_path: Callable[[], str],
+        max_workers: int = 2,
+        max_bytes: int = 10 * 1024 * 1024,
+        scheduler: Optional[FFmpegScheduler] = None,
+        store: Optional[SoundStore] = None,
+    ):
+        self.db_path = db_path
+        self.work_dir = work_dir
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+
+        self._installer = installer
+        self._ffmpeg_path = ffmpeg_path
+        self._scheduler = scheduler
+        self._store = store
+
+        # Bağlantı to_thread worker'ları arasında paylaşılır: her çağrı kilit altında
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        # Tamamlanmamış işler: dedupe_key -> job
+        self._inflight: Dict[str, IngestJob] = {}
+        self._pending: Deque[IngestJob] = deque()
+        self._running: Set[asyncio.Task] = set()
+        self._tickets: Dict[Tuple[int, int], asyncio.Future] = {}
+
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # İstatistikler
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    # ---- Açma / kapama ----
+
+    def _open_sync(self) -> List[IngestJob]:
+        os.makedirs(self.work_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+
+        with conn:
+            # Kapanırken yarıda kalan işler baştan üretilir
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING)
+            )
+            # Discord eki URL'leri imzalı ve süreli: yeniden başlatmadan sonra indirilemez
+            expired = conn.execute(
+                "UPDATE ingest_jobs SET status = ?, error = ?, updated_at = ? WHERE status = ? AND kind = ?",
+                (FAILED, ATTACHMENT_EXPIRED_ERROR, time.time(), QUEUED, 'attachment'),
+            ).rowcount
+            cutoff = time.time() - JOB_RETENTION_SECONDS
+            conn.execute(
+                "DELETE FROM ingest_subscribers WHERE job_id IN "
+                "(SELECT id FROM ingest_jobs WHERE status IN (?, ?) AND updated_at < ?)",
+                (DONE, FAILED, cutoff),
+            )
+            conn.execute(
+                "DELETE FROM ingest_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            )
+
+        rows = conn.execute(
+            "SELECT id, kind, source, filename, start, duration FROM ingest_jobs "
+            "WHERE status = ? ORDER BY id", (QUEUED,)
+        ).fetchall()
+        jobs = {row[0]: IngestJob(*row) for row in rows}
+
+        for job_id, user_id in conn.execute(
+            "SELECT s.job_id, s.user_id FROM ingest_subscribers s "
+            "JOIN ingest_jobs j ON j.id = s.job_id WHERE j.status = ? AND s.status = ?",
+            (QUEUED, PENDING),
+        ):
+            jobs[job_id].pending_users.add(user_id)
+
+        if expired:
+            log.warning(f"Ingest kuyruğu: {expired} dosya eki işi süresi dolduğu için iptal edildi")
+
+        with self._lock:
+            self._conn = conn
+        return list(jobs.values())
+
+    async def open(self):
+        """Kuyruğu aç, yarım kalan işleri yükle ve dispatcher'ı başlat"""
+        jobs = await asyncio.to_thread(self._open_sync)
+        for job in jobs:
+            self._inflight[dedupe_key(job.kind, job.source, job.start, job.duration)] = job
+            self._pending.append(job)
+        if jobs:
+            log.info(f"Ingest kuyruğu: {len(jobs)} yarım kalan iş devam edecek")
+
+        # fork yerine spawn: worker'lar event loop / gateway thread'lerini devralmasın
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def close(self):
+        """Dispatcher'ı durdur; çalışan işler bir sonraki açılışta yeniden kuyruğa alınır"""
+        if self._dispatcher and not self._dispatcher.done():
+            self._dispatcher.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._conn:
+            await asyncio.to_thread(self._close_sync)
+
+    def _close_sync(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    # ---- Veritabanı ----
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        """Tek sorguyu kendi transaction'ında çalıştır. Returns: lastrowid (kilit altında okunur)"""
+        with self._lock:
+            with self._conn:
+                return self._conn.execute(sql, params).lastrowid
+
+    def _update_job(self, job: IngestJob, status: str, error: Optional[str] = None):
+        self._execute(
+            "UPDATE ingest_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, error, time.time(), job.id),
+        )
+
+    # ---- İş ekleme ----
+
+    async def submit(
+        self,
+        kind: str,
+        source: str,
+        start: float,
+        duration: float,
+        user_id: int,
+        filename: Optional[str] = None,
+    ) -> IngestTicket:
+        """
+        İşi kuyruğa ekle veya aynı işe abone ol.
+        Returns: Kullanıcının sesi kurulunca tamamlanan ticket
+        """
+        key = dedupe_key(kind, source, start, duration)
+
+        # Aynı klip daha önce üretildiyse indirme/dönüştürme yapmadan kur
+        if kind == 'url' and self._store is not None:
+            ticket = await self._install_cached(key, kind, source, filename, start, duration, user_id)
+            if ticket is not None:
+                return ticket
+
+        job = self._inflight.get(key)
+        coalesced = job is not None
+
+        if job is None:
+            now = time.time()
+            job_id = await asyncio.to_thread(
+                self._execute,
+                "INSERT INTO ingest_jobs (dedupe_key, kind, source, filename, start, duration, "
+                "status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, source, filename, start, duration, QUEUED, now, now),
+            )
+            job = IngestJob(job_id, kind, source, filename, start, duration)
+            self._inflight[key] = job
+            self._pending.append(job)
+            self._wakeup.set()
+        else:
+            self.coalesced += 1
+            log.info(f"Ingest işi birleştirildi: job={job.id}, user={user_id}")
+
+        # Abone ve ticket await'ten önce eklenir: iş bu arada biterse de abone kaçmaz
+        job.pending_users.add(user_id)
+        future = self._tickets.get((job.id, user_id))
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._tickets[(job.id, user_id)] = future
+
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR IGNORE INTO ingest_subscribers (job_id, user_id, status) VALUES (?, ?, ?)",
+            (job.id, user_id, PENDING),
+        )
+        return IngestTicket(job=job, user_id=user_id, coalesced=coalesced, future=future)
+
+    async def _install_cached(
+        self,
+        key: str,
+        kind: str,
+        source: str,
+        filename: Optional[str],
+        start: float,
+        duration: float,
+        user_id: int,
+    ) -> Optional[IngestTicket]:
+        digest = await asyncio.to_thread(self._store.lookup_clip, key)
+        if digest is None:
+            return None
+        try:
+            await self._installer(user_id, self._store.object_path(digest))
+        except Exception as e:
+            # Nesne bu arada silinmiş olabilir - normal işe düş
+            log.warning(f"Cache'teki klip kurulamadı, yeniden üretilecek: {digest} ({e})")
+            return None
+
+        self.cache_hits += 1
+        log.info(f"Klip cache'ten kuruldu: user={user_id}, hash={digest[:12]}")
+        job = IngestJob(0, kind, source, filename, start, duration, status=DONE)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return IngestTicket(job=job, user_id=user_id, coalesced=False, future=future, cached=True)
+
+    def position(self, job: IngestJob) -> int:
+        """Sıradaki konum (1 = sıradaki); çalışıyorsa veya bittiyse 0"""
+        try:
+            return self._pending.index(job) + 1
+        except ValueError:
+            return 0
+
+    # ---- İşleme ----
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                while self._pending and len(self._running) < self.max_workers:
+                    job = self._pending.popleft()
+                    task = asyncio.create_task(self._run(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._on_task_done)
+
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log.error(f"Ingest dispatcher hatası: {e}", exc_info=True)
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        self._wakeup.set()
+
+    async def _run(self, job: IngestJob):
+        output_path = os.path.join(self.work_dir, f'job_{job.id}.webm')
+        await asyncio.to_thread(self._update_job, job, RUNNING)
+        job._set_status(RUNNING)
+
+        try:
+            clip_path = await self._produce(job, output_path)
+            if self._store is not None:
+                clip_path = await asyncio.to_thread(self._store_clip, job, clip_path)
+            await self._install(job, clip_path)
+        except asyncio.CancelledError:
+            # Kapanış - iş RUNNING kalır, açılışta yeniden kuyruğa alınır
+            raise
+        except Exception as e:
+            self._forget(job)
+            error = str(e) if isinstance(e, IngestError) else f"Beklenmeyen hata: {e}"
+            log.error(f"Ingest işi başarısız: job={job.id} ({error})")
+            await asyncio.to_thread(self._fail, job, error)
+            job._set_status(FAILED, error)
+            self.failed += 1
+            job.pending_users.clear()
+            self._resolve_tickets(job, IngestError(error))
+        else:
+            await asyncio.to_thread(self._update_job, job, DONE)
+            job._set_status(DONE)
+            self.completed += 1
+        finally:
+            if job.status in (DONE, FAILED):
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                remove_sidecar(output_path)
+
+    async def _produce(self, job: IngestJob, output_path: str) -> str:
+        """Klibi worker sürecinde üret (INGEST önceliğiyle FFmpeg slotu alarak)"""
+        if self._scheduler:
+            await self._scheduler.acquire(Priority.INGEST)
+        started = time.monotonic()
+        result = 'failed'
+        try:
+            loop = asyncio.get_running_loop()
+            clip_path, timings = await loop.run_in_executor(
+                self._pool, run_job,
+                job.kind, job.source, job.filename, job.start, job.duration,
+                output_path, self._ffmpeg_path(), self.max_bytes,
+            )
+            result = 'ok'
+            for stage, seconds in timings.items():
+                INGEST_STAGE.labels(stage).observe(seconds)
+            return clip_path
+        finally:
+            INGEST_JOB.labels(job.kind, result).observe(time.monotonic() - started)
+            if self._scheduler:
+                self._scheduler.release(Priority.INGEST)
+
+    def _store_clip(self, job: IngestJob, clip_path: str) -> str:
+        """Klibi içerik adresli depoya taşı; URL kaynağını cache'e yaz"""
+        digest = self._store.put(clip_path, move=True)
+        if job.kind == 'url':
+            self._store.remember_clip(dedupe_key(job.kind, job.source, job.start, job.duration), digest)
+        return self._store.object_path(digest)
+
+    async def _install(self, job: IngestJob, clip_path: str):
+        """Klibi işe abone olan her kullanıcı için kur"""
+        # Kurulum sırasında gelen yeni aboneler de (birleştirilmiş istekler) kurulana kadar tekrarla
+        while job.pending_users:
+            await self._install_for(job, job.pending_users.pop(), clip_path)
+
+        # Kontrol ile arasında await yok: bundan sonra gelen istek yeni iş açar
+        self._forget(job)
+
+    async def _install_for(self, job: IngestJob, user_id: int, clip_path: str):
+        try:
+            await self._installer(user_id, clip_path)
+        except Exception as e:
+            log.error(f"Ses kurulamadı: job={job.id}, user={user_id} ({e})", exc_info=True)
+            await asyncio.to_thread(
+                self._execute,
+                "UPDATE ingest_subscribers SET status = ? WHERE job_id = ? AND user_id = ?",
+                (FAILED, job.id, user_id),
+            )
+            self._resolve_ticket(job.id, user_id, IngestError(f"Ses kurulamadı: {e}"))
+            return
+
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE ingest_subscribers SET status = ? WHERE job_id = ? AND user_id = ?",
+            (INSTALLED, job.id, user_id),
+        )
+        self._resolve_ticket(job.id, user_id)
+
+    def _forget(self, job: IngestJob):
+        """İşi birleştirme tablosundan çıkar"""
+        key = dedupe_key(job.kind, job.source, job.start, job.duration)
+        if self._inflight.get(key) is job:
+            del self._inflight[key]
+
+    def _fail(self, job: IngestJob, error: str):
+        self._update_job(job, FAILED, error)
+        self._execute(
+            "UPDATE ingest_subscribers SET status = ? WHERE job_id = ? AND status = ?",
+            (FAILED, job.id, PENDING),
+        )
+
+    def _resolve_ticket(self, job_id: int, user_id: int, error: Optional[Exception] = None):
+        future = self._tickets.pop((job_id, user_id), None)
+        if future is None or future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def _resolve_tickets(self, job: IngestJob, error: Exception):
+        for job_id, user_id in [k for k in self._tickets if k[0] == job.id]:
+            self._resolve_ticket(job_id, user_id, error)
+
+    def stats(self) -> dict:
+        return {
+            'queued': len(self._pending),
+            'running': len(self._running),
+            'completed': self.completed,
+            'failed': self.failed,
+            'coalesced': self.coalesced,
+            'cache_hits': self.cache_hits,
+        }
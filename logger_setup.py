@@ -1,14 +1,29 @@
 """
 Kapsamlı Loglama Sistemi
-Structured logging, renkli console çıktısı ve log rotation
+Structured logging, renkli console çıktısı ve log rotation.
+Kuyruk modunda (queue_size > 0) kayıtlar sınırlı bir kuyruğa bırakılır; dosya ve console
+yazımı (rotation dahil) ayrı bir listener thread'inde yapılır, event loop diske hiç beklemez.
 """
 
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
+
+# Kuyruk dolarken düşürme politikası -> doluluk eşiğinde düşürülen en yüksek seviyenin bir üstü.
+# Kuyruk tamamen dolunca hangi seviyede olursa olsun yeni kayıt düşer (hiçbir zaman beklenmez).
+OVERFLOW_POLICIES = {
+    'drop_debug': logging.INFO,     # Eşikte DEBUG kayıtları düşer
+    'drop_info': logging.WARNING,   # Eşikte DEBUG ve INFO kayıtları düşer
+    'drop_new': logging.NOTSET,     # Sadece kuyruk tamamen dolunca düşürülür
+}
+
+# Düşük seviyeli kayıtların düşürülmeye başlandığı kuyruk doluluğu
+SHED_WATERMARK = 0.75
 
 # Renkli console çıktısı için ANSI kodları
 class Colors:
@@ -53,8 +68,8 @@ class ColoredFormatter(logging.Formatter):
                 module_color = color
                 break
         
-        # Timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Timestamp (kuyruk modunda kayıt sonradan yazılır: oluşturulma zamanı kullanılır)
+        timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S")
         
         # Formatlanmış mesaj
         formatted = (
@@ -75,7 +90,7 @@ class StructuredFormatter(logging.Formatter):
     """Dosya logları için structured formatter"""
     
     def format(self, record: logging.LogRecord) -> str:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        timestamp = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         
         log_entry = {
             'timestamp': timestamp,
@@ -118,6 +133,52 @@ class StructuredFormatter(logging.Formatter):
         return result
 
 
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hiç bloklamayan QueueHandler.
+    Kuyruk eşiği aşınca politikaya göre düşük seviyeli kayıtlar, tamamen dolunca
+    tüm yeni kayıtlar düşürülür ve seviye bazında sayılır.
+    """
+    
+    def __init__(self, log_queue: queue.Queue, overflow_policy: str = 'drop_debug'):
+        super().__init__(log_queue)
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Bilinmeyen log taşma politikası: {overflow_policy}")
+        self.overflow_policy = overflow_policy
+        self.shed_below = OVERFLOW_POLICIES[overflow_policy]
+        self.shed_at = max(1, int(log_queue.maxsize * SHED_WATERMARK))
+        
+        # Seviye adı -> düşürülen kayıt sayısı (emit handler kilidi altında çalışır)
+        self.dropped: Dict[str, int] = {}
+    
+    @property
+    def dropped_total(self) -> int:
+        return sum(self.dropped.values())
+    
+    def _drop(self, record: logging.LogRecord):
+        self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+    
+    def emit(self, record: logging.LogRecord):
+        # Düşürülecek kaydı formatlamaya bile uğraşma
+        if record.levelno < self.shed_below and self.queue.qsize() >= self.shed_at:
+            self._drop(record)
+            return
+        super().emit(record)
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._drop(record)
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Durdurma işareti dolu kuyrukta da yerini bulsun (listener boşaltana kadar bekler)"""
+    
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
 class BotLogger:
     """Bot için merkezi logger yönetimi"""
     
@@ -128,16 +189,27 @@ class BotLogger:
         max_file_size: int = 10 * 1024 * 1024,  # 10 MB
         backup_count: int = 5,
         enable_console: bool = True,
+        queue_size: int = 0,  # > 0 ise kuyruk modu (yazım listener thread'inde)
+        overflow_policy: str = 'drop_debug',
     ):
         self.log_file = Path(log_file)
         self.log_level = getattr(logging, log_level.upper(), logging.INFO)
         self.max_file_size = max_file_size
         self.backup_count = backup_count
         self.enable_console = enable_console
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
         
         # Loggers dictionary
         self._loggers: dict[str, logging.Logger] = {}
         
+        # Kuyruk modu
+        self.queue_handler: Optional[DroppingQueueHandler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        
+        # Bu kurulumun açtığı console/dosya handler'ları
+        self.handlers: list[logging.Handler] = []
+        
         # Root logger ayarla
         self._setup_root_logger()
     
@@ -148,24 +220,39 @@ class BotLogger:
         
         # Mevcut handler'ları temizle
         root_logger.handlers.clear()
+        handlers = self.handlers
         
         # Console handler
         if self.enable_console:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setLevel(self.log_level)
             console_handler.setFormatter(ColoredFormatter())
-            root_logger.addHandler(console_handler)
+            handlers.append(console_handler)
         
         # File handler (rotating)
         file_handler = logging.handlers.RotatingFileHandler(
             self.log_file,
             maxBytes=self.max_file_size,
             backupCount=self.backup_count,
-            encoding='utf-8'
+            encoding='utf-8',
+            delay=True,  # Dosya ilk kayıtta açılır: yeniden yapılandırılan süreç varsayılan dosyaya dokunmaz
         )
         file_handler.setLevel(self.log_level)
         file_handler.setFormatter(StructuredFormatter())
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+        
+        if self.queue_size > 0:
+            # Root'ta sadece kuyruğa bırakan handler; gerçek handler'lar listener thread'inin
+            log_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            self.queue_handler = DroppingQueueHandler(log_queue, self.overflow_policy)
+            root_logger.addHandler(self.queue_handler)
+            self._listener = _QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self._listener.start()
+            # Çıkışta kuyrukta kalanlar yazılsın
+            atexit.register(self.close)
+        else:
+            for handler in handlers:
+                root_logger.addHandler(handler)
         
         # Discord.py loglarını ayarla
         discord_logger = logging.getLogger('discord')
@@ -175,6 +262,41 @@ class BotLogger:
         voice_logger = logging.getLogger('discord.voice_state')
         voice_logger.setLevel(logging.INFO)
     
+    def close(self):
+        """
+        Listener'ı durdur ve kuyrukta kalan kayıtları yaz.
+        Sonraki kayıtlar aynı handler'lara senkron yazılır (kapanış logları kaybolmasın).
+        """
+        if self._listener is None:
+            return
+        listener, self._listener = self._listener, None
+        atexit.unregister(self.close)
+        root_logger = logging.getLogger()
+        root_logger.removeHandler(self.queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            root_logger.addHandler(handler)
+    
+    def release(self):
+        """Yeniden yapılandırmadan önce: listener'ı durdur, handler'ları root'tan çıkar ve kapat"""
+        self.close()
+        root_logger = logging.getLogger()
+        for handler in self.handlers:
+            root_logger.removeHandler(handler)
+            handler.close()
+        self.handlers = []
+    
+    def stats(self) -> dict:
+        """Kuyruk modu istatistikleri (senkron modda boş)"""
+        if self.queue_handler is None:
+            return {}
+        return {
+            'queued': self.queue_handler.queue.qsize(),
+            'queue_size': self.queue_size,
+            'dropped': self.queue_handler.dropped_total,
+            'dropped_by_level': dict(self.queue_handler.dropped),
+        }
+    
     def get_logger(self, name: str) -> logging.Logger:
         """İsimli logger al veya oluştur"""
         if name not in self._loggers:
@@ -221,9 +343,16 @@ def setup_logging(
     log_level: str = "INFO",
     **kwargs
 ) -> BotLogger:
-    """Global logging sistemini kur"""
+    """Global logging sistemini kur (önceki kurulumun handler'ları kapatılır)"""
     global _bot_logger
+    previous = _bot_logger
+    if previous is not None:
+        previous.release()
     _bot_logger = BotLogger(log_file=log_file, log_level=log_level, **kwargs)
+    if previous is not None:
+        # Import sırasında oluşan modül logger'ları yeni seviyeyi alsın
+        for name in previous._loggers:
+            _bot_logger.get_logger(name)
     return _bot_logger
 
 
@@ -232,3 +361,16 @@ def get_logger(name: str) -> logging.Logger:
     if _bot_logger is None:
         setup_logging()
     return _bot_logger.get_logger(name)  # type: ignore
+
+
+def shutdown_logging():
+    """Kuyruk modunda bekleyen kayıtları yaz ve listener thread'ini durdur"""
+    if _bot_logger is not None:
+        _bot_logger.close()
+
+
+def dropped_log_records() -> int:
+    """Kuyruk dolduğu için düşürülen toplam log kaydı"""
+    if _bot_logger is None or _bot_logger.queue_handler is None:
+        return 0
+    return _bot_logger.queue_handler.dropped_total
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Yönetim komutları - Bakım ve migration işlemleri
+Kullanım: python manage.py <komut> [seçenekler]
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from config import DOWNLOADS_DIR, TRACE_CONFIG, ensure_directories
+
+
+def cmd_migrate_packets(args: argparse.Namespace) -> int:
+    """Mevcut tüm .webm sesleri için paket dosyası üret"""
+    from packet_file import migrate_directory
+
+    ensure_directories()
+    result = migrate_directory(args.dir, force=args.force)
+    print(
+        f"Paket dosyası migration tamamlandı: "
+        f"{result['converted']} dönüştürüldü, {result['skipped']} atlandı, "
+        f"{result['failed']} başarısız"
+    )
+    return 0 if result['failed'] == 0 else 1
+
+
+def cmd_rebuild_catalog(args: argparse.Namespace) -> int:
+    """Ses kataloğunu klasördeki dosyalardan yeniden oluştur"""
+    from sound_catalog import SoundCatalog, CATALOG_FILENAME
+
+    ensure_directories()
+    catalog = SoundCatalog(os.path.join(args.dir, CATALOG_FILENAME))
+    catalog.open_sync()
+    try:
+        count = catalog.rebuild_from_disk(args.dir)
+    finally:
+        catalog.close_sync()
+    print(f"Katalog yeniden oluşturuldu: {count} ses")
+    return 0
+
+
+def cmd_migrate_layout(args: argparse.Namespace) -> int:
+    """Düz klasör düzenindeki sesleri hash'li düzene taşı (bot kapalıyken)"""
+    from sound_catalog import SoundCatalog, CATALOG_FILENAME
+    from storage_layout import migrate_flat_layout
+
+    ensure_directories()
+    catalog = SoundCatalog(os.path.join(args.dir, CATALOG_FILENAME))
+    catalog.open_sync()
+    try:
+        result = migrate_flat_layout(args.dir, relocate=catalog.relocate_sync)
+    finally:
+        catalog.close_sync()
+    print(
+        f"Klasör düzeni taşıması: {result['moved']} ses taşındı, {result['failed']} başarısız, "
+        f"{result['temp_removed']} eski geçici dosya silindi"
+    )
+    return 0 if result['failed'] == 0 else 1
+
+
+def _disk_usage(paths) -> int:
+    """Dosyaların diskte kapladığı toplam boyut (hardlink'ler bir kez sayılır)"""
+    seen = set()
+    total = 0
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if (stat.st_dev, stat.st_ino) not in seen:
+            seen.add((stat.st_dev, stat.st_ino))
+            total += stat.st_size
+    return total
+
+
+def cmd_dedupe_sounds(args: argparse.Namespace) -> int:
+    """Mevcut sesleri içerik adresli depoya taşı ve aynı içerikleri hardlink ile birleştir"""
+    from sound_catalog import SoundCatalog, CATALOG_FILENAME
+    from sound_store import SoundStore
+
+    ensure_directories()
+    store = SoundStore(args.dir)
+    store.open()
+    catalog = SoundCatalog(os.path.join(args.dir, CATALOG_FILENAME))
+    catalog.open_sync()
+
+    linked = 0
+    live = set()
+    try:
+        paths = [e.path for e in catalog.entries() if os.path.exists(e.path)]
+        before = _disk_usage(paths + [store.object_path(d) for d in store.iter_objects()])
+
+        for path in paths:
+            digest = store.put(path)
+            live.add(digest)
+            if not os.path.samefile(path, store.object_path(digest)):
+                store.link(digest, path)
+                linked += 1
+        removed = store.collect_garbage(live)
+
+        after = _disk_usage(paths + [store.object_path(d) for d in live])
+    finally:
+        catalog.close_sync()
+        store.close()
+
+    print(
+        f"Depo birleştirme tamamlandı: {linked} ses bağlandı, {len(live)} benzersiz içerik, "
+        f"{removed} yetim nesne silindi ({(before - after) / (1024 * 1024):.1f}MB kazanç)"
+    )
+    return 0
+
+
+def cmd_trace_summary(args: argparse.Namespace) -> int:
+    """Join trace dosyasındaki aşama sürelerinin yüzdelikleri"""
+    import time
+    from tracing import iter_traces, summarize
+
+    traces = iter_traces(args.file)
+    if args.since:
+        cutoff = time.time() - args.since * 60
+        traces = (t for t in traces if t.get('ts', 0) >= cutoff)
+    if args.outcome:
+        traces = (t for t in traces if t.get('outcome') == args.outcome)
+
+    result = summarize(traces)
+    stages = result['stages']
+    if not stages:
+        print(f"Trace bulunamadı: {args.file}")
+        return 1
+
+    print(f"{'aşama':<20} {'adet':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  (ms)")
+    # Toplam en üstte, diğerleri medyana göre büyükten küçüğe
+    order = ['total'] + sorted((n for n in stages if n != 'total'), key=lambda n: -stages[n]['p50'])
+    for name in order:
+        row = stages[name]
+        print(
+            f"{name:<20} {row['count']:>7} {row['p50']:>9.1f} {row['p90']:>9.1f} "
+            f"{row['p99']:>9.1f} {row['max']:>9.1f}"
+        )
+    outcomes = ", ".join(f"{k}={v}" for k, v in sorted(result['outcomes'].items()))
+    print(f"\nSonuçlar: {outcomes}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="SesAdam bot yönetim komutları")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser(
+        'migrate-packets',
+        help="Mevcut .webm sesleri için .opuspk paket dosyalarını üret",
+    )
+    migrate.add_argument('--dir', default=DOWNLOADS_DIR, help="Ses klasörü")
+    migrate.add_argument('--force', action='store_true', help="Güncel olanları da yeniden yaz")
+    migrate.set_defaults(func=cmd_migrate_packets)
+
+    rebuild = subparsers.add_parser(
+        'rebuild-catalog',
+        help="Ses kataloğunu (catalog.db) diskteki dosyalardan yeniden oluştur",
+    )
+    rebuild.add_argument('--dir', default=DOWNLOADS_DIR, help="Ses klasörü")
+    rebuild.set_defaults(func=cmd_rebuild_catalog)
+
+    layout = subparsers.add_parser(
+        'migrate-layout',
+        help="Sesleri düz klasörden sounds/ab/cd/ düzenine taşı (yarıda kalırsa devam eder)",
+    )
+    layout.add_argument('--dir', default=DOWNLOADS_DIR, help="Ses klasörü")
+    layout.set_defaults(func=cmd_migrate_layout)
+
+    dedupe = subparsers.add_parser(
+        'dedupe-sounds',
+        help="Mevcut sesleri içerik adresli depoya taşı, aynı içerikleri birleştir",
+    )
+    dedupe.add_argument('--dir', default=DOWNLOADS_DIR, help="Ses klasörü")
+    dedupe.set_defaults(func=cmd_dedupe_sounds)
+
+    trace = subparsers.add_parser(
+        'trace-summary',
+        help="Join trace dosyasından aşama bazlı gecikme yüzdeliklerini göster",
+    )
+    trace.add_argument('--file', default=TRACE_CONFIG['file'], help="Trace dosyası (döndürülmüş kopyalar dahil okunur)")
+    trace.add_argument('--since', type=float, default=0, help="Sadece son N dakika")
+    trace.add_argument('--outcome', help="Sadece bu sonuçtaki join'ler (ör. played, timeout)")
+    trace.set_defaults(func=cmd_trace_summary)
+
+    return parser
+
+
+def main() -> int:
+    load_dotenv()
+    args = build_parser().parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Metrics - Prometheus metin formatında metrik dışa aktarımı
+Sayaç ve histogramlar event loop thread'inden güncellenir (kilit yok, gözlem başına
+bir bisect + iki toplama). METRICS_PORT verilirse /metrics yerel HTTP'den sunulur;
+verilmezse ölçümler yine toplanır ama dışarı açılmaz.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from logger_setup import get_logger
+
+log = get_logger('bot.metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Varsayılan süre kovaları (saniye): join/connect milisaniyeden onlarca saniyeye
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Ingest (indirme/dönüştürme) daha uzun sürer
+INGEST_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Event loop gecikmesi: sağlıklı loop'ta milisaniye altı
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """Etiket değerlerine göre alt sayaçları tutan metrik ailesi"""
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: {len(self.labelnames)} etiket bekleniyordu")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        # Etiketsiz metrikte tek alt sayaç
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for values, child in self._children.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Sadece artan sayaç"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}']
+
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # Son kova +Inf
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Sabit kovalı histogram (kümülatif sayım sadece dışa aktarırken hesaplanır)"""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(child.sum)}')
+        lines.append(f'{self.name}_count{labels} {child.count}')
+        return lines
+
+
+class Gauge(_Metric):
+    """Dışa aktarılırken okunan değer (sadece ucuz okumalar verin)"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        super().__init__(name, help_text)
+        self._read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self._read())
+        except Exception as e:
+            log.debug(f"Gauge okunamadı: {self.name} ({e})")
+            return []
+        return [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} gauge',
+            f'{self.name} {_format_value(value)}',
+        ]
+
+
+class MetricsRegistry:
+    """Kayıtlı metrikler (isim sırasıyla dışa aktarılır)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metrik zaten kayıtlı: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        """Gauge kaydet (aynı isim tekrar verilirse okuma fonksiyonu değişir)"""
+        self._metrics.pop(name, None)
+        return self._register(Gauge(name, help_text, read))
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# ---- Voice ----
+
+JOIN_TO_PLAY = REGISTRY.histogram(
+    'sesadam_join_to_play_seconds',
+    "Kanala giriş olayından sesin çalmaya başlamasına kadar geçen süre",
+)
+CONNECT_SECONDS = REGISTRY.histogram(
+    'sesadam_voice_connect_seconds',
+    "_connect_with_retry süresi (tüm denemeler dahil)",
+    labelnames=('result',),
+)
+CONNECT_ATTEMPTS = REGISTRY.histogram(
+    'sesadam_voice_connect_attempts',
+    "Bir bağlantı için yapılan deneme sayısı",
+    buckets=(1, 2, 3, 4, 5),
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    'sesadam_playback_queue_wait_seconds',
+    "İsteğin kanal kuyruğunda sırası gelene kadar beklediği süre",
+)
+FFMPEG_SPAWN = REGISTRY.histogram(
+    'sesadam_ffmpeg_spawn_seconds',
+    "FFmpeg sürecinin başlatılıp ilk frame'lerin okunması",
+)
+PLAYBACK_TIMEOUTS = REGISTRY.counter(
+    'sesadam_playback_timeouts_total',
+    "Süre aşımı nedeniyle durdurulan çalmalar",
+)
+JOINS = REGISTRY.counter(
+    'sesadam_voice_joins_total',
+    "İşlenen kanala giriş olayları",
+    labelnames=('result',),
+)
+
+# ---- Ingest ----
+
+INGEST_STAGE = REGISTRY.histogram(
+    'sesadam_ingest_stage_seconds',
+    "Ingest aşama süreleri (stream: indirme ve dönüştürme aynı anda)",
+    labelnames=('stage',),
+    buckets=INGEST_BUCKETS,
+)
+INGEST_JOB = REGISTRY.histogram(
+    'sesadam_ingest_job_seconds',
+    "Worker sürecindeki toplam iş süresi",
+    labelnames=('kind', 'result'),
+    buckets=INGEST_BUCKETS,
+)
+UPLOAD_SECONDS = REGISTRY.histogram(
+    'sesadam_upload_seconds',
+    "Yükleme komutundan kullanıcıya sonuç dönene kadar geçen süre",
+    labelnames=('command', 'result'),
+    buckets=INGEST_BUCKETS,
+)
+
+# ---- Event loop ----
+
+LOOP_LAG = REGISTRY.histogram(
+    'sesadam_event_loop_lag_seconds',
+    "Zamanlanmış uyanmanın ne kadar geciktiği",
+    buckets=LOOP_LAG_BUCKETS,
+)
+
+
+class LoopLagMonitor:
+    """Event loop gecikmesini ölçer: interval kadar uyur, fazladan geçen süreyi kaydeder"""
+
+    def __init__(self, interval: float = 0.5, histogram: Histogram = LOOP_LAG):
+        self.interval = interval
+        self.histogram = histogram
+        self.last_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, time.monotonic() - started - self.interval)
+            self.histogram.observe(self.last_lag)
+
+
+class MetricsServer:
+    """/metrics uç noktasını sunan küçük aiohttp sunucusu"""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = '127.0.0.1', port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info(f"Metrik uç noktası: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
@@ -0,0 +1,322 @@
+"""
+Opus Packet Cache - WebM ses dosyalarının Opus frame'lerini RAM'de tutar
+Join sesleri FFmpeg process'i başlatmadan, önceden demux edilmiş paketlerle çalınır
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import discord
+
+from logger_setup import get_logger
+
+log = get_logger('bot.opus_cache')
+
+# Discord voice 20ms'lik Opus frame'leri bekler
+FRAME_DURATION_US = 20_000
+
+# EBML / Matroska element ID'leri
+_EBML_HEADER = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_CLUSTER = 0x1F43B675
+_BLOCK_GROUP = 0xA0
+_BLOCK = 0xA1
+_SIMPLE_BLOCK = 0xA3
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_NUMBER = 0xD7
+_CODEC_ID = 0x86
+
+# İçine girilecek master elementler - diğer her şey atlanır
+_MASTER_IDS = {_SEGMENT, _CLUSTER, _BLOCK_GROUP, _TRACKS, _TRACK_ENTRY}
+
+# Opus TOC config -> frame süresi (mikrosaniye), RFC 6716 Bölüm 3.1
+_SILK_DURATIONS = (10_000, 20_000, 40_000, 60_000)
+_HYBRID_DURATIONS = (10_000, 20_000)
+_CELT_DURATIONS = (2_500, 5_000, 10_000, 20_000)
+
+
+class DemuxError(Exception):
+    """WebM dosyası Opus paketlerine ayrıştırılamadı"""
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool = False) -> Tuple[int, int, bool]:
+    """
+    EBML variable-length integer oku.
+    Returns: (değer, yeni pozisyon, bilinmeyen boyut mu)
+    """
+    if pos >= len(data):
+        raise DemuxError("Beklenmeyen dosya sonu")
+
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (first & mask):
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise DemuxError(f"Geçersiz EBML vint: pos={pos}")
+    if pos + length > len(data):
+        raise DemuxError("Beklenmeyen dosya sonu")
+
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = (first & (mask - 1)) == mask - 1
+    for b in data[pos + 1:pos + length]:
+        value = (value << 8) | b
+        all_ones = all_ones and b == 0xFF
+
+    return value, pos + length, all_ones
+
+
+def opus_packet_duration_us(packet: bytes) -> int:
+    """Opus paketinin süresini TOC byte'ından hesapla (mikrosaniye)"""
+    if not packet:
+        return 0
+
+    toc = packet[0]
+    config = toc >> 3
+    if config < 12:
+        frame_us = _SILK_DURATIONS[config % 4]
+    elif config < 16:
+        frame_us = _HYBRID_DURATIONS[config % 2]
+    else:
+        frame_us = _CELT_DURATIONS[config % 4]
+
+    code = toc & 0x03
+    if code == 0:
+        frame_count = 1
+    elif code in (1, 2):
+        frame_count = 2
+    else:
+        if len(packet) < 2:
+            return 0
+        frame_count = packet[1] & 0x3F
+
+    return frame_us * frame_count
+
+
+def demux_webm_opus(data: bytes) -> list[bytes]:
+    """
+    WebM container'ından ham Opus paketlerini çıkar.
+    Sadece FFmpeg'in ürettiği lacing'siz blokları destekler; diğer durumlarda DemuxError.
+    """
+    pos = 0
+    end = len(data)
+    frames: list[bytes] = []
+    opus_track: Optional[int] = None
+    current_track: Optional[int] = None
+    current_codec: Optional[str] = None
+
+    while pos < end:
+        element_id, pos, _ = _read_vint(data, pos, keep_marker=True)
+        size, pos, unknown_size = _read_vint(data, pos)
+
+        if element_id in _MASTER_IDS:
+            if element_id == _TRACK_ENTRY:
+                current_track = None
+                current_codec = None
+            # Master elementin içine gir (bilinmeyen boyutlu Segment/Cluster dahil)
+            continue
+
+        if unknown_size:
+            raise DemuxError(f"Bilinmeyen boyutlu element: id=0x{element_id:X}")
+
+        payload_end = pos + size
+        if payload_end > end:
+            raise DemuxError("Element dosya sınırını aşıyor")
+
+        if element_id == _TRACK_NUMBER:
+            current_track = int.from_bytes(data[pos:payload_end], 'big')
+        elif element_id == _CODEC_ID:
+            current_codec = data[pos:payload_end].rstrip(b'\x00').decode('ascii', 'replace')
+        elif element_id in (_SIMPLE_BLOCK, _BLOCK):
+            track, block_pos, _ = _read_vint(data, pos)
+            if opus_track is not None and track == opus_track:
+                flags = data[block_pos + 2]
+                if flags & 0x06:
+                    raise DemuxError("Lacing'li bloklar desteklenmiyor")
+                frames.append(bytes(data[block_pos + 3:payload_end]))
+
+        # Track bilgisi tamamlandıysa Opus track'ini belirle
+        if opus_track is None and current_codec == 'A_OPUS' and current_track is not None:
+            opus_track = current_track
+
+        pos = payload_end
+
+    if opus_track is None:
+        raise DemuxError("Opus track'i bulunamadı")
+    if not frames:
+        raise DemuxError("Opus paketi bulunamadı")
+
+    for frame in frames:
+        if opus_packet_duration_us(frame) != FRAME_DURATION_US:
+            raise DemuxError("Opus frame süresi 20ms değil")
+
+    return frames
+
+
+def demux_webm_file(path: str) -> list[bytes]:
+    """Dosyayı oku ve Opus paketlerine ayır (blocking - thread'de çağırın)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return demux_webm_opus(data)
+
+
+@dataclass
+class CachedSound:
+    """Cache'lenmiş tek bir sesin frame'leri"""
+    frames: Tuple[bytes, ...]
+    size_bytes: int
+
+
+class OpusPacketCache:
+    """
+    Byte sınırlı LRU Opus paket cache'i.
+    Anahtar ses dosyasının yoludur; dosya değiştiğinde invalidate() çağrılmalıdır.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+
+        self._entries: OrderedDict[str, CachedSound] = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # Invalidate sırasında devam eden yüklemelerin eski veriyi yazmasını önler
+        # (sadece yüklemesi süren yollar için tutulur, yükleme bitince silinir)
+        self._generations: Dict[str, int] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.demux_failures = 0
+
+    def get(self, path: str) -> Optional[Tuple[bytes, ...]]:
+        """Cache'den frame'leri al (yoksa None)"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry.frames
+
+    async def load(self, path: str) -> Optional[Tuple[bytes, ...]]:
+        """
+        Frame'leri cache'den al, yoksa dosyayı thread'de demux edip cache'e ekle.
+        Demux başarısızsa None döner (çağıran FFmpeg'e düşmelidir).
+        """
+        frames = self.get(path)
+        if frames is not None:
+            return frames
+
+        self.misses += 1
+
+        # Aynı dosya için devam eden yükleme varsa onu bekle
+        pending = self._pending.get(path)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[path] = future
+        generation = self._generations.get(path, 0)
+
+        try:
+            try:
+                demuxed = await asyncio.to_thread(demux_webm_file, path)
+                frames = tuple(demuxed)
+            except (OSError, DemuxError) as e:
+                self.demux_failures += 1
+                log.debug(f"Opus demux başarısız, FFmpeg kullanılacak: {path} ({e})")
+                frames = None
+
+            if frames is not None and self._generations.get(path, 0) == generation:
+                self._put(path, frames)
+
+            future.set_result(frames)
+            return frames
+        except BaseException:
+            # Bekleyenler FFmpeg'e düşsün, hata sadece bu çağrıya yükselsin
+            if not future.done():
+                future.set_result(None)
+            raise
+        finally:
+            self._pending.pop(path, None)
+            self._generations.pop(path, None)
+
+    def _put(self, path: str, frames: Tuple[bytes, ...]):
+        """Cache'e ekle ve byte limitini koru"""
+        size = sum(len(f) for f in frames)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self._total_bytes -= old.size_bytes
+
+            self._entries[path] = CachedSound(frames=frames, size_bytes=size)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.size_bytes
+                self.evictions += 1
+
+    def invalidate(self, path: str):
+        """Dosya değiştiğinde/silindiğinde cache kaydını düşür"""
+        with self._lock:
+            if path in self._pending:
+                self._generations[path] = self._generations.get(path, 0) + 1
+            entry = self._entries.pop(path, None)
+            if entry:
+                self._total_bytes -= entry.size_bytes
+        log.debug(f"Opus cache invalidate: {path}")
+
+    def clear(self):
+        """Tüm cache'i temizle"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Cache'deki toplam payload boyutu"""
+        return self._total_bytes
+
+    def stats(self) -> dict:
+        """Cache istatistikleri"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'demux_failures': self.demux_failures,
+        }
+
+
+class CachedOpusAudio(discord.AudioSource):
+    """Önceden demux edilmiş Opus frame'lerini sırayla döndüren audio source"""
+
+    def __init__(self, frames: Sequence[bytes]):
+        self._frames = frames
+        self._index = 0
+
+    def read(self) -> bytes:
+        if self._index >= len(self._frames):
+            return b''
+        frame = self._frames[self._index]
+        self._index += 1
+        return frame
+
+    def is_opus(self) -> bool:
+        return True
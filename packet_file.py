@@ -0,0 +1,195 @@
+"""
+Packet File - Discord'a hazır Opus paket dosyası (.opuspk)
+Ingest sırasında <user_id>.webm yanına yazılır, çalma sırasında mmap ile okunur
+
+Format (little-endian):
+    header   : magic 'SAPK' | version u8 | flags u8 | frame_ms u16 | frame_count u32
+    index    : (frame_count + 1) x u32 - data bölümüne göre frame offset'leri
+    data     : ardışık ham Opus paketleri (48 kHz stereo, 20 ms)
+"""
+
+import mmap
+import os
+import struct
+from typing import Optional, Sequence
+
+import discord
+
+from logger_setup import get_logger
+from opus_cache import DemuxError, demux_webm_file
+
+log = get_logger('bot.packet_file')
+
+PACKET_FILE_EXT = '.opuspk'
+PACKET_FILE_MAGIC = b'SAPK'
+PACKET_FILE_VERSION = 1
+
+_HEADER = struct.Struct('<4sBBHI')
+_OFFSET = struct.Struct('<I')
+
+
+class PacketFileError(Exception):
+    """Paket dosyası okunamadı veya geçersiz"""
+
+
+def sidecar_path(audio_path: str) -> str:
+    """<user_id>.webm için paket dosyası yolu"""
+    return os.path.splitext(audio_path)[0] + PACKET_FILE_EXT
+
+
+def write_packet_file(path: str, frames: Sequence[bytes], frame_ms: int = 20):
+    """Frame'leri paket dosyasına yaz (atomik: temp dosya + rename)"""
+    offsets = [0]
+    for frame in frames:
+        offsets.append(offsets[-1] + len(frame))
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(PACKET_FILE_MAGIC, PACKET_FILE_VERSION, 0, frame_ms, len(frames)))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        for frame in frames:
+            f.write(frame)
+    os.replace(temp_path, path)
+
+
+def write_sidecar(audio_path: str) -> Optional[str]:
+    """
+    WebM dosyasını demux edip yanına paket dosyasını yaz (blocking).
+    Demux edilemiyorsa eski sidecar silinir ve None döner - çalma FFmpeg'e düşer.
+    """
+    target = sidecar_path(audio_path)
+    try:
+        frames = demux_webm_file(audio_path)
+    except DemuxError as e:
+        log.warning(f"Paket dosyası yazılamadı, FFmpeg kullanılacak: {audio_path} ({e})")
+        remove_sidecar(audio_path)
+        return None
+
+    write_packet_file(target, frames)
+    return target
+
+
+def remove_sidecar(audio_path: str):
+    """Ses dosyasına ait paket dosyasını sil (yoksa sessizce geç)"""
+    try:
+        os.remove(sidecar_path(audio_path))
+    except FileNotFoundError:
+        pass
+
+
+class PacketFile:
+    """mmap ile açılmış paket dosyası; frame'ler kopyasız memoryview olarak verilir"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise PacketFileError(f"Boş paket dosyası: {path}") from e
+
+        try:
+            self._parse_header()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _parse_header(self):
+        if len(self._mmap) < _HEADER.size:
+            raise PacketFileError(f"Paket dosyası çok kısa: {self.path}")
+
+        magic, version, _, frame_ms, frame_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != PACKET_FILE_MAGIC or version != PACKET_FILE_VERSION:
+            raise PacketFileError(f"Bilinmeyen paket dosyası formatı: {self.path}")
+        if frame_ms != 20 or frame_count == 0:
+            raise PacketFileError(f"Geçersiz paket dosyası: {self.path}")
+
+        self.frame_count = frame_count
+        self._index_start = _HEADER.size
+        self._data_start = self._index_start + (frame_count + 1) * _OFFSET.size
+        if self._data_start > len(self._mmap):
+            raise PacketFileError(f"Paket dosyası index'i eksik: {self.path}")
+
+        last_offset = _OFFSET.unpack_from(self._mmap, self._index_start + frame_count * _OFFSET.size)[0]
+        if self._data_start + last_offset != len(self._mmap):
+            raise PacketFileError(f"Paket dosyası boyutu index ile uyuşmuyor: {self.path}")
+
+    def __len__(self) -> int:
+        return self.frame_count
+
+    def prefetch(self):
+        """Kernel'e sayfaları önceden okumasını söyle (bağlantı kurulurken disk okuması biter)"""
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            self._mmap.madvise(mmap.MADV_WILLNEED)
+
+    def frame_view(self, index: int) -> memoryview:
+        """Frame'i kopyalamadan döndür (view bırakılmadan close() çağrılmamalı)"""
+        pos = self._index_start + index * _OFFSET.size
+        start, end = struct.unpack_from('<II', self._mmap, pos)
+        return memoryview(self._mmap)[self._data_start + start:self._data_start + end]
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            log.debug(f"Paket dosyası kapatılamadı (aktif view var): {self.path}")
+
+
+class MmapOpusAudio(discord.AudioSource):
+    """
+    Paket dosyasından frame döndüren audio source.
+    Frame'ler mmap'ten okunur; RAM'de sadece OS page cache'i tutulur.
+    """
+
+    def __init__(self, packet_file: PacketFile):
+        self._file = packet_file
+        self._index = 0
+
+    def read(self) -> bytes:
+        if self._index >= len(self._file):
+            return b''
+        view = self._file.frame_view(self._index)
+        self._index += 1
+        # DAVE encrypt_opus sadece bytes kabul ediyor - kopya burada, oynatıcı sınırında
+        try:
+            return view.tobytes()
+        finally:
+            view.release()
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self):
+        self._file.close()
+
+
+def migrate_directory(directory: str, force: bool = False) -> dict:
+    """
+    Klasördeki tüm .webm sesleri için paket dosyası üret (tek seferlik migration).
+    Sidecar'ı güncel olan dosyalar atlanır, bu yüzden yarıda kesilirse tekrar çalıştırılabilir.
+    """
+    # storage_layout bu modülü import ediyor - döngü olmasın
+    from storage_layout import iter_sound_files
+
+    result = {'converted': 0, 'skipped': 0, 'failed': 0}
+
+    for _, path in iter_sound_files(directory):
+        target = sidecar_path(path)
+        if not force:
+            try:
+                if os.stat(target).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                    result['skipped'] += 1
+                    continue
+            except FileNotFoundError:
+                pass
+
+        try:
+            if write_sidecar(path):
+                result['converted'] += 1
+            else:
+                result['failed'] += 1
+        except OSError as e:
+            log.error(f"Paket dosyası migration hatası: {path} ({e})")
+            result['failed'] += 1
+
+    return result
@@ -0,0 +1,145 @@
+"""
+Playback Queue - Kanal bazlı sınırlı ses kuyruğu
+Join fırtınalarında tekrar eden istekleri birleştirir, fazlasını kısaltır/örnekler
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+from logger_setup import get_logger
+
+log = get_logger('bot.playback_queue')
+
+STORM_MODES = ('shorten', 'sample')
+
+
+@dataclass
+class QueuePolicy:
+    """Kanal kuyruğu politikası"""
+    max_size: int = 10               # Kanal başına bekleyen maksimum istek
+    drop_departed: bool = True       # Sırası geldiğinde kanalda olmayanları atla
+    dedupe: bool = True              # Aynı kullanıcının bekleyen isteği varsa yenisini atla
+    storm_threshold: int = 5         # Bu kadar bekleyen istek varsa fırtına modu
+    storm_mode: str = 'shorten'      # 'shorten': sesleri kısalt, 'sample': bir kısmını al
+    storm_clip_seconds: float = 3.0  # shorten modunda maksimum ses süresi
+    storm_sample_every: int = 3      # sample modunda her N istekten biri kabul edilir
+
+    def __post_init__(self):
+        if self.storm_mode not in STORM_MODES:
+            raise ValueError(f"Geçersiz storm_mode: {self.storm_mode} (seçenekler: {STORM_MODES})")
+
+
+@dataclass
+class QueueStats:
+    """Tüm kanal kuyruklarının ortak sayaçları"""
+    enqueued: int = 0
+    deduped: int = 0
+    dropped_overflow: int = 0
+    dropped_departed: int = 0
+    storm_shortened: int = 0
+    storm_sampled_out: int = 0
+    depth: int = 0                   # Tüm kanallarda şu an bekleyen istek sayısı
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _Storm:
+    """Devam eden fırtınanın örnekleme sayacı"""
+    seen: int = 0
+
+
+class PlaybackQueue:
+    """
+    Tek bir kanalın sınırlı FIFO kuyruğu.
+    Atılan istekler on_drop ile bildirilir (hazırlanmış kaynakların kapatılması için).
+    """
+
+    def __init__(
+        self,
+        policy: QueuePolicy,
+        stats: QueueStats,
+        on_drop: Callable[[object], None],
+    ):
+        self.policy = policy
+        self.stats = stats
+        self._on_drop = on_drop
+
+        self._items: Deque = deque()
+        self._not_empty = asyncio.Event()
+        self._storm: Optional[_Storm] = None
+
+    def put(self, request) -> bool:
+        """
+        İsteği politikaya göre kuyruğa ekle.
+        Returns: İstek kuyruğa girdiyse True
+        """
+        policy = self.policy
+
+        if policy.dedupe and any(r.user_id == request.user_id for r in self._items):
+            self.stats.deduped += 1
+            return False
+
+        if len(self._items) >= policy.storm_threshold:
+            if self._storm is None:
+                self._storm = _Storm()
+                log.info(f"Join fırtınası algılandı: {len(self._items)} bekleyen istek")
+            self._storm.seen += 1
+
+            if policy.storm_mode == 'sample':
+                if self._storm.seen % policy.storm_sample_every != 0:
+                    self.stats.storm_sampled_out += 1
+                    return False
+            else:
+                request.max_seconds = policy.storm_clip_seconds
+                self.stats.storm_shortened += 1
+
+        if len(self._items) >= policy.max_size:
+            # En eski istek en bayat olandır - yer aç
+            self._on_drop(self._items.popleft())
+            self.stats.dropped_overflow += 1
+            self.stats.depth -= 1
+
+        self._items.append(request)
+        self._not_empty.set()
+        self.stats.enqueued += 1
+        self.stats.depth += 1
+        return True
+
+    def get_nowait(self):
+        """Sıradaki isteği al (boşsa IndexError)"""
+        request = self._items.popleft()
+        self.stats.depth -= 1
+        if not self._items:
+            self._not_empty.clear()
+            self._storm = None
+        return request
+
+    async def get(self):
+        """Sıradaki isteği bekle"""
+        while not self._items:
+            await self._not_empty.wait()
+        return self.get_nowait()
+
+    def drop_departed(self, request):
+        """Kanaldan ayrılan kullanıcının isteğini at"""
+        self.stats.dropped_departed += 1
+        self._on_drop(request)
+
+    def drain(self) -> List:
+        """Bekleyen tüm istekleri çıkar"""
+        items = list(self._items)
+        self._items.clear()
+        self.stats.depth -= len(items)
+        self._not_empty.clear()
+        self._storm = None
+        return items
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def qsize(self) -> int:
+        return len(self._items)
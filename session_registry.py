@@ -0,0 +1,190 @@
+"""
+Session Registry - VoicePool sessionları için indeksli kayıt
+Guild bazlı ikincil indeks ile O(1) sayım, idle heap ile O(log n) eviction
+Global deadline heap ile süresi dolan sessionlar tüm liste taranmadan bulunur
+"""
+
+import heapq
+import itertools
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from voice_pool import VoiceSession
+
+SessionKey = Tuple[int, int]
+_HeapEntry = Tuple[float, int, SessionKey, 'VoiceSession']
+
+# Heap'teki geçersiz kayıtlar bu oranı aşınca heap yeniden kurulur
+_HEAP_COMPACT_FACTOR = 2
+_HEAP_COMPACT_MIN = 16
+
+
+class SessionRegistry:
+    """
+    (guild_id, channel_id) -> VoiceSession eşlemesi.
+    Dict benzeri arayüz sunar; ek olarak guild indeksi, guild başına idle min-heap
+    ve tüm idle sessionlar için last_activity sıralı expiry heap'i tutar.
+    Heap kayıtları tembel silinir: session değişince eski kayıt pop sırasında atlanır.
+
+    on_idle: expiry heap boşken yeni idle session eklendiğinde çağrılır
+    (uyuyan cleanup döngüsünü uyandırmak için; diğer durumlarda mevcut deadline daha erkendir)
+    """
+
+    def __init__(self, on_idle: Optional[Callable[[], None]] = None):
+        self._sessions: Dict[SessionKey, 'VoiceSession'] = {}
+        self._by_guild: Dict[int, Dict[SessionKey, 'VoiceSession']] = {}
+
+        # guild_id -> [(last_activity, seq, key, session)]
+        self._idle_heaps: Dict[int, List[_HeapEntry]] = {}
+        # Tüm guild'ler: [(last_activity, seq, key, session)]
+        self._expiry_heap: List[_HeapEntry] = []
+        self._seq = itertools.count()
+        self._on_idle = on_idle
+
+    # ---- Dict arayüzü ----
+
+    def __setitem__(self, key: SessionKey, session: 'VoiceSession'):
+        self.pop(key, None)
+        self._sessions[key] = session
+        self._by_guild.setdefault(session.guild_id, {})[key] = session
+        if not session.is_playing:
+            self._push_idle(session)
+
+    def __getitem__(self, key: SessionKey) -> 'VoiceSession':
+        return self._sessions[key]
+
+    def __contains__(self, key: SessionKey) -> bool:
+        return key in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[SessionKey]:
+        return iter(self._sessions)
+
+    def get(self, key: SessionKey, default=None) -> Optional['VoiceSession']:
+        return self._sessions.get(key, default)
+
+    def pop(self, key: SessionKey, default=None) -> Optional['VoiceSession']:
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return default
+
+        guild_sessions = self._by_guild.get(session.guild_id)
+        if guild_sessions is not None:
+            guild_sessions.pop(key, None)
+            if not guild_sessions:
+                del self._by_guild[session.guild_id]
+                self._idle_heaps.pop(session.guild_id, None)
+        return session
+
+    def keys(self):
+        return self._sessions.keys()
+
+    def values(self):
+        return self._sessions.values()
+
+    def items(self):
+        return self._sessions.items()
+
+    def clear(self):
+        self._sessions.clear()
+        self._by_guild.clear()
+        self._idle_heaps.clear()
+        self._expiry_heap.clear()
+
+    # ---- Guild indeksi ----
+
+    def guild_sessions(self, guild_id: int) -> List['VoiceSession']:
+        """Bir sunucudaki tüm sessionlar"""
+        return list(self._by_guild.get(guild_id, {}).values())
+
+    def guild_count(self, guild_id: int) -> int:
+        """Bir sunucudaki session sayısı (O(1))"""
+        return len(self._by_guild.get(guild_id, ()))
+
+    # ---- Aktivite / idle takibi ----
+
+    def touch(self, session: 'VoiceSession'):
+        """Session'da aktivite oldu - last_activity güncelle"""
+        session.last_activity = time.monotonic()
+        if not session.is_playing and self._sessions.get(session.key) is session:
+            self._push_idle(session)
+
+    def mark_busy(self, session: 'VoiceSession'):
+        """Session çalmaya başladı (idle heap'teki kaydı geçersiz olur)"""
+        session.is_playing = True
+        session.last_activity = time.monotonic()
+
+    def mark_idle(self, session: 'VoiceSession'):
+        """Session çalmayı bitirdi - idle heap'e ekle"""
+        session.is_playing = False
+        self.touch(session)
+
+    def _push_idle(self, session: 'VoiceSession'):
+        entry = (session.last_activity, next(self._seq), session.key, session)
+
+        heap = self._idle_heaps.setdefault(session.guild_id, [])
+        heapq.heappush(heap, entry)
+        guild_size = len(self._by_guild.get(session.guild_id, ()))
+        if len(heap) > max(_HEAP_COMPACT_MIN, guild_size * _HEAP_COMPACT_FACTOR):
+            self._compact(session.guild_id)
+
+        was_empty = not self._expiry_heap
+        heapq.heappush(self._expiry_heap, entry)
+        if len(self._expiry_heap) > max(_HEAP_COMPACT_MIN, len(self._sessions) * _HEAP_COMPACT_FACTOR):
+            self._expiry_heap = [e for e in self._expiry_heap if self._is_current(e)]
+            heapq.heapify(self._expiry_heap)
+
+        if was_empty and self._on_idle is not None:
+            self._on_idle()
+
+    def _is_current(self, entry: _HeapEntry) -> bool:
+        """Heap kaydı hâlâ geçerli mi? (aynı session, idle, aktivite değişmemiş)"""
+        last_activity, _, key, session = entry
+        return (
+            self._sessions.get(key) is session
+            and not session.is_playing
+            and session.last_activity == last_activity
+        )
+
+    def _compact(self, guild_id: int):
+        """Geçersiz heap kayıtlarını at"""
+        heap = [e for e in self._idle_heaps.get(guild_id, []) if self._is_current(e)]
+        heapq.heapify(heap)
+        self._idle_heaps[guild_id] = heap
+
+    def oldest_idle(self, guild_id: int) -> Optional['VoiceSession']:
+        """Sunucuda en uzun süredir boşta olan session (O(log n) amortize)"""
+        heap = self._idle_heaps.get(guild_id)
+        while heap:
+            if self._is_current(heap[0]):
+                return heap[0][3]
+            heapq.heappop(heap)
+        return None
+
+    # ---- Expiry ----
+
+    def next_idle_activity(self) -> Optional[float]:
+        """En eski idle session'ın last_activity değeri (idle session yoksa None)"""
+        heap = self._expiry_heap
+        while heap:
+            if self._is_current(heap[0]):
+                return heap[0][0]
+            heapq.heappop(heap)
+        return None
+
+    def pop_expired(self, cutoff: float) -> List['VoiceSession']:
+        """
+        last_activity <= cutoff olan idle sessionları expiry heap'ten çıkar.
+        Maliyet süresi dolan (ve atlanan geçersiz) kayıt sayısıyla orantılıdır.
+        Sessionlar registry'de kalır - kapatmak çağıranın işi.
+        """
+        expired = []
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= cutoff:
+            entry = heapq.heappop(heap)
+            if self._is_current(entry):
+                expired.append(entry[3])
+        return expired
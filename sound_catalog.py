@@ -0,0 +1,372 @@
+"""
+Sound Catalog - SQLite tabanlı ses kataloğu
+Join başına dosya sistemi kontrolü ve klasör taramalarının yerine geçer;
+sıcak sorgular RAM'deki kopyadan cevaplanır
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, astuple
+from typing import Callable, Dict, List, Optional, Set
+
+from logger_setup import get_logger
+from opus_cache import DemuxError, demux_webm_file, FRAME_DURATION_US
+from storage_layout import iter_sound_files
+
+log = get_logger('bot.catalog')
+
+CATALOG_FILENAME = 'catalog.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sounds (
+    user_id        INTEGER PRIMARY KEY,
+    path           TEXT    NOT NULL,
+    size_bytes     INTEGER NOT NULL,
+    duration       REAL,
+    codec          TEXT,
+    bitrate        INTEGER,
+    content_hash   TEXT    NOT NULL,
+    created_at     REAL    NOT NULL,
+    last_played_at REAL
+)
+"""
+
+_COLUMNS = (
+    'user_id', 'path', 'size_bytes', 'duration', 'codec',
+    'bitrate', 'content_hash', 'created_at', 'last_played_at',
+)
+
+
+@dataclass
+class SoundEntry:
+    """Katalogdaki tek bir ses kaydı"""
+    user_id: int
+    path: str
+    size_bytes: int
+    duration: Optional[float]
+    codec: Optional[str]
+    bitrate: Optional[int]  # bit/s
+    content_hash: str
+    created_at: float
+    last_played_at: Optional[float] = None
+
+    @property
+    def size_kb(self) -> float:
+        return round(self.size_bytes / 1024, 1)
+
+
+def probe_sound(user_id: int, path: str, created_at: Optional[float] = None) -> SoundEntry:
+    """Ses dosyasının katalog bilgilerini çıkar (blocking - thread'de çağırın)"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+
+    stat = os.stat(path)
+    duration: Optional[float] = None
+    codec: Optional[str] = None
+    bitrate: Optional[int] = None
+    try:
+        frames = demux_webm_file(path)
+        duration = len(frames) * FRAME_DURATION_US / 1_000_000
+        codec = 'opus'
+        bitrate = int(stat.st_size * 8 / duration) if duration else None
+    except DemuxError:
+        pass
+
+    return SoundEntry(
+        user_id=user_id,
+        path=path,
+        size_bytes=stat.st_size,
+        duration=duration,
+        codec=codec,
+        bitrate=bitrate,
+        content_hash=hasher.hexdigest(),
+        created_at=created_at if created_at is not None else stat.st_mtime,
+    )
+
+
+class SoundCatalog:
+    """
+    Ses kataloğu.
+    Yazmalar SQLite'a transaction ile yapılır, okumalar RAM'deki kopyadan gelir.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # RAM kopyası: user_id -> SoundEntry
+        self._entries: Dict[int, SoundEntry] = {}
+        self._total_bytes = 0
+
+        # content_hash -> bu içeriği kullanan kullanıcı sayısı (depo referans sayısı)
+        self._hash_refs: Dict[str, int] = {}
+
+        # Her ekleme/silmede artar (türetilmiş indekslerin geçerlilik kontrolü)
+        self.version = 0
+
+        # Henüz diske yazılmamış last_played_at güncellemeleri
+        self._dirty_played: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # add_sound / remove_sound sonrası çağrılır (cluster modunda diğer süreçlere bildirim)
+        self.on_change: Optional[Callable[[int], None]] = None
+
+    # ---- Açma / kapama ----
+
+    def open_sync(self) -> bool:
+        """
+        Veritabanını aç ve RAM kopyasını yükle.
+        Returns: Veritabanı yeni oluşturulduysa True
+        """
+        created = not os.path.exists(self.db_path)
+
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(_SCHEMA)
+        conn.commit()
+
+        rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM sounds").fetchall()
+        with self._lock:
+            self._conn = conn
+            self._load_entries([SoundEntry(*row) for row in rows])
+
+        log.info(f"Ses kataloğu yüklendi: {len(self._entries)} kayıt ({self.db_path})")
+        return created
+
+    async def open(self, rebuild_dir: Optional[str] = None):
+        """Kataloğu aç; yeni oluşturulduysa mevcut dosyalardan doldur"""
+        created = await asyncio.to_thread(self.open_sync)
+        if created and rebuild_dir:
+            count = await asyncio.to_thread(self.rebuild_from_disk, rebuild_dir)
+            log.info(f"Yeni katalog diskten oluşturuldu: {count} ses")
+
+    def start_flush_task(self, interval: float = 60.0):
+        """last_played_at güncellemelerini periyodik yazan task'ı başlat"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop(interval))
+
+    async def _flush_loop(self, interval: float):
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.flush_played)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                log.error(f"Katalog flush hatası: {e}", exc_info=True)
+
+    async def close(self):
+        """Bekleyen yazmaları bitir ve bağlantıyı kapat"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+
+        await asyncio.to_thread(self.close_sync)
+
+    def close_sync(self):
+        self.flush_played()
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    # ---- Okuma (RAM) ----
+
+    def get(self, user_id: int) -> Optional[SoundEntry]:
+        """Kullanıcının ses kaydı (yoksa None)"""
+        return self._entries.get(user_id)
+
+    def entries(self) -> List[SoundEntry]:
+        """Tüm kayıtlar"""
+        return list(self._entries.values())
+
+    @property
+    def count(self) -> int:
+        """Kayıtlı ses sayısı"""
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        """Tüm seslerin toplam boyutu"""
+        return self._total_bytes
+
+    def references(self, content_hash: str) -> int:
+        """Bu içeriği kullanan kullanıcı sayısı"""
+        return self._hash_refs.get(content_hash, 0)
+
+    # ---- RAM kopyası (self._lock tutulurken çağrılır) ----
+
+    def _load_entries(self, entries: List[SoundEntry]):
+        self._entries = {}
+        self._total_bytes = 0
+        self._hash_refs = {}
+        for entry in entries:
+            self._put_entry(entry)
+
+    def _put_entry(self, entry: SoundEntry):
+        self._pop_entry(entry.user_id)
+        self.version += 1
+        self._entries[entry.user_id] = entry
+        self._total_bytes += entry.size_bytes
+        self._hash_refs[entry.content_hash] = self._hash_refs.get(entry.content_hash, 0) + 1
+
+    def _pop_entry(self, user_id: int) -> Optional[SoundEntry]:
+        entry = self._entries.pop(user_id, None)
+        if entry:
+            self.version += 1
+            self._total_bytes -= entry.size_bytes
+            refs = self._hash_refs.get(entry.content_hash, 0) - 1
+            if refs > 0:
+                self._hash_refs[entry.content_hash] = refs
+            else:
+                self._hash_refs.pop(entry.content_hash, None)
+        return entry
+
+    # ---- Yazma ----
+
+    def upsert_sync(self, entry: SoundEntry):
+        """Kaydı ekle/güncelle (transaction)"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO sounds ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    astuple(entry),
+                )
+            self._put_entry(entry)
+            self._dirty_played.discard(entry.user_id)
+
+    def remove_sync(self, user_id: int) -> Optional[SoundEntry]:
+        """Kaydı sil (transaction)"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM sounds WHERE user_id = ?", (user_id,))
+            entry = self._pop_entry(user_id)
+            self._dirty_played.discard(user_id)
+            return entry
+
+    async def add_sound(self, user_id: int, path: str) -> SoundEntry:
+        """Yeni yüklenen sesi kataloğa yaz"""
+        entry = await asyncio.to_thread(probe_sound, user_id, path, time.time())
+        await asyncio.to_thread(self.upsert_sync, entry)
+        self._notify_change(user_id)
+        return entry
+
+    async def remove_sound(self, user_id: int) -> Optional[SoundEntry]:
+        """Sesi katalogdan kaldır"""
+        entry = await asyncio.to_thread(self.remove_sync, user_id)
+        self._notify_change(user_id)
+        return entry
+
+    def relocate_sync(self, user_id: int, old_path: str, new_path: str) -> bool:
+        """
+        Kaydın dosya yolunu değiştir (düzen taşıması); kayıt bu arada değiştiyse dokunmaz.
+        Returns: Güncellendiyse True
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry.path != old_path:
+                return False
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE sounds SET path = ? WHERE user_id = ? AND path = ?",
+                    (new_path, user_id, old_path),
+                )
+            entry.path = new_path
+            return True
+
+    async def relocate(self, user_id: int, old_path: str, new_path: str) -> bool:
+        moved = await asyncio.to_thread(self.relocate_sync, user_id, old_path, new_path)
+        if moved:
+            self._notify_change(user_id)
+        return moved
+
+    def _notify_change(self, user_id: int):
+        if self.on_change is not None:
+            self.on_change(user_id)
+
+    def reload_entry_sync(self, user_id: int) -> Optional[SoundEntry]:
+        """
+        Kaydı veritabanından tekrar oku (başka süreç değiştirdiğinde RAM kopyasını tazeler).
+        Returns: Güncel kayıt (silindiyse None)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM sounds WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            self._pop_entry(user_id)
+            if row is None:
+                return None
+            entry = SoundEntry(*row)
+            self._put_entry(entry)
+            return entry
+
+    async def reload_entry(self, user_id: int) -> Optional[SoundEntry]:
+        return await asyncio.to_thread(self.reload_entry_sync, user_id)
+
+    def mark_played(self, user_id: int):
+        """Çalınma zamanını RAM'de güncelle (diske periyodik olarak yazılır)"""
+        entry = self._entries.get(user_id)
+        if entry:
+            entry.last_played_at = time.time()
+            self._dirty_played.add(user_id)
+
+    def flush_played(self):
+        """Bekleyen last_played_at güncellemelerini toplu yaz"""
+        with self._lock:
+            if not self._dirty_played or not self._conn:
+                return
+            updates = [
+                (self._entries[uid].last_played_at, uid)
+                for uid in self._dirty_played
+                if uid in self._entries
+            ]
+            self._dirty_played.clear()
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE sounds SET last_played_at = ? WHERE user_id = ?", updates
+                )
+
+    def rebuild_from_disk(self, directory: str) -> int:
+        """
+        Kataloğu klasördeki .webm dosyalarından yeniden oluştur (blocking).
+        Mevcut last_played_at değerleri korunur.
+        """
+        entries: List[SoundEntry] = []
+        for user_id, path in iter_sound_files(directory):
+            try:
+                entry = probe_sound(user_id, path)
+            except OSError as e:
+                log.warning(f"Katalog rebuild: dosya okunamadı: {path} ({e})")
+                continue
+
+            old = self._entries.get(user_id)
+            if old:
+                entry.created_at = old.created_at
+                entry.last_played_at = old.last_played_at
+            entries.append(entry)
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM sounds")
+                self._conn.executemany(
+                    f"INSERT INTO sounds ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    [astuple(e) for e in entries],
+                )
+            self._load_entries(entries)
+            self._dirty_played.clear()
+
+        return len(entries)
@@ -0,0 +1,230 @@
+"""
+Sound Store - İçerik adresli (SHA-256) ses deposu
+Aynı klip diskte bir kez tutulur: objects/ab/cd/<hash>.webm (+ .opuspk).
+Kullanıcı sesleri (<user_id>.webm) bu nesnelere hardlink'tir; referans sayısı
+katalogdaki content_hash değerlerinden gelir. Ayrıca (kaynak URL, başlangıç, süre)
+-> hash eşlemesi tutulur: aynı klibin tekrar yüklenmesi indirme/dönüştürme yapmaz.
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterable, Iterator, Optional, Set
+
+from logger_setup import get_logger
+from packet_file import sidecar_path
+from storage_layout import TMP_DIRNAME
+
+log = get_logger('bot.sound_store')
+
+OBJECTS_DIRNAME = 'objects'
+INDEX_FILENAME = 'index.db'
+OBJECT_EXT = '.webm'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS clip_sources (
+    source_key   TEXT    PRIMARY KEY,
+    content_hash TEXT    NOT NULL,
+    created_at   REAL    NOT NULL,
+    last_used_at REAL    NOT NULL
+)
+"""
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """Dosyanın SHA-256 hex özeti (katalogdaki content_hash ile aynı)"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _replace_with(source: str, target: str, link: bool, temp_dir: str):
+    """target'ı source'un hardlink'i (veya kopyası) ile atomik olarak değiştir"""
+    # Ara dosya aynı dosya sistemindeki tmp/ altında: rename atomik, hedef klasör temiz kalır
+    partial = os.path.join(temp_dir, f'{uuid.uuid4().hex}.part')
+    if link:
+        try:
+            os.link(source, partial)
+        except OSError as e:
+            # Hardlink desteklemeyen dosya sistemi / farklı mount - kopyaya düş
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copyfile(source, partial)
+    else:
+        shutil.copyfile(source, partial)
+    try:
+        os.replace(partial, target)
+    except OSError:
+        os.remove(partial)
+        raise
+
+
+class SoundStore:
+    """
+    İçerik adresli nesne deposu.
+    Tüm metodlar blocking'dir (asyncio.to_thread ile çağırın).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, OBJECTS_DIRNAME)
+        self.tmp_dir = os.path.join(root, TMP_DIRNAME, 'store')
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    # ---- Açma / kapama ----
+
+    def open(self):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.objects_dir, INDEX_FILENAME), check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(_SCHEMA)
+        conn.commit()
+        with self._lock:
+            self._conn = conn
+
+    def close(self):
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+    # ---- Nesneler ----
+
+    def object_path(self, digest: str) -> str:
+        """Nesnenin yolu (iki seviyeli dağıtım: tek klasörde milyonlarca dosya olmasın)"""
+        return os.path.join(self.objects_dir, digest[:2], digest[2:4], digest + OBJECT_EXT)
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.object_path(digest))
+
+    def put(self, clip_path: str, move: bool = False) -> str:
+        """
+        Klibi (ve paket dosyasını) depoya ekle.
+        Aynı içerik zaten varsa sadece özet döner - kopya tutulmaz.
+        move=True ise kaynak dosyalar depoya taşınır (aynı dosya sisteminde rename).
+        """
+        digest = file_digest(clip_path)
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            if move:
+                os.remove(clip_path)
+                if os.path.exists(sidecar_path(clip_path)):
+                    os.remove(sidecar_path(clip_path))
+            return digest
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Önce paket dosyası: nesne görünür olduğunda sidecar'ı da hazırdır
+        for source, dest in ((sidecar_path(clip_path), sidecar_path(target)), (clip_path, target)):
+            if not os.path.exists(source):
+                continue
+            if move:
+                os.replace(source, dest)
+            else:
+                _replace_with(source, dest, link=False, temp_dir=self.tmp_dir)
+        return digest
+
+    def link(self, digest: str, target_path: str):
+        """
+        Nesneyi kullanıcı yoluna hardlink ile bağla (eski ses atomik olarak değişir).
+        Paket dosyası önce bağlanır: çalma sidecar'ı tercih ettiği için ara durumda da yeni ses çalınır.
+        """
+        obj = self.object_path(digest)
+        if not os.path.exists(obj):
+            raise FileNotFoundError(f"Depoda nesne yok: {digest}")
+
+        target_dir = os.path.dirname(target_path)
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+
+        if os.path.exists(sidecar_path(obj)):
+            _replace_with(sidecar_path(obj), sidecar_path(target_path), link=True, temp_dir=self.tmp_dir)
+        elif os.path.exists(sidecar_path(target_path)):
+            # Demux edilemeyen klip - eski paket dosyası kalmasın
+            os.remove(sidecar_path(target_path))
+        _replace_with(obj, target_path, link=True, temp_dir=self.tmp_dir)
+
+    def release(self, digest: str):
+        """Artık referansı kalmayan nesneyi sil"""
+        obj = self.object_path(digest)
+        for path in (sidecar_path(obj), obj):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        log.debug(f"Depo nesnesi silindi: {digest}")
+
+    def iter_objects(self) -> Iterator[str]:
+        """Depodaki tüm nesne özetleri"""
+        if not os.path.isdir(self.objects_dir):
+            return
+        for first in os.scandir(self.objects_dir):
+            if not first.is_dir():
+                continue
+            for second in os.scandir(first.path):
+                if not second.is_dir():
+                    continue
+                for entry in os.scandir(second.path):
+                    if entry.name.endswith(OBJECT_EXT):
+                        yield entry.name[:-len(OBJECT_EXT)]
+
+    def collect_garbage(self, live: Iterable[str]) -> int:
+        """
+        Referansı olmayan nesneleri sil (ör. yarıda kalan işlemlerden kalanlar).
+        Returns: Silinen nesne sayısı
+        """
+        live_set: Set[str] = set(live)
+        removed = 0
+        for digest in list(self.iter_objects()):
+            if digest not in live_set:
+                self.release(digest)
+                removed += 1
+        return removed
+
+    # ---- Klip kaynak cache'i ----
+
+    def lookup_clip(self, source_key: str) -> Optional[str]:
+        """
+        Aynı kaynaktan daha önce üretilmiş klibin özeti.
+        Nesne silinmişse kayıt düşürülür ve None döner.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM clip_sources WHERE source_key = ?", (source_key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            digest = row[0]
+            with self._conn:
+                if not self.has(digest):
+                    self._conn.execute("DELETE FROM clip_sources WHERE source_key = ?", (source_key,))
+                    return None
+                self._conn.execute(
+                    "UPDATE clip_sources SET last_used_at = ? WHERE source_key = ?",
+                    (time.time(), source_key),
+                )
+            return digest
+
+    def remember_clip(self, source_key: str, digest: str):
+        """Kaynak -> nesne eşlemesini kaydet"""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO clip_sources (source_key, content_hash, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (source_key, digest, now, now),
+                )
@@ -0,0 +1,139 @@
+"""
+Stats Registry - Artımlı bot istatistikleri
+Sayaçlar olay anında O(1) güncellenir (sunucu giriş/çıkış, üye, session aç/kapa);
+/botstatus ve cluster raporu sadece anlık görüntü okur, hiçbir şeyi baştan saymaz.
+Gecikmeler son N ölçümlük pencerede tutulur, yüzdelikler görüntü alınırken hesaplanır.
+"""
+
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from logger_setup import get_logger
+
+log = get_logger('bot.stats_registry')
+
+# Gecikme penceresi başına tutulan son ölçüm sayısı
+DEFAULT_WINDOW = 1024
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Sıralı listede en yakın sıra yöntemiyle yüzdelik (boşsa 0)"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class LatencyWindow:
+    """Son N ölçümün sınırlı penceresi"""
+
+    def __init__(self, size: int = DEFAULT_WINDOW):
+        self._values: Deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, value: float):
+        self._values.append(value)
+        self.count += 1
+
+    def summary(self) -> dict:
+        values = sorted(self._values)
+        return {
+            'count': self.count,
+            'p50': percentile(values, 50),
+            'p99': percentile(values, 99),
+            'max': values[-1] if values else 0.0,
+        }
+
+
+class StatsRegistry:
+    """
+    Sayaçlar (inc/dec), olay anında güncellenen sunucu/üye toplamları,
+    görüntü alınırken okunan O(1) gauge fonksiyonları ve gecikme pencereleri.
+    """
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW):
+        self.window_size = window_size
+        self.started_at = time.time()
+
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._windows: Dict[str, LatencyWindow] = {}
+
+        # guild_id -> son bilinen üye sayısı (toplam kullanıcı sayısı artımlı tutulur)
+        self._guild_members: Dict[int, int] = {}
+        self._user_total = 0
+
+    # ---- Sayaçlar ----
+
+    def inc(self, name: str, amount: int = 1):
+        self._counters[name] = self._counters.get(name, 0) + amount
+
+    def dec(self, name: str, amount: int = 1):
+        self._counters[name] = self._counters.get(name, 0) - amount
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, read: Callable[[], float]):
+        """Görüntüde okunacak değer (sadece O(1) okumalar verin: len(), sayaç alanı vb.)"""
+        self._gauges[name] = read
+
+    def observe(self, name: str, value: float):
+        window = self._windows.get(name)
+        if window is None:
+            window = self._windows[name] = LatencyWindow(self.window_size)
+        window.observe(value)
+
+    # ---- Sunucu / üye toplamları ----
+
+    def guild_added(self, guild_id: int, member_count: Optional[int]):
+        """Sunucu eklendi veya tekrar erişilebilir oldu (aynı sunucu iki kez sayılmaz)"""
+        member_count = member_count or 0
+        self._user_total += member_count - self._guild_members.get(guild_id, 0)
+        self._guild_members[guild_id] = member_count
+
+    def guild_removed(self, guild_id: int):
+        self._user_total -= self._guild_members.pop(guild_id, 0)
+
+    def members_changed(self, guild_id: int, delta: int):
+        if guild_id in self._guild_members:
+            self._guild_members[guild_id] += delta
+            self._user_total += delta
+
+    def reset_guilds(self, guilds):
+        """Tüm sunucuları baştan say (sadece hazır olunduğunda, bir kez)"""
+        self._guild_members = {}
+        self._user_total = 0
+        for guild in guilds:
+            self.guild_added(guild.id, guild.member_count)
+
+    @property
+    def guild_count(self) -> int:
+        return len(self._guild_members)
+
+    @property
+    def user_count(self) -> int:
+        return self._user_total
+
+    # ---- Görüntü ----
+
+    def snapshot(self) -> dict:
+        """Anlık görüntü: sayaçlar, gauge değerleri ve gecikme özetleri"""
+        gauges = {}
+        for name, read in self._gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                log.debug(f"Gauge okunamadı: {name} ({e})")
+                gauges[name] = None
+
+        return {
+            'guilds': self.guild_count,
+            'users': self.user_count,
+            'uptime': time.time() - self.started_at,
+            'counters': dict(self._counters),
+            'gauges': gauges,
+            'latency': {name: window.summary() for name, window in self._windows.items()},
+        }
@@ -0,0 +1,189 @@
+"""
+Storage Layout - DOWNLOADS_DIR dosya düzeni
+Kullanıcı sesleri iki seviyeli hash klasörlerine dağıtılır (sounds/ab/cd/<user_id>.webm);
+geçici dosyalar aynı dosya sistemindeki tmp/ altında tutulur (atomik rename için).
+Yol hesaplaması klasör listelemez - sadece stat yapılır.
+
+Eski düz düzen (<user_id>.webm doğrudan DOWNLOADS_DIR'de) online olarak taşınır:
+her ses önce yeni yerine hardlink'lenir, katalog güncellenir, sonra eski isim silinir.
+Yarıda kesilirse kalan dosyalarla devam eder; bitince işaret dosyası yazılır.
+"""
+
+import hashlib
+import os
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from logger_setup import get_logger
+from packet_file import sidecar_path
+
+log = get_logger('bot.storage_layout')
+
+SOUNDS_DIRNAME = 'sounds'
+TMP_DIRNAME = 'tmp'
+SOUND_EXT = '.webm'
+
+# Düz düzenden taşıma tamamlandı işareti
+LAYOUT_MARKER = '.layout-v2'
+
+# Eski sürümlerin DOWNLOADS_DIR'e bıraktığı geçici dosyalar
+_LEGACY_TEMP_MARKERS = ('_temp.webm', '_temp_input')
+
+
+def _bucket(user_id: int) -> Tuple[str, str]:
+    # Snowflake ID'lerin son haneleri eşit dağılmaz - hash ile dağıt
+    digest = hashlib.sha1(str(user_id).encode()).hexdigest()
+    return digest[:2], digest[2:4]
+
+
+def sound_path(root: str, user_id: int) -> str:
+    """Kullanıcının ses dosyası yolu (yeni düzen)"""
+    first, second = _bucket(user_id)
+    return os.path.join(root, SOUNDS_DIRNAME, first, second, f'{user_id}{SOUND_EXT}')
+
+
+def legacy_sound_path(root: str, user_id: int) -> str:
+    """Düz düzendeki eski yol"""
+    return os.path.join(root, f'{user_id}{SOUND_EXT}')
+
+
+def resolve_sound_path(root: str, user_id: int) -> Optional[str]:
+    """
+    Kullanıcının mevcut ses dosyası (taşıma sürerken eski yere de bakar).
+    Returns: Dosya yoksa None
+    """
+    for path in (sound_path(root, user_id), legacy_sound_path(root, user_id)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def tmp_dir(root: str, *parts: str) -> str:
+    """Geçici dosya klasörü (yoksa oluşturulur)"""
+    path = os.path.join(root, TMP_DIRNAME, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _parse_user_id(name: str) -> Optional[int]:
+    if not name.endswith(SOUND_EXT):
+        return None
+    try:
+        return int(name[:-len(SOUND_EXT)])
+    except ValueError:
+        return None
+
+
+def iter_sound_files(root: str) -> Iterator[Tuple[int, str]]:
+    """
+    Tüm kullanıcı sesleri (user_id, yol) - bakım işleri için, sıcak yolda kullanmayın.
+    Taşıma yarım kaldıysa aynı kullanıcı için yeni düzen tercih edilir.
+    """
+    seen = set()
+    sounds_dir = os.path.join(root, SOUNDS_DIRNAME)
+    if os.path.isdir(sounds_dir):
+        for first in os.scandir(sounds_dir):
+            if not first.is_dir():
+                continue
+            for second in os.scandir(first.path):
+                if not second.is_dir():
+                    continue
+                for entry in os.scandir(second.path):
+                    user_id = _parse_user_id(entry.name)
+                    if user_id is not None:
+                        seen.add(user_id)
+                        yield user_id, entry.path
+
+    for user_id, path in list_legacy_sounds(root):
+        if user_id not in seen:
+            yield user_id, path
+
+
+# ---- Düz düzenden taşıma ----
+
+def is_migrated(root: str) -> bool:
+    return os.path.exists(os.path.join(root, LAYOUT_MARKER))
+
+
+def mark_migrated(root: str):
+    with open(os.path.join(root, LAYOUT_MARKER), 'w') as f:
+        f.write('2\n')
+
+
+def list_legacy_sounds(root: str) -> List[Tuple[int, str]]:
+    """Düz düzende kalan sesler (DOWNLOADS_DIR'in tek seferlik listelenmesi)"""
+    sounds = []
+    if not os.path.isdir(root):
+        return sounds
+    with os.scandir(root) as entries:
+        for entry in entries:
+            user_id = _parse_user_id(entry.name)
+            if user_id is not None and entry.is_file():
+                sounds.append((user_id, entry.path))
+    return sounds
+
+
+def remove_legacy_temp_files(root: str) -> int:
+    """Eski sürümlerin geride bıraktığı <uid>_temp* dosyalarını sil"""
+    removed = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_file() and any(marker in entry.name for marker in _LEGACY_TEMP_MARKERS):
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+
+def adopt_legacy_sound(root: str, user_id: int, legacy_path: str) -> str:
+    """
+    Eski sesi (ve paket dosyasını) yeni yerine hardlink'le; eski isim henüz silinmez.
+    Yeni yerde farklı bir dosya varsa (taşıma sırasında yeni yükleme) o korunur.
+    Returns: Yeni yol
+    """
+    target = sound_path(root, user_id)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    for source, dest in ((sidecar_path(legacy_path), sidecar_path(target)), (legacy_path, target)):
+        if not os.path.exists(source):
+            continue
+        try:
+            os.link(source, dest)
+        except FileExistsError:
+            pass
+    return target
+
+
+def remove_legacy_sound(legacy_path: str):
+    for path in (sidecar_path(legacy_path), legacy_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def migrate_flat_layout(
+    root: str,
+    relocate: Optional[Callable[[int, str, str], None]] = None,
+) -> dict:
+    """
+    Düz düzendeki tüm sesleri yeni düzene taşı (blocking).
+    relocate(user_id, eski_yol, yeni_yol) eski ismi silmeden önce çağrılır (katalog güncellemesi).
+    """
+    result = {'moved': 0, 'failed': 0, 'temp_removed': 0}
+    if is_migrated(root):
+        return result
+
+    for user_id, legacy_path in list_legacy_sounds(root):
+        try:
+            new_path = adopt_legacy_sound(root, user_id, legacy_path)
+            if relocate:
+                relocate(user_id, legacy_path, new_path)
+            remove_legacy_sound(legacy_path)
+            result['moved'] += 1
+        except OSError as e:
+            log.error(f"Ses taşınamadı: {legacy_path} ({e})")
+            result['failed'] += 1
+
+    result['temp_removed'] = remove_legacy_temp_files(root)
+    if result['failed'] == 0:
+        mark_migrated(root)
+    return result
@@ -0,0 +1,8 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modül logger'ları testlerde bot.log'a yazmasın
+from logger_setup import setup_logging  # noqa: E402
+setup_logging(log_file=os.devnull, log_level='ERROR', enable_console=False)
@@ -0,0 +1,28 @@
+import pytest
+
+from cluster import cluster_share, shard_ranges
+
+
+def test_shard_ranges_contiguous_and_even():
+    assert shard_ranges(5, 2) == [[0, 1, 2], [3, 4]]
+    assert shard_ranges(4, 4) == [[0], [1], [2], [3]]
+
+
+def test_shard_ranges_rejects_more_clusters_than_shards():
+    with pytest.raises(ValueError):
+        shard_ranges(2, 3)
+
+
+@pytest.mark.parametrize('total, cluster_count', [(4, 2), (5, 2), (7, 3), (16, 4)])
+def test_cluster_share_splits_host_budget(total, cluster_count):
+    shares = [cluster_share(total, cluster_id, cluster_count) for cluster_id in range(cluster_count)]
+    assert sum(shares) == total
+    assert max(shares) - min(shares) <= 1
+
+
+def test_cluster_share_at_least_one():
+    assert [cluster_share(2, cluster_id, 4) for cluster_id in range(4)] == [1, 1, 1, 1]
+
+
+def test_single_cluster_keeps_full_budget():
+    assert cluster_share(6, 0, 1) == 6
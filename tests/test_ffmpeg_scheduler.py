@@ -0,0 +1,164 @@
+import asyncio
+import threading
+
+import pytest
+
+from ffmpeg_scheduler import FFmpegScheduler, Priority
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_served_by_priority_then_fifo():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_processes=1, playback_reserve=0)
+        await scheduler.acquire(Priority.BATCH)
+        order = []
+
+        async def worker(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+            scheduler.release(priority)
+
+        tasks = [
+            asyncio.create_task(worker(name, priority))
+            for name, priority in (
+                ('batch', Priority.BATCH),
+                ('ingest1', Priority.INGEST),
+                ('playback', Priority.PLAYBACK),
+                ('ingest2', Priority.INGEST),
+            )
+        ]
+        await settle()
+        assert scheduler.waiting == 4
+        scheduler.release(Priority.BATCH)
+        await asyncio.gather(*tasks)
+        return scheduler, order
+
+    scheduler, order = run(scenario())
+    assert order == ['playback', 'ingest1', 'ingest2', 'batch']
+    assert scheduler.active == 0
+    assert scheduler.waiting == 0
+    assert scheduler.stats()['classes']['ingest']['acquired'] == 2
+
+
+def test_playback_reserve_is_not_used_by_ingest():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_processes=2, playback_reserve=1)
+        await scheduler.acquire(Priority.INGEST)
+
+        second_ingest = asyncio.create_task(scheduler.acquire(Priority.INGEST))
+        await settle()
+        assert not second_ingest.done()
+
+        # Ayrılmış slot canlı çalmaya hemen verilir
+        await asyncio.wait_for(scheduler.acquire(Priority.PLAYBACK), 1)
+        assert scheduler.active == 2
+
+        scheduler.release(Priority.PLAYBACK)
+        await settle()
+        assert not second_ingest.done()
+
+        scheduler.release(Priority.INGEST)
+        await second_ingest
+        scheduler.release(Priority.INGEST)
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.active == 0
+    assert scheduler.peak_active == 2
+
+
+def test_reserve_is_capped_below_max_processes():
+    scheduler = FFmpegScheduler(max_processes=1, playback_reserve=5)
+    assert scheduler.playback_reserve == 0
+
+    async def scenario():
+        await asyncio.wait_for(scheduler.acquire(Priority.INGEST), 1)
+        scheduler.release(Priority.INGEST)
+
+    run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_processes=1, playback_reserve=0)
+        await scheduler.acquire(Priority.INGEST)
+
+        cancelled = asyncio.create_task(scheduler.acquire(Priority.INGEST))
+        behind = asyncio.create_task(scheduler.acquire(Priority.BATCH))
+        await settle()
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert scheduler.waiting == 1
+
+        scheduler.release(Priority.INGEST)
+        await behind
+        assert scheduler.active == 1
+        scheduler.release(Priority.BATCH)
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.active == 0
+    assert scheduler.waiting == 0
+
+
+def test_waiter_cancelled_after_grant_releases_slot():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_processes=1, playback_reserve=0)
+        await scheduler.acquire(Priority.INGEST)
+
+        waiter = asyncio.create_task(scheduler.acquire(Priority.INGEST))
+        await settle()
+        # Slot verilir ve task devam etmeden iptal edilir
+        scheduler.release(Priority.INGEST)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return scheduler
+
+    scheduler = run(scenario())
+    assert scheduler.active == 0
+    assert scheduler.waiting == 0
+
+
+def test_release_threadsafe_from_player_thread():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_processes=1, playback_reserve=0)
+        await scheduler.acquire(Priority.PLAYBACK)
+        waiter = asyncio.create_task(scheduler.acquire(Priority.INGEST))
+        await settle()
+
+        thread = threading.Thread(target=scheduler.release_threadsafe, args=(Priority.PLAYBACK,))
+        thread.start()
+        thread.join()
+        await asyncio.wait_for(waiter, 1)
+        assert scheduler.active == 1
+        scheduler.release(Priority.INGEST)
+        return scheduler
+
+    assert run(scenario()).active == 0
+
+
+def test_slot_context_releases_on_error():
+    async def scenario():
+        scheduler = FFmpegScheduler(max_processes=2)
+        with pytest.raises(RuntimeError):
+            async with scheduler.slot(Priority.INGEST):
+                assert scheduler.active == 1
+                raise RuntimeError("ffmpeg çöktü")
+        return scheduler
+
+    assert run(scenario()).active == 0
+
+
+def test_invalid_max_processes():
+    with pytest.raises(ValueError):
+        FFmpegScheduler(max_processes=0)
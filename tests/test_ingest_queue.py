@@ -0,0 +1,72 @@
+import time
+
+from ingest_queue import (
+    ATTACHMENT_EXPIRED_ERROR,
+    FAILED,
+    PENDING,
+    QUEUED,
+    RUNNING,
+    IngestQueue,
+    dedupe_key,
+)
+
+
+async def _noop_installer(user_id: int, clip_path: str):
+    pass
+
+
+def make_queue(tmp_path) -> IngestQueue:
+    return IngestQueue(
+        db_path=str(tmp_path / 'ingest.db'),
+        work_dir=str(tmp_path / 'work'),
+        installer=_noop_installer,
+        ffmpeg_path=lambda: 'ffmpeg',
+    )
+
+
+def add_job(queue: IngestQueue, kind: str, source: str, status: str, user_id: int) -> int:
+    now = time.time()
+    job_id = queue._execute(
+        "INSERT INTO ingest_jobs (dedupe_key, kind, source, filename, start, duration, "
+        "status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (dedupe_key(kind, source, 0.0, 5.0), kind, source, None, 0.0, 5.0, status, now, now),
+    )
+    queue._execute(
+        "INSERT INTO ingest_subscribers (job_id, user_id, status) VALUES (?, ?, ?)",
+        (job_id, user_id, PENDING),
+    )
+    return job_id
+
+
+def job_row(queue: IngestQueue, job_id: int) -> tuple:
+    return queue._conn.execute("SELECT status, error FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+
+
+def test_resume_requeues_url_jobs(tmp_path):
+    queue = make_queue(tmp_path)
+    queue._open_sync()
+    queued = add_job(queue, 'url', 'https://youtu.be/a', QUEUED, 1)
+    running = add_job(queue, 'url', 'https://youtu.be/b', RUNNING, 2)
+    queue._close_sync()
+
+    reopened = make_queue(tmp_path)
+    jobs = reopened._open_sync()
+    assert [(job.id, job.pending_users) for job in jobs] == [(queued, {1}), (running, {2})]
+    assert job_row(reopened, running) == (QUEUED, None)
+    reopened._close_sync()
+
+
+def test_resume_fails_attachment_jobs(tmp_path):
+    queue = make_queue(tmp_path)
+    queue._open_sync()
+    queued = add_job(queue, 'attachment', 'https://cdn.discordapp.com/a.mp3?ex=1', QUEUED, 1)
+    running = add_job(queue, 'attachment', 'https://cdn.discordapp.com/b.mp3?ex=1', RUNNING, 2)
+    url = add_job(queue, 'url', 'https://youtu.be/a', QUEUED, 3)
+    queue._close_sync()
+
+    reopened = make_queue(tmp_path)
+    jobs = reopened._open_sync()
+    assert [job.id for job in jobs] == [url]
+    assert job_row(reopened, queued) == (FAILED, ATTACHMENT_EXPIRED_ERROR)
+    assert job_row(reopened, running) == (FAILED, ATTACHMENT_EXPIRED_ERROR)
+    reopened._close_sync()
@@ -0,0 +1,154 @@
+import logging
+import logging.handlers
+import os
+import queue
+
+import pytest
+
+import logger_setup
+from logger_setup import (
+    DroppingQueueHandler,
+    _QueueListener,
+    dropped_log_records,
+    get_logger,
+    setup_logging,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    yield
+    # conftest'teki sessiz kurulum geri gelsin
+    setup_logging(log_file=os.devnull, log_level='ERROR', enable_console=False)
+
+
+@pytest.fixture
+def paused_listener(monkeypatch):
+    """Listener thread'i başlamasın: kuyruk boşaltılmaz, doluluk deterministik olur"""
+    monkeypatch.setattr(_QueueListener, 'start', lambda self: None)
+    yield
+    # Kapanışta durdurma işareti dolu kuyrukta beklemesin: listener şimdi başlayıp boşaltır
+    listener = logger_setup._bot_logger._listener
+    if listener is not None:
+        logging.handlers.QueueListener.start(listener)
+
+
+def record(level: int) -> logging.LogRecord:
+    return logging.makeLogRecord({
+        'name': 'test', 'levelno': level, 'levelname': logging.getLevelName(level), 'msg': 'x',
+    })
+
+
+def fill(handler: DroppingQueueHandler, level: int, count: int):
+    for _ in range(count):
+        handler.handle(record(level))
+
+
+def test_drop_debug_sheds_debug_at_watermark():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=8), 'drop_debug')
+    assert handler.shed_at == 6
+
+    fill(handler, logging.DEBUG, 6)
+    assert handler.queue.qsize() == 6
+    assert handler.dropped_total == 0
+
+    # %75 doluluk: DEBUG düşer, INFO hâlâ kuyruğa girer
+    fill(handler, logging.DEBUG, 3)
+    fill(handler, logging.INFO, 2)
+    assert handler.queue.qsize() == 8
+    assert handler.dropped == {'DEBUG': 3}
+
+
+def test_drop_info_sheds_info_but_keeps_warnings():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=8), 'drop_info')
+    fill(handler, logging.INFO, 6)
+
+    fill(handler, logging.INFO, 2)
+    fill(handler, logging.WARNING, 2)
+    assert handler.queue.qsize() == 8
+    assert handler.dropped == {'INFO': 2}
+
+
+def test_full_queue_drops_any_level():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=4), 'drop_new')
+    # drop_new eşikte düşürmez: kuyruk tamamen dolar
+    fill(handler, logging.DEBUG, 4)
+    assert handler.queue.qsize() == 4
+    assert handler.dropped_total == 0
+
+    fill(handler, logging.ERROR, 2)
+    fill(handler, logging.DEBUG, 1)
+    assert handler.queue.qsize() == 4
+    assert handler.dropped == {'ERROR': 2, 'DEBUG': 1}
+    assert handler.dropped_total == 3
+
+
+def test_unknown_overflow_policy_rejected():
+    with pytest.raises(ValueError):
+        DroppingQueueHandler(queue.Queue(maxsize=4), 'drop_everything')
+
+
+def test_dropped_log_records_counts_global_queue(tmp_path, paused_listener):
+    bot_logger = setup_logging(
+        log_file=str(tmp_path / 'bot.log'), log_level='DEBUG', enable_console=False,
+        queue_size=8, overflow_policy='drop_debug',
+    )
+    logger = get_logger('test.logger_setup')
+
+    for _ in range(6):
+        logger.info('doluyor')
+    for _ in range(4):
+        logger.debug('eşikte düşer')
+    for _ in range(3):
+        logger.warning('kuyruk dolu')
+
+    assert dropped_log_records() == 5
+    assert bot_logger.stats() == {
+        'queued': 8,
+        'queue_size': 8,
+        'dropped': 5,
+        'dropped_by_level': {'DEBUG': 4, 'WARNING': 1},
+    }
+
+
+def test_dropped_log_records_zero_without_queue(tmp_path):
+    setup_logging(log_file=str(tmp_path / 'bot.log'), enable_console=False)
+    assert dropped_log_records() == 0
+
+
+def test_queue_mode_writes_through_listener(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    setup_logging(log_file=str(log_file), enable_console=False, queue_size=16)
+    get_logger('test.logger_setup').info('kuyruktan yazıldı')
+    logger_setup.shutdown_logging()
+
+    assert 'kuyruktan yazıldı' in log_file.read_text(encoding='utf-8')
+
+
+def test_reconfigure_closes_previous_handlers(tmp_path):
+    first = setup_logging(log_file=str(tmp_path / 'first.log'), enable_console=False)
+    get_logger('test.logger_setup').error('ilk dosya')
+    old_handlers = list(first.handlers)
+    assert any(getattr(h, 'stream', None) is not None for h in old_handlers)
+
+    setup_logging(log_file=str(tmp_path / 'second.log'), enable_console=False)
+    root = logging.getLogger()
+    for handler in old_handlers:
+        assert handler not in root.handlers
+        assert getattr(handler, 'stream', None) is None
+    assert first.handlers == []
+
+    get_logger('test.logger_setup').error('ikinci dosya')
+    assert 'ikinci dosya' not in (tmp_path / 'first.log').read_text(encoding='utf-8')
+
+
+def test_reconfigure_stops_previous_listener(tmp_path):
+    first = setup_logging(log_file=str(tmp_path / 'first.log'), enable_console=False, queue_size=16)
+    listener_thread = first._listener._thread
+    old_queue_handler = first.queue_handler
+
+    setup_logging(log_file=str(tmp_path / 'second.log'), enable_console=False, queue_size=16)
+    assert first._listener is None
+    assert not listener_thread.is_alive()
+    assert old_queue_handler not in logging.getLogger().handlers
+    assert first.handlers == []
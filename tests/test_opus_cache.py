@@ -0,0 +1,145 @@
+import asyncio
+import os
+
+import pytest
+
+from opus_cache import (
+    FRAME_DURATION_US,
+    CachedOpusAudio,
+    DemuxError,
+    OpusPacketCache,
+    demux_webm_file,
+    demux_webm_opus,
+    opus_packet_duration_us,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'tone_500ms.webm')
+
+# 0.5s stereo libopus, 20ms frame: 25 ses frame'i + pre-skip (312 örnek) için bir frame
+FIXTURE_PACKETS = 26
+
+
+def fixture_bytes() -> bytes:
+    with open(FIXTURE, 'rb') as f:
+        return f.read()
+
+
+def test_demux_fixture_packets():
+    frames = demux_webm_file(FIXTURE)
+    assert len(frames) == FIXTURE_PACKETS
+    assert all(opus_packet_duration_us(frame) == FRAME_DURATION_US for frame in frames)
+    assert sum(map(opus_packet_duration_us, frames)) == FIXTURE_PACKETS * FRAME_DURATION_US
+
+
+def test_packet_duration_from_toc():
+    # config 31 (CELT 20ms), code 0: tek frame
+    assert opus_packet_duration_us(bytes([31 << 3])) == 20_000
+    # config 1 (SILK 20ms), code 1: iki frame
+    assert opus_packet_duration_us(bytes([(1 << 3) | 1])) == 40_000
+    # config 16 (CELT 2.5ms), code 3: frame sayısı ikinci byte'ta
+    assert opus_packet_duration_us(bytes([(16 << 3) | 3, 4])) == 10_000
+    assert opus_packet_duration_us(b'') == 0
+
+
+def test_truncated_file_only_raises_demux_error():
+    data = fixture_bytes()
+    for cut in range(0, len(data), 7):
+        try:
+            demux_webm_opus(data[:cut])
+        except DemuxError:
+            pass
+
+
+def test_non_opus_track_rejected():
+    data = fixture_bytes().replace(b'A_OPUS', b'A_VORB')
+    with pytest.raises(DemuxError):
+        demux_webm_opus(data)
+
+
+def test_garbage_rejected():
+    with pytest.raises(DemuxError):
+        demux_webm_opus(b'\x00' * 64)
+
+
+def write(tmp_path, name: str, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_cache_load_and_hit(tmp_path):
+    path = write(tmp_path, 'a.webm', fixture_bytes())
+    cache = OpusPacketCache()
+
+    async def scenario():
+        first = await cache.load(path)
+        second = await cache.load(path)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(first) == FIXTURE_PACKETS
+    assert second is first
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+@pytest.mark.parametrize('data', [
+    fixture_bytes()[:len(fixture_bytes()) // 2],
+    fixture_bytes()[:-1],
+    fixture_bytes().replace(b'A_OPUS', b'A_VORB'),
+    b'not a webm file',
+])
+def test_unsupported_input_falls_back(tmp_path, data):
+    path = write(tmp_path, 'bad.webm', data)
+    cache = OpusPacketCache()
+
+    # Çağıran FFmpeg'e düşer; hata yükselmez ve cache'e bir şey yazılmaz
+    assert asyncio.run(cache.load(path)) is None
+    assert cache.demux_failures == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_missing_file_falls_back(tmp_path):
+    cache = OpusPacketCache()
+    assert asyncio.run(cache.load(str(tmp_path / 'yok.webm'))) is None
+    assert cache.demux_failures == 1
+
+
+def test_cached_audio_source_reads_frames_then_ends():
+    source = CachedOpusAudio((b'a', b'b'))
+    assert source.is_opus()
+    assert [source.read(), source.read(), source.read()] == [b'a', b'b', b'']
+
+
+def test_invalidate_during_load_discards_stale_frames(tmp_path):
+    path = write(tmp_path, 'a.webm', fixture_bytes())
+    cache = OpusPacketCache()
+
+    async def scenario():
+        load = asyncio.create_task(cache.load(path))
+        await asyncio.sleep(0)
+        assert path in cache._pending
+        cache.invalidate(path)
+        frames = await load
+        return frames
+
+    frames = asyncio.run(scenario())
+    # Çağırana döner ama cache'e eski veri yazılmaz
+    assert len(frames) == FIXTURE_PACKETS
+    assert cache.get(path) is None
+    assert cache._generations == {}
+
+
+def test_invalidate_does_not_accumulate_generations(tmp_path):
+    path = write(tmp_path, 'a.webm', fixture_bytes())
+    cache = OpusPacketCache()
+    asyncio.run(cache.load(path))
+
+    cache.invalidate(path)
+    for i in range(1000):
+        cache.invalidate(f'/silinmis/{i}.webm')
+
+    assert cache._generations == {}
+    assert cache.total_bytes == 0
+    assert len(asyncio.run(cache.load(path))) == FIXTURE_PACKETS
+    assert cache.get(path) is not None
@@ -0,0 +1,119 @@
+import os
+import shutil
+import struct
+
+import pytest
+
+from opus_cache import demux_webm_file
+from packet_file import (
+    MmapOpusAudio,
+    PacketFile,
+    PacketFileError,
+    sidecar_path,
+    write_packet_file,
+    write_sidecar,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'tone_500ms.webm')
+
+FRAMES = [bytes([0xFC]) + bytes(range(n % 256)) * 2 for n in (1, 40, 0, 120, 7)]
+
+
+def write_raw(tmp_path, name: str, data: bytes) -> str:
+    path = str(tmp_path / name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def packed(tmp_path, frames=FRAMES) -> bytes:
+    path = str(tmp_path / 'source.opuspk')
+    write_packet_file(path, frames)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_round_trip_frames(tmp_path):
+    path = str(tmp_path / 'sound.opuspk')
+    write_packet_file(path, FRAMES)
+    assert not os.path.exists(f'{path}.tmp')
+
+    pf = PacketFile(path)
+    assert len(pf) == len(FRAMES)
+    views = [pf.frame_view(i) for i in range(len(pf))]
+    assert [v.tobytes() for v in views] == FRAMES
+    for view in views:
+        view.release()
+    pf.close()
+
+
+def test_mmap_audio_source_reads_every_frame(tmp_path):
+    path = str(tmp_path / 'sound.opuspk')
+    write_packet_file(path, FRAMES)
+
+    source = MmapOpusAudio(PacketFile(path))
+    assert source.is_opus()
+    read = []
+    while (frame := source.read()):
+        read.append(frame)
+    source.cleanup()
+
+    assert read == FRAMES
+    assert source.read() == b''
+
+
+def test_sidecar_matches_demux(tmp_path):
+    audio = str(tmp_path / '123.webm')
+    shutil.copyfile(FIXTURE, audio)
+
+    target = write_sidecar(audio)
+    assert target == sidecar_path(audio)
+
+    pf = PacketFile(target)
+    frames = [pf.frame_view(i).tobytes() for i in range(len(pf))]
+    pf.close()
+    assert frames == demux_webm_file(FIXTURE)
+
+
+def test_sidecar_failure_removes_stale_file(tmp_path):
+    audio = write_raw(tmp_path, '123.webm', b'not a webm file')
+    write_packet_file(sidecar_path(audio), FRAMES)
+
+    assert write_sidecar(audio) is None
+    assert not os.path.exists(sidecar_path(audio))
+
+
+@pytest.mark.parametrize('cut', [1, 10, len(FRAMES[-1]) + 1])
+def test_truncated_file_rejected(tmp_path, cut):
+    data = packed(tmp_path)
+    path = write_raw(tmp_path, 'cut.opuspk', data[:-cut])
+    with pytest.raises(PacketFileError):
+        PacketFile(path)
+
+
+def test_trailing_garbage_rejected(tmp_path):
+    path = write_raw(tmp_path, 'long.opuspk', packed(tmp_path) + b'\x00')
+    with pytest.raises(PacketFileError):
+        PacketFile(path)
+
+
+def test_truncated_index_rejected(tmp_path):
+    # header 1000 frame diyor, index ise hiç yok
+    header = struct.pack('<4sBBHI', b'SAPK', 1, 0, 20, 1000)
+    path = write_raw(tmp_path, 'index.opuspk', header + b'\x00' * 8)
+    with pytest.raises(PacketFileError):
+        PacketFile(path)
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'SAPK',
+    struct.pack('<4sBBHI', b'XXXX', 1, 0, 20, 1) + b'\x00' * 8,
+    struct.pack('<4sBBHI', b'SAPK', 2, 0, 20, 1) + b'\x00' * 8,
+    struct.pack('<4sBBHI', b'SAPK', 1, 0, 10, 1) + b'\x00' * 8,
+    struct.pack('<4sBBHI', b'SAPK', 1, 0, 20, 0) + b'\x00' * 4,
+], ids=['empty', 'short-header', 'bad-magic', 'bad-version', 'bad-frame-ms', 'no-frames'])
+def test_corrupt_header_rejected(tmp_path, data):
+    path = write_raw(tmp_path, 'bad.opuspk', data)
+    with pytest.raises(PacketFileError):
+        PacketFile(path)
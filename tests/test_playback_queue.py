@@ -0,0 +1,141 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+from playback_queue import PlaybackQueue, QueuePolicy, QueueStats
+
+
+@dataclass
+class Request:
+    user_id: int
+    max_seconds: Optional[float] = None
+
+
+def make_queue(**policy):
+    dropped = []
+    stats = QueueStats()
+    queue = PlaybackQueue(QueuePolicy(**policy), stats, dropped.append)
+    return queue, stats, dropped
+
+
+def test_dedupe_skips_pending_user():
+    queue, stats, dropped = make_queue()
+    assert queue.put(Request(1))
+    assert not queue.put(Request(1))
+    assert queue.put(Request(2))
+
+    assert [r.user_id for r in queue.drain()] == [1, 2]
+    assert stats.deduped == 1
+    assert stats.enqueued == 2
+    assert dropped == []
+
+
+def test_dedupe_disabled_keeps_duplicates():
+    queue, stats, _ = make_queue(dedupe=False)
+    assert queue.put(Request(1))
+    assert queue.put(Request(1))
+    assert queue.qsize() == 2
+    assert stats.deduped == 0
+
+
+def test_user_can_queue_again_after_being_served():
+    queue, stats, _ = make_queue()
+    queue.put(Request(1))
+    queue.get_nowait()
+    assert queue.put(Request(1))
+    assert stats.deduped == 0
+
+
+def test_storm_shorten_clips_requests_over_threshold():
+    queue, stats, _ = make_queue(storm_threshold=2, storm_mode='shorten', storm_clip_seconds=1.5)
+    requests = [Request(i) for i in range(4)]
+    for request in requests:
+        assert queue.put(request)
+
+    assert [r.max_seconds for r in requests] == [None, None, 1.5, 1.5]
+    assert stats.storm_shortened == 2
+    assert stats.enqueued == 4
+
+
+def test_storm_sample_accepts_every_nth():
+    queue, stats, _ = make_queue(storm_threshold=2, storm_mode='sample', storm_sample_every=3)
+    accepted = [queue.put(Request(i)) for i in range(8)]
+
+    # İlk 2 eşiğin altında; sonra her 3 istekten biri
+    assert accepted == [True, True, False, False, True, False, False, True]
+    assert stats.storm_sampled_out == 4
+    assert stats.enqueued == 4
+    assert [r.max_seconds for r in queue.drain()] == [None] * 4
+
+
+def test_storm_resets_when_queue_empties():
+    queue, stats, _ = make_queue(storm_threshold=1, storm_mode='sample', storm_sample_every=2)
+    queue.put(Request(1))
+    assert not queue.put(Request(2))
+    assert queue.put(Request(3))
+    queue.get_nowait()
+    queue.get_nowait()
+
+    # Yeni fırtına sayacı baştan başlar
+    queue.put(Request(4))
+    assert not queue.put(Request(5))
+    assert stats.storm_sampled_out == 2
+
+
+def test_overflow_drops_oldest_and_notifies():
+    queue, stats, dropped = make_queue(max_size=3, storm_threshold=100)
+    for i in range(5):
+        assert queue.put(Request(i))
+
+    assert [r.user_id for r in dropped] == [0, 1]
+    assert [r.user_id for r in queue.drain()] == [2, 3, 4]
+    assert stats.dropped_overflow == 2
+    assert stats.enqueued == 5
+    assert stats.depth == 0
+
+
+def test_drop_departed_counts_and_notifies():
+    queue, stats, dropped = make_queue()
+    request = Request(7)
+    queue.put(request)
+    served = queue.get_nowait()
+    queue.drop_departed(served)
+
+    assert dropped == [request]
+    assert stats.dropped_departed == 1
+
+
+def test_depth_tracks_put_get_overflow_and_drain():
+    stats = QueueStats()
+    first = PlaybackQueue(QueuePolicy(max_size=2, storm_threshold=100), stats, lambda r: None)
+    second = PlaybackQueue(QueuePolicy(), stats, lambda r: None)
+
+    for i in range(3):
+        first.put(Request(i))
+    second.put(Request(10))
+    assert stats.depth == 3
+
+    first.get_nowait()
+    assert stats.depth == 2
+    second.drain()
+    assert stats.depth == 1
+    assert stats.as_dict()['depth'] == 1
+
+
+def test_get_waits_for_put():
+    async def scenario():
+        queue, _, _ = make_queue()
+        waiter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        queue.put(Request(3))
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()).user_id == 3
+
+
+def test_invalid_storm_mode_rejected():
+    with pytest.raises(ValueError):
+        QueuePolicy(storm_mode='drop')
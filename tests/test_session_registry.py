@@ -0,0 +1,158 @@
+import time
+
+from session_registry import SessionRegistry
+from voice_pool import VoiceSession
+
+
+def make_session(guild_id=1, channel_id=10, last_activity=None):
+    session = VoiceSession(guild_id=guild_id, channel_id=channel_id, user_id=0, voice_client=None)
+    if last_activity is not None:
+        session.last_activity = last_activity
+    return session
+
+
+def keys(sessions):
+    return sorted(s.key for s in sessions)
+
+
+def test_idle_session_expires_only_after_cutoff():
+    registry = SessionRegistry()
+    session = make_session(last_activity=100.0)
+    registry[session.key] = session
+
+    assert registry.pop_expired(99.0) == []
+    assert registry.next_idle_activity() == 100.0
+    assert registry.pop_expired(100.0) == [session]
+    # Kayıt heap'ten çıktı: ikinci kez dönmez, session registry'de kalır
+    assert registry.pop_expired(1e9) == []
+    assert session.key in registry
+
+
+def test_busy_session_never_expires():
+    registry = SessionRegistry()
+    session = make_session(last_activity=100.0)
+    registry[session.key] = session
+    registry.mark_busy(session)
+
+    assert registry.pop_expired(1e9) == []
+    assert registry.next_idle_activity() is None
+
+
+def test_busy_then_idle_uses_new_activity_once():
+    registry = SessionRegistry()
+    session = make_session(last_activity=100.0)
+    registry[session.key] = session
+    registry.mark_busy(session)
+    registry.mark_idle(session)
+
+    # Eski (100.0) kayıt bayat: eski cutoff ile süresi dolmaz
+    assert registry.pop_expired(100.0) == []
+    assert registry.next_idle_activity() == session.last_activity
+    assert registry.pop_expired(time.monotonic()) == [session]
+    assert registry.pop_expired(1e9) == []
+
+
+def test_touch_postpones_expiry():
+    registry = SessionRegistry()
+    session = make_session(last_activity=100.0)
+    registry[session.key] = session
+    registry.touch(session)
+
+    assert registry.pop_expired(100.0) == []
+    assert registry.pop_expired(time.monotonic()) == [session]
+
+
+def test_removed_session_does_not_expire():
+    registry = SessionRegistry()
+    session = make_session(last_activity=100.0)
+    registry[session.key] = session
+    registry.pop(session.key)
+
+    assert registry.next_idle_activity() is None
+    assert registry.pop_expired(1e9) == []
+
+
+def test_readded_key_expires_new_session_only():
+    registry = SessionRegistry()
+    old = make_session(last_activity=100.0)
+    registry[old.key] = old
+    registry.pop(old.key)
+
+    new = make_session(last_activity=100.0)
+    registry[new.key] = new
+    expired = registry.pop_expired(100.0)
+    assert len(expired) == 1 and expired[0] is new
+
+
+def test_replacing_session_under_same_key():
+    registry = SessionRegistry()
+    old = make_session(last_activity=50.0)
+    registry[old.key] = old
+    new = make_session(last_activity=200.0)
+    registry[new.key] = new
+
+    assert registry.pop_expired(100.0) == []
+    assert registry.pop_expired(200.0) == [new]
+    assert registry.guild_count(1) == 1
+
+
+def test_compaction_keeps_current_entries():
+    registry = SessionRegistry()
+    sessions = [make_session(channel_id=c, last_activity=float(c)) for c in range(3)]
+    for session in sessions:
+        registry[session.key] = session
+
+    # Çok sayıda bayat kayıt: heap'ler sıkıştırılmalı
+    for _ in range(200):
+        for session in sessions:
+            registry.mark_busy(session)
+            registry.mark_idle(session)
+    registry.mark_busy(sessions[1])
+
+    assert len(registry._expiry_heap) <= 16 + len(sessions) * 2
+    assert len(registry._idle_heaps[1]) <= 16 + len(sessions) * 2
+    assert keys(registry.pop_expired(time.monotonic())) == [(1, 0), (1, 2)]
+    assert registry.pop_expired(1e9) == []
+
+
+def test_oldest_idle_skips_busy_and_stale():
+    registry = SessionRegistry()
+    first = make_session(channel_id=1, last_activity=10.0)
+    second = make_session(channel_id=2, last_activity=20.0)
+    registry[first.key] = first
+    registry[second.key] = second
+
+    assert registry.oldest_idle(1) is first
+    registry.mark_busy(first)
+    assert registry.oldest_idle(1) is second
+    registry.mark_busy(second)
+    assert registry.oldest_idle(1) is None
+    registry.mark_idle(first)
+    assert registry.oldest_idle(1) is first
+
+
+def test_guild_index_counts():
+    registry = SessionRegistry()
+    for guild_id, channel_id in ((1, 1), (1, 2), (2, 1)):
+        session = make_session(guild_id=guild_id, channel_id=channel_id)
+        registry[session.key] = session
+
+    assert registry.guild_count(1) == 2
+    assert registry.guild_count(2) == 1
+    registry.pop((1, 1))
+    assert registry.guild_count(1) == 1
+    assert [s.key for s in registry.guild_sessions(1)] == [(1, 2)]
+
+
+def test_on_idle_fires_when_expiry_heap_was_empty():
+    calls = []
+    registry = SessionRegistry(on_idle=lambda: calls.append(1))
+    first = make_session(channel_id=1)
+    second = make_session(channel_id=2)
+    registry[first.key] = first
+    registry[second.key] = second
+    assert len(calls) == 1
+
+    registry.pop_expired(1e9)
+    registry.mark_idle(first)
+    assert len(calls) == 2
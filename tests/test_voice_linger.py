@@ -0,0 +1,125 @@
+import pytest
+
+import voice_linger
+from voice_linger import LingerPolicy
+
+KEY = (1, 10)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(voice_linger.time, 'monotonic', clock)
+    return clock
+
+
+def make_policy(**options):
+    # 60s pencere: join sayısı doğrudan join/dakika
+    defaults = dict(
+        base_seconds=15.0, max_seconds=60.0, min_seconds=1.0, rate_window=60.0,
+        high_join_rate=4.0, low_join_rate=1.0, pressure_ratio=0.8,
+    )
+    defaults.update(options)
+    return LingerPolicy(**defaults)
+
+
+def record(policy, clock, count, key=KEY, spacing=1.0):
+    for _ in range(count):
+        policy.record_join(key)
+        clock.now += spacing
+
+
+def test_quiet_channel_uses_base_window(clock):
+    policy = make_policy()
+    assert policy.linger_seconds(KEY) == 15.0
+
+    record(policy, clock, 3)
+    assert policy.join_rate(KEY) == 3.0
+    assert policy.linger_seconds(KEY) == 15.0
+    assert not policy.is_hot(KEY)
+
+
+def test_high_join_rate_makes_channel_hot(clock):
+    policy = make_policy()
+    record(policy, clock, 4)
+
+    # Eşikte: base * (4 / 4) * 2
+    assert policy.linger_seconds(KEY) == 30.0
+    assert policy.is_hot(KEY)
+
+
+def test_hot_window_clamped_to_max(clock):
+    policy = make_policy()
+    record(policy, clock, 20, spacing=0.5)
+
+    assert policy.linger_seconds(KEY) == 60.0
+
+
+def test_hot_window_never_below_base(clock):
+    policy = make_policy(high_join_rate=8.0)
+    record(policy, clock, 8)
+    assert policy.linger_seconds(KEY) == 30.0
+
+    # Hız eşiklerin arasına düştü: sıcak kalır, 15 * (3 / 8) * 2 base'e yükseltilir
+    clock.now += 56.5
+    assert policy.join_rate(KEY) == 3.0
+    assert policy.linger_seconds(KEY) == 15.0
+    assert policy.is_hot(KEY)
+
+
+def test_hysteresis_between_thresholds(clock):
+    policy = make_policy()
+    record(policy, clock, 3)
+    # Eşiğin altından gelen kanal 1 < rate < 4 aralığında soğuk kalır
+    assert policy.linger_seconds(KEY) == 15.0
+    assert not policy.is_hot(KEY)
+
+    record(policy, clock, 1)
+    assert policy.linger_seconds(KEY) == 30.0
+    assert policy.is_hot(KEY)
+
+    # Tek join kalınca (low_join_rate) normale döner
+    clock.now += 58.5
+    assert policy.join_rate(KEY) == 1.0
+    assert policy.linger_seconds(KEY) == 15.0
+    assert not policy.is_hot(KEY)
+
+
+def test_session_pressure_closes_early(clock):
+    policy = make_policy()
+    record(policy, clock, 10)
+
+    assert policy.linger_seconds(KEY, session_pressure=0.79) == 60.0
+    assert policy.linger_seconds(KEY, session_pressure=0.8) == 1.0
+    assert policy.linger_seconds((2, 20), session_pressure=1.5) == 1.0
+
+
+def test_pressure_does_not_reset_hot_state(clock):
+    policy = make_policy()
+    record(policy, clock, 4)
+    assert policy.linger_seconds(KEY) == 30.0
+
+    assert policy.linger_seconds(KEY, session_pressure=0.9) == 1.0
+    assert policy.is_hot(KEY)
+    assert policy.linger_seconds(KEY) == 30.0
+
+
+def test_prune_drops_stale_channels(clock):
+    policy = make_policy()
+    record(policy, clock, 4)
+    policy.linger_seconds(KEY)
+    record(policy, clock, 1, key=(2, 20))
+
+    clock.now += 59.0
+    policy.prune()
+    assert policy.join_rate(KEY) == 0.0
+    assert not policy.is_hot(KEY)
+    assert policy.join_rate((2, 20)) == 1.0
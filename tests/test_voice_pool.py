@@ -0,0 +1,46 @@
+import asyncio
+
+from voice_pool import VoicePool, VoiceSession
+
+
+def make_pool_with_idle_session():
+    pool = VoicePool(bot=None, session_timeout=60.0)
+    session = VoiceSession(guild_id=1, channel_id=10, user_id=0, voice_client=None)
+    session.last_activity = 0.0
+    pool._sessions[session.key] = session
+
+    disconnected = []
+
+    async def disconnect(guild_id, channel_id, force=True):
+        disconnected.append((guild_id, channel_id))
+        pool._sessions.pop((guild_id, channel_id), None)
+
+    pool.disconnect = disconnect
+    return pool, session, disconnected
+
+
+def test_cleanup_disconnects_expired_session_without_worker():
+    async def scenario():
+        pool, session, disconnected = make_pool_with_idle_session()
+        await pool._cleanup_expired_sessions()
+        return session, disconnected
+
+    session, disconnected = asyncio.run(scenario())
+    assert disconnected == [session.key]
+
+
+def test_cleanup_skips_session_of_lingering_worker():
+    async def scenario():
+        pool, session, disconnected = make_pool_with_idle_session()
+        # Linger penceresinde bekleyen kuyruk worker'ı
+        worker = asyncio.create_task(asyncio.sleep(3600))
+        pool._queue_workers[session.key] = worker
+        await pool._cleanup_expired_sessions()
+        worker.cancel()
+        return pool, session, disconnected
+
+    pool, session, disconnected = asyncio.run(scenario())
+    assert disconnected == []
+    assert session.key in pool._sessions
+    # Kayıt heap'ten çıktı: cleanup döngüsü aynı session için dönüp durmaz
+    assert pool._sessions.next_idle_activity() is None
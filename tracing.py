@@ -0,0 +1,284 @@
+"""
+Tracing - Join başına aşama (span) izleme
+Her join bir trace id alır; gateway olayı → kuyruk → bağlantı → kaynak hazırlığı → çalma
+aşamaları span olarak kaydedilir. Biten trace'ler örneklenir (yavaş olanlar her zaman
+tutulur) ve arka planda dönen (rotating) bir JSONL dosyasına yazılır.
+Span ekleme sadece listeye bir tuple eklemektir; dosya yazımı event loop'u bloklamaz.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from logger_setup import get_logger
+from stats_registry import percentile
+
+log = get_logger('bot.tracing')
+
+# Yazılmayı bekleyen en fazla trace (disk yavaşsa en eskiler düşer)
+MAX_PENDING = 10_000
+
+# Arka plan yazıcısının toplu yazma aralığı (saniye)
+FLUSH_INTERVAL = 1.0
+
+
+class NullTrace:
+    """Trace kapalıyken kullanılan boş trace (çağıranlar kontrol yapmadan çağırır)"""
+
+    trace_id = None
+
+    def add_span(self, name: str, start: float, end: float, **attrs):
+        pass
+
+    def span(self, name: str, **attrs):
+        return nullcontext()
+
+    def set(self, **attrs):
+        pass
+
+    def finish(self, outcome: str = 'ok'):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class JoinTrace:
+    """Tek bir join'in span'leri (zamanlar time.monotonic)"""
+
+    __slots__ = ('tracer', 'trace_id', 'started', 'wall_started', 'attrs', 'spans', 'finished')
+
+    def __init__(self, tracer: 'Tracer', started: float, **attrs):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started = started
+        self.wall_started = time.time() - (time.monotonic() - started)
+        self.attrs = attrs
+        self.spans: List[Tuple[str, float, float, Optional[dict]]] = []
+        self.finished = False
+
+    def add_span(self, name: str, start: float, end: float, **attrs):
+        self.spans.append((name, start, end, attrs or None))
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, time.monotonic(), attrs or None))
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self, outcome: str = 'ok'):
+        """Trace'i kapat (sadece ilk çağrı geçerli) ve örneklenirse yazıcıya ver"""
+        if self.finished:
+            return
+        self.finished = True
+        self.tracer._finish(self, outcome, time.monotonic())
+
+    def to_record(self, outcome: str, ended: float) -> dict:
+        base = self.started
+        spans = []
+        for name, start, end, attrs in sorted(self.spans, key=lambda s: s[1]):
+            span = {
+                'name': name,
+                'start_ms': round((start - base) * 1000, 2),
+                'duration_ms': round((end - start) * 1000, 2),
+            }
+            if attrs:
+                span.update(attrs)
+            spans.append(span)
+        return {
+            'trace_id': self.trace_id,
+            'ts': round(self.wall_started, 3),
+            'outcome': outcome,
+            'duration_ms': round((ended - base) * 1000, 2),
+            **self.attrs,
+            'spans': spans,
+        }
+
+
+class Tracer:
+    """
+    Trace üretici ve arka plan JSONL yazıcısı.
+    sample_rate oranında trace tutulur; slow_ms'den uzun sürenler örneklemeden bağımsız yazılır.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: float = 0.0,
+        slow_ms: float = 3000.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._pending: Deque[str] = deque(maxlen=MAX_PENDING)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # İstatistikler
+        self.started = 0
+        self.written = 0
+        self.sampled_out = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        # Örnekleme 0 ise tracing tamamen kapalı (yavaş trace'ler de yazılmaz)
+        return self.sample_rate > 0
+
+    def start_trace(self, started: Optional[float] = None, **attrs):
+        """Yeni join trace'i (kapalıysa NULL_TRACE)"""
+        if not self.enabled or self._task is None:
+            return NULL_TRACE
+        self.started += 1
+        return JoinTrace(self, started if started is not None else time.monotonic(), **attrs)
+
+    def _finish(self, trace: JoinTrace, outcome: str, ended: float):
+        duration_ms = (ended - trace.started) * 1000
+        slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+        if not slow and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(json.dumps(trace.to_record(outcome, ended), ensure_ascii=False))
+        self._wakeup.set()
+
+    # ---- Arka plan yazıcısı ----
+
+    def start(self):
+        if not self.enabled:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._writer_loop())
+            log.info(
+                f"Join tracing açık: {self.path} "
+                f"(örnekleme %{self.sample_rate * 100:g}, yavaş eşiği {self.slow_ms:.0f}ms)"
+            )
+
+    async def close(self):
+        """Yazıcıyı durdur ve bekleyenleri yaz"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self._flush()
+
+    async def _writer_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                log.error(f"Trace yazma hatası: {e}")
+            # Toplu yazım: bir saniye içinde biten trace'ler tek seferde yazılır
+            await asyncio.sleep(FLUSH_INTERVAL)
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        lines = list(self._pending)
+        self._pending.clear()
+        await asyncio.to_thread(self._write_lines, lines)
+        self.written += len(lines)
+
+    def _write_lines(self, lines: List[str]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.max_bytes > 0 and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def _rotate(self):
+        # traces.jsonl -> .1 -> .2 ... (RotatingFileHandler ile aynı isimlendirme)
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.path}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def stats(self) -> dict:
+        return {
+            'started': self.started,
+            'written': self.written,
+            'sampled_out': self.sampled_out,
+            'dropped': self.dropped,
+            'pending': len(self._pending),
+        }
+
+
+# ---- Özet (manage.py trace-summary) ----
+
+def trace_files(path: str) -> List[str]:
+    """Ana dosya ve döndürülmüş kopyaları (eskiden yeniye)"""
+    files = []
+    i = 1
+    while os.path.exists(f'{path}.{i}'):
+        files.append(f'{path}.{i}')
+        i += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def iter_traces(path: str) -> Iterator[dict]:
+    for file in trace_files(path):
+        with open(file, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Kapanışta yarım kalmış satır
+                    continue
+
+
+def summarize(traces) -> Dict[str, dict]:
+    """Aşama -> süre yüzdelikleri (ms); 'total' tüm join süresidir"""
+    durations: Dict[str, List[float]] = {}
+    outcomes: Dict[str, int] = {}
+    for trace in traces:
+        outcome = trace.get('outcome', '?')
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        durations.setdefault('total', []).append(trace['duration_ms'])
+        for span in trace.get('spans', ()):
+            durations.setdefault(span['name'], []).append(span['duration_ms'])
+
+    summary = {}
+    for name, values in durations.items():
+        values.sort()
+        summary[name] = {
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p90': percentile(values, 90),
+            'p99': percentile(values, 99),
+            'max': values[-1],
+        }
+    return {'stages': summary, 'outcomes': outcomes}
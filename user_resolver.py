@@ -0,0 +1,206 @@
+"""
+User Resolver - Kullanıcı adı çözümleme servisi
+Üye cache'i -> TTL'li LRU -> gateway toplu sorgu -> REST (sınırlı eşzamanlılık) sırasıyla dener.
+Silinmiş kullanıcılar negatif olarak cache'lenir, aynı kullanıcı için eşzamanlı
+istekler tek çağrıda birleştirilir, 429 yanıtında Retry-After kadar beklenir.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from logger_setup import get_logger
+
+log = get_logger('bot.user_resolver')
+
+# guild.query_members tek istekte en fazla 100 kullanıcı kabul eder
+QUERY_BATCH_SIZE = 100
+
+# 429 sonrası tekrar deneme sayısı
+MAX_RATE_LIMIT_RETRIES = 3
+
+_MISSING = object()
+
+
+def _retry_after(error: discord.HTTPException) -> float:
+    """429 yanıtının bekleme süresi (saniye)"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    for name in ('Retry-After', 'X-RateLimit-Reset-After'):
+        try:
+            return max(float(headers[name]), 0.1)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return 1.0
+
+
+class UserResolver:
+    """
+    user_id -> görünen ad çözümleyici (tüm komutlar ortak kullanır).
+    Cache'te None değeri "kullanıcı yok" (negatif cache) demektir.
+    """
+
+    def __init__(
+        self,
+        client: discord.Client,
+        max_size: int = 10_000,
+        ttl: float = 3600.0,
+        negative_ttl: float = 600.0,
+        max_concurrency: int = 2,
+    ):
+        self.client = client
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        # user_id -> (son geçerlilik zamanı, ad veya None)
+        self._cache: 'OrderedDict[int, Tuple[float, Optional[str]]]' = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # 429 alınınca tüm REST istekleri bu zamana kadar bekler
+        self._blocked_until = 0.0
+
+        # İstatistikler
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.rate_limited = 0
+
+    # ---- Cache ----
+
+    def _get_cached(self, user_id: int):
+        item = self._cache.get(user_id)
+        if item is None:
+            return _MISSING
+        expires_at, name = item
+        if expires_at <= time.monotonic():
+            del self._cache[user_id]
+            return _MISSING
+        self._cache.move_to_end(user_id)
+        return name
+
+    def _store(self, user_id: int, name: Optional[str]):
+        ttl = self.ttl if name is not None else self.negative_ttl
+        self._cache[user_id] = (time.monotonic() + ttl, name)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id, None)
+
+    # ---- Çözümleme ----
+
+    async def display_name(self, user_id: int, guild: Optional[discord.Guild] = None) -> Optional[str]:
+        """Tek kullanıcının adı (bulunamazsa None)"""
+        return (await self.display_names([user_id], guild))[user_id]
+
+    async def display_names(
+        self,
+        user_ids: Iterable[int],
+        guild: Optional[discord.Guild] = None,
+    ) -> Dict[int, Optional[str]]:
+        """
+        Birden fazla kullanıcının adı.
+        guild verilirse önce üye cache'i ve gateway toplu sorgusu kullanılır (REST yok).
+        """
+        names: Dict[int, Optional[str]] = {}
+        pending: List[int] = []
+
+        for user_id in dict.fromkeys(user_ids):
+            member = guild.get_member(user_id) if guild else None
+            if member is not None:
+                names[user_id] = member.display_name
+                continue
+            cached = self._get_cached(user_id)
+            if cached is not _MISSING:
+                self.hits += 1
+                names[user_id] = cached
+                continue
+            user = self.client.get_user(user_id)
+            if user is not None:
+                self._store(user_id, user.display_name)
+                names[user_id] = user.display_name
+                continue
+            self.misses += 1
+            pending.append(user_id)
+
+        if pending and guild is not None:
+            found = await self._query_members(guild, pending)
+            names.update(found)
+            pending = [uid for uid in pending if uid not in found]
+
+        if pending:
+            results = await asyncio.gather(*(self._fetch_coalesced(uid) for uid in pending))
+            names.update(zip(pending, results))
+
+        return names
+
+    async def _query_members(self, guild: discord.Guild, user_ids: List[int]) -> Dict[int, str]:
+        """Üye cache'inde olmayanları gateway üzerinden 100'lük gruplarla sor"""
+        found: Dict[int, str] = {}
+        for i in range(0, len(user_ids), QUERY_BATCH_SIZE):
+            batch = user_ids[i:i + QUERY_BATCH_SIZE]
+            try:
+                members = await guild.query_members(user_ids=batch, cache=True)
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                # Members intent yok veya gateway meşgul - REST'e düş
+                log.debug(f"query_members başarısız: {e}")
+                break
+            for member in members:
+                self._store(member.id, member.display_name)
+                found[member.id] = member.display_name
+        return found
+
+    async def _fetch_coalesced(self, user_id: int) -> Optional[str]:
+        """Aynı kullanıcı için devam eden REST isteği varsa onu bekle"""
+        future = self._inflight.get(user_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(user_id))
+            self._inflight[user_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        return await asyncio.shield(future)
+
+    async def _fetch(self, user_id: int) -> Optional[str]:
+        async with self._semaphore:
+            for _ in range(MAX_RATE_LIMIT_RETRIES + 1):
+                wait = self._blocked_until - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                self.fetches += 1
+                try:
+                    user = await self.client.fetch_user(user_id)
+                except discord.NotFound:
+                    # Silinmiş kullanıcı - kısa süreli negatif cache
+                    self._store(user_id, None)
+                    return None
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        log.warning(f"Kullanıcı çözümlenemedi: {user_id} ({e})")
+                        return None
+                    retry_after = _retry_after(e)
+                    self.rate_limited += 1
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                    log.warning(f"fetch_user rate limit: {retry_after:.1f}s bekleniyor")
+                    continue
+
+                self._store(user_id, user.display_name)
+                return user.display_name
+
+        return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'cached': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'fetches': self.fetches,
+            'rate_limited': self.rate_limited,
+        }
@@ -0,0 +1,167 @@
+"""
+Voice Fleet - Birden fazla bot kimliği ile gerçek çoklu kanal desteği
+Discord'da bir bot kullanıcısı sunucu başına tek voice bağlantısı tutabilir;
+fleet modunda her kanal, o sunucuda boşta olan bir worker bot'a atanır
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import discord
+
+from logger_setup import get_logger
+
+log = get_logger('bot.voice_fleet')
+
+
+@dataclass
+class VoiceWorker:
+    """Fleet'teki tek bir bot kimliği ve tuttuğu voice bağlantıları"""
+    name: str
+    client: discord.Client
+    token: Optional[str] = None  # None ise client dışarıda yönetilir (ana bot)
+
+    # guild_id -> channel_id (worker sunucu başına tek kanalda olabilir)
+    channels: Dict[int, int] = field(default_factory=dict)
+    total_connects: int = 0
+
+    @property
+    def load(self) -> int:
+        """Worker'ın tuttuğu aktif voice bağlantısı sayısı"""
+        return len(self.channels)
+
+    def is_ready(self) -> bool:
+        return self.client.is_ready()
+
+    def in_guild(self, guild_id: int) -> bool:
+        """Worker bu sunucuya ekli mi?"""
+        return self.client.get_guild(guild_id) is not None
+
+    def is_free_in(self, guild_id: int) -> bool:
+        """Worker bu sunucuda yeni bir kanala bağlanabilir mi?"""
+        return guild_id not in self.channels and self.is_ready() and self.in_guild(guild_id)
+
+
+class VoiceFleet:
+    """
+    Worker bot havuzu.
+    Her (guild_id, channel_id) isteği o sunucuda boşta olan en az yüklü worker'a yönlendirilir.
+    """
+
+    def __init__(self, workers: Sequence[VoiceWorker]):
+        if not workers:
+            raise ValueError("Fleet en az bir worker içermeli")
+        self.workers: List[VoiceWorker] = list(workers)
+        self._tasks: List[asyncio.Task] = []
+
+        # İstatistikler
+        self.acquire_misses = 0
+
+    @classmethod
+    def from_tokens(
+        cls,
+        primary: discord.Client,
+        tokens: Sequence[str],
+        intents: discord.Intents,
+        shard_ids: Optional[List[int]] = None,
+        shard_count: Optional[int] = None,
+    ) -> 'VoiceFleet':
+        """
+        Ana bot + ek token'lardan fleet oluştur (ana bot ilk worker'dır).
+        Cluster modunda worker'lar da sadece bu cluster'ın shard'larına bağlanır.
+        """
+        workers = [VoiceWorker(name='primary', client=primary)]
+        for index, token in enumerate(tokens, start=1):
+            if shard_count is not None:
+                client = discord.AutoShardedClient(intents=intents, shard_ids=shard_ids, shard_count=shard_count)
+            else:
+                client = discord.Client(intents=intents)
+            workers.append(VoiceWorker(name=f'worker-{index}', client=client, token=token))
+        return cls(workers)
+
+    async def start(self):
+        """Ek worker client'larını arka planda başlat (ana bot kendi başlar)"""
+        for worker in self.workers:
+            if worker.token is None:
+                continue
+            task = asyncio.create_task(self._run_worker(worker))
+            self._tasks.append(task)
+        log.info(f"Voice fleet başlatıldı: {len(self.workers)} worker")
+
+    async def _run_worker(self, worker: VoiceWorker):
+        try:
+            await worker.client.start(worker.token)
+        except asyncio.CancelledError:
+            raise
+        except discord.LoginFailure:
+            log.error(f"Fleet worker token geçersiz: {worker.name}")
+        except Exception as e:
+            log.error(f"Fleet worker durdu: {worker.name} ({e})", exc_info=True)
+
+    async def close(self):
+        """Ek worker client'larını kapat"""
+        for worker in self.workers:
+            if worker.token is not None and not worker.client.is_closed():
+                try:
+                    await worker.client.close()
+                except Exception as e:
+                    log.error(f"Fleet worker kapatılamadı: {worker.name} ({e})")
+
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks.clear()
+
+    def guild_capacity(self, guild_id: int) -> int:
+        """Bu sunucuda eşzamanlı tutulabilecek kanal sayısı"""
+        return sum(1 for w in self.workers if w.is_ready() and w.in_guild(guild_id))
+
+    def acquire(self, guild_id: int, channel_id: int) -> Optional[VoiceWorker]:
+        """
+        Kanal için worker ayır.
+        Returns: Sunucuda boşta worker yoksa None
+        """
+        free = [w for w in self.workers if w.is_free_in(guild_id)]
+        if not free:
+            self.acquire_misses += 1
+            return None
+
+        # En az yüklü worker; eşitlikte listedeki sıra (ana bot önce)
+        worker = min(free, key=lambda w: w.load)
+        worker.channels[guild_id] = channel_id
+        worker.total_connects += 1
+        return worker
+
+    def release(self, worker: VoiceWorker, guild_id: int):
+        """Worker'ın bu sunucudaki kanal atamasını bırak"""
+        worker.channels.pop(guild_id, None)
+
+    @staticmethod
+    def resolve_channel(
+        worker: VoiceWorker,
+        channel: discord.VoiceChannel,
+    ) -> Optional[discord.VoiceChannel]:
+        """Kanalın worker client'ının cache'indeki karşılığı (connect o nesne üzerinden yapılmalı)"""
+        resolved = worker.client.get_channel(channel.id)
+        if resolved is None or not hasattr(resolved, 'connect'):
+            return None
+        return resolved
+
+    def stats(self) -> List[dict]:
+        """Worker bazlı yük istatistikleri"""
+        return [
+            {
+                'name': w.name,
+                'ready': w.is_ready(),
+                'guilds': len(w.client.guilds) if w.is_ready() else 0,
+                'load': w.load,
+                'total_connects': w.total_connects,
+            }
+            for w in self.workers
+        ]
@@ -0,0 +1,97 @@
+"""
+Voice Linger - Boşta kalan voice bağlantılarının ne kadar açık tutulacağına karar verir
+Yoğun kanallarda bağlantı sıcak tutulur, boş kanal veya global limit baskısında erken kapanır
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Set, Tuple
+
+ChannelKey = Tuple[int, int]
+
+
+class LingerPolicy:
+    """
+    Histerezisli adaptif linger politikası.
+    Kanal join hızı high_join_rate'i geçince "sıcak" olur ve uzun pencere kullanır;
+    ancak low_join_rate'in altına düşünce normale döner (eşikte gidip gelmeyi önler).
+    """
+
+    def __init__(
+        self,
+        base_seconds: float = 15.0,
+        max_seconds: float = 60.0,
+        min_seconds: float = 1.0,
+        rate_window: float = 300.0,
+        high_join_rate: float = 4.0,
+        low_join_rate: float = 1.0,
+        pressure_ratio: float = 0.8,
+    ):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.min_seconds = min_seconds
+        self.rate_window = rate_window
+        self.high_join_rate = high_join_rate  # join/dakika
+        self.low_join_rate = low_join_rate    # join/dakika
+        self.pressure_ratio = pressure_ratio
+
+        # Kanal bazlı son join zamanları (monotonic)
+        self._joins: Dict[ChannelKey, Deque[float]] = defaultdict(deque)
+        # Yüksek join hızı nedeniyle uzun pencere kullanan kanallar
+        self._hot: Set[ChannelKey] = set()
+
+    def record_join(self, key: ChannelKey):
+        """Kanala yeni bir join kaydet"""
+        now = time.monotonic()
+        joins = self._joins[key]
+        joins.append(now)
+        self._trim(joins, now)
+
+    def _trim(self, joins: Deque[float], now: float):
+        cutoff = now - self.rate_window
+        while joins and joins[0] < cutoff:
+            joins.popleft()
+
+    def join_rate(self, key: ChannelKey) -> float:
+        """Kanalın son pencere içindeki join hızı (join/dakika)"""
+        joins = self._joins.get(key)
+        if not joins:
+            return 0.0
+        self._trim(joins, time.monotonic())
+        return len(joins) * 60.0 / self.rate_window
+
+    def linger_seconds(self, key: ChannelKey, session_pressure: float = 0.0) -> float:
+        """
+        Boşta kalan bağlantının açık tutulacağı süre.
+        session_pressure: aktif session / global session bütçesi (0.0 - 1.0+)
+        """
+        if session_pressure >= self.pressure_ratio:
+            return self.min_seconds
+
+        rate = self.join_rate(key)
+        if key in self._hot:
+            if rate <= self.low_join_rate:
+                self._hot.discard(key)
+        elif rate >= self.high_join_rate:
+            self._hot.add(key)
+
+        if key not in self._hot:
+            return self.base_seconds
+
+        # Sıcak kanalda pencere join hızıyla orantılı uzar
+        stretched = self.base_seconds * (rate / self.high_join_rate) * 2
+        return min(self.max_seconds, max(self.base_seconds, stretched))
+
+    def is_hot(self, key: ChannelKey) -> bool:
+        """Kanal uzun linger penceresinde mi?"""
+        return key in self._hot
+
+    def prune(self):
+        """Pencere dışına düşmüş kanal kayıtlarını temizle"""
+        now = time.monotonic()
+        for key in list(self._joins.keys()):
+            joins = self._joins[key]
+            self._trim(joins, now)
+            if not joins:
+                del self._joins[key]
+                self._hot.discard(key)
@@ -4,17 +4,38 @@ Her sunucuda birden fazla ses kanalına eşzamanlı bağlantı desteği
 """
 
 import asyncio
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Optional, Tuple, Set
-from collections import defaultdict
+from typing import Callable, Deque, Dict, Optional, Tuple, Set
+from collections import defaultdict, deque
 
 import discord
 
 from logger_setup import get_logger
+from opus_cache import OpusPacketCache, CachedOpusAudio
+from packet_file import PacketFile, PacketFileError, MmapOpusAudio, sidecar_path
+from voice_linger import LingerPolicy
+from playback_queue import PlaybackQueue, QueuePolicy, QueueStats
+from audio_mixer import MixingAudioSource
+from session_registry import SessionRegistry
+from voice_fleet import VoiceFleet, VoiceWorker
+from ffmpeg_scheduler import FFmpegScheduler, Priority
+from stats_registry import StatsRegistry
+from tracing import NULL_TRACE
+from metrics import CONNECT_ATTEMPTS, CONNECT_SECONDS, FFMPEG_SPAWN, JOIN_TO_PLAY, PLAYBACK_TIMEOUTS, QUEUE_WAIT
 
 log = get_logger('bot.voice_pool')
 
+# Linger sırasında kanal boşluğu / session baskısının yeniden kontrol aralığı (saniye)
+LINGER_CHECK_INTERVAL = 5.0
+
+# Idle session yokken cleanup döngüsünün linger istatistiklerini budama aralığı (saniye)
+CLEANUP_MAX_SLEEP = 30.0
+
+# FFmpeg kaynaklarında bağlantı beklenirken önceden okunacak frame sayısı
+PREBUFFER_FRAMES = 5
+
 
 @dataclass
 class VoiceSession:
@@ -25,6 +46,8 @@ class VoiceSession:
     voice_client: discord.VoiceClient
     started_at: datetime = field(default_factory=datetime.now)
     is_playing: bool = False
+    last_activity: float = field(default_factory=time.monotonic)
+    worker: Optional[VoiceWorker] = None  # Fleet modunda bağlantıyı tutan bot kimliği
     
     @property
     def key(self) -> Tuple[int, int]:
@@ -44,6 +67,79 @@ class PlaybackRequest:
     user_id: int
     ffmpeg_path: str
     ffmpeg_options: str = '-vn -b:a 96k'
+    enqueued_at: float = field(default_factory=time.monotonic)
+    
+    # Join fırtınasında kuyruk tarafından kısaltılan maksimum süre (saniye)
+    max_seconds: Optional[float] = None
+    
+    # Kuyruğa eklenir eklenmez başlayan kaynak hazırlığı (bağlantı ile paralel)
+    prepare_task: Optional[asyncio.Task] = field(default=None, repr=False, compare=False)
+    prepare_started: float = 0.0
+    prepare_finished: float = 0.0
+    
+    # Join trace'i (tracing kapalıysa NULL_TRACE - çağıranlar kontrol yapmaz)
+    trace: object = field(default=NULL_TRACE, repr=False, compare=False)
+
+
+@dataclass
+class JoinTiming:
+    """Tek bir join için bağlantı / kaynak hazırlığı zamanlaması (ms)"""
+    connect_ms: float
+    prepare_ms: float
+    overlap_ms: float
+    join_to_play_ms: float
+
+
+class PrebufferedAudio(discord.AudioSource):
+    """İlk frame'leri önceden okunmuş audio source (FFmpeg başlangıç gecikmesini gizler)"""
+    
+    def __init__(self, source: discord.AudioSource, on_cleanup: Optional[Callable[[], None]] = None):
+        self._source = source
+        self._buffer: Deque[bytes] = deque()
+        self._on_cleanup = on_cleanup
+    
+    def prebuffer(self, frames: int):
+        """İlk frame'leri oku (blocking - thread'de çağırın)"""
+        for _ in range(frames):
+            data = self._source.read()
+            if not data:
+                break
+            self._buffer.append(data)
+    
+    def read(self) -> bytes:
+        if self._buffer:
+            return self._buffer.popleft()
+        return self._source.read()
+    
+    def is_opus(self) -> bool:
+        return self._source.is_opus()
+    
+    def cleanup(self):
+        self._source.cleanup()
+        # FFmpeg slotunu bir kez bırak (cleanup birden fazla çağrılabilir)
+        callback, self._on_cleanup = self._on_cleanup, None
+        if callback:
+            callback()
+
+
+class LimitedAudio(discord.AudioSource):
+    """Kaynağı belirli sayıda 20ms frame'den sonra kesen audio source"""
+    
+    def __init__(self, source: discord.AudioSource, max_frames: int):
+        self._source = source
+        self._remaining = max_frames
+    
+    def read(self) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        self._remaining -= 1
+        return self._source.read()
+    
+    def is_opus(self) -> bool:
+        return self._source.is_opus()
+    
+    def cleanup(self):
+        self._source.cleanup()
 
 
 class VoicePool:
@@ -59,15 +155,44 @@ class VoicePool:
         session_timeout: float = 60.0,
         connection_timeout: float = 15.0,
         max_retries: int = 3,
+        opus_cache_max_bytes: int = 64 * 1024 * 1024,
+        max_total_sessions: int = 100,
+        linger_policy: Optional[LingerPolicy] = None,
+        queue_policy: Optional[QueuePolicy] = None,
+        mixer_enabled: bool = False,
+        mixer_max_voices: int = 4,
+        fleet: Optional[VoiceFleet] = None,
+        ffmpeg_scheduler: Optional[FFmpegScheduler] = None,
+        stats: Optional[StatsRegistry] = None,
     ):
         self.bot = bot
         self.max_sessions_per_guild = max_sessions_per_guild
         self.session_timeout = session_timeout
         self.connection_timeout = connection_timeout
         self.max_retries = max_retries
+        self.max_total_sessions = max_total_sessions
+        
+        # Fleet modu: her kanal sunucuda boşta olan bir worker bot ile bağlanır
+        self.fleet = fleet
+        
+        # FFmpeg fallback süreçleri global bütçeden PLAYBACK önceliğiyle slot alır
+        self.ffmpeg_scheduler = ffmpeg_scheduler
+        
+        # Boşta kalan bağlantıların açık tutulma politikası
+        self.linger_policy = linger_policy or LingerPolicy()
+        
+        # Artımlı istatistikler (session aç/kapa sayaçları, join gecikmeleri)
+        self.stats = stats or StatsRegistry()
+        
+        # Join geldiğinde sıcak bağlantı bulundu mu? (linger penceresini ayarlamak için)
+        self.connect_reuse_hits = 0
+        self.connect_reuse_misses = 0
         
         # Aktif sessionlar: (guild_id, channel_id) -> VoiceSession
-        self._sessions: Dict[Tuple[int, int], VoiceSession] = {}
+        # Guild indeksi ve idle heap ile - sayım O(1), eviction O(log n)
+        # Heap boşken yeni idle session gelirse uyuyan cleanup döngüsü uyandırılır
+        self._expiry_wakeup = asyncio.Event()
+        self._sessions = SessionRegistry(on_idle=self._expiry_wakeup.set)
         
         # Channel bazlı lock - aynı kanala paralel bağlantı önleme
         self._channel_locks: Dict[Tuple[int, int], asyncio.Lock] = defaultdict(asyncio.Lock)
@@ -76,9 +201,22 @@ class VoicePool:
         self._active_playbacks: Set[Tuple[int, int]] = set()
         
         # Kanal bazlı playback kuyruğu ve worker task'ları
-        self._playback_queues: Dict[Tuple[int, int], asyncio.Queue] = {}
+        self.queue_policy = queue_policy or QueuePolicy()
+        self.queue_stats = QueueStats()
+        self._playback_queues: Dict[Tuple[int, int], PlaybackQueue] = {}
+        
+        # Mixer modu: kanal başına tek bir canlı karışım, sesler sıra beklemeden eklenir
+        self.mixer_enabled = mixer_enabled
+        self.mixer_max_voices = mixer_max_voices
+        self._mixers: Dict[Tuple[int, int], MixingAudioSource] = {}
         self._queue_workers: Dict[Tuple[int, int], asyncio.Task] = {}
         
+        # Demux edilmiş Opus paket cache'i - FFmpeg spawn etmeden çalma
+        self.packet_cache = OpusPacketCache(max_bytes=opus_cache_max_bytes)
+        
+        # Son join'lerin bağlantı/hazırlık zamanlamaları
+        self.join_timings: Deque[JoinTiming] = deque(maxlen=1000)
+        
         # Cleanup task
         self._cleanup_task: Optional[asyncio.Task] = None
     
@@ -89,24 +227,45 @@ class VoicePool:
             log.info("Cleanup task başlatıldı")
     
     async def _cleanup_loop(self):
-        """Periyodik olarak expired sessionları temizle"""
+        """Sıradaki session deadline'ına kadar uyu, süresi dolanları temizle"""
+        last_prune = time.monotonic()
         while True:
             try:
-                await asyncio.sleep(30)  # Her 30 saniyede bir kontrol
+                self._expiry_wakeup.clear()
                 await self._cleanup_expired_sessions()
+                
+                now = time.monotonic()
+                if now - last_prune >= CLEANUP_MAX_SLEEP:
+                    self.linger_policy.prune()
+                    last_prune = now
+                
+                # En eski idle session'ın deadline'ı - yenileri her zaman daha geç dolar
+                oldest = self._sessions.next_idle_activity()
+                delay = CLEANUP_MAX_SLEEP
+                if oldest is not None:
+                    delay = min(delay, max(0.0, oldest + self.session_timeout - now))
+                
+                try:
+                    await asyncio.wait_for(self._expiry_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 log.error(f"Cleanup loop hatası: {e}", exc_info=True)
     
     async def _cleanup_expired_sessions(self):
-        """Süresi dolmuş sessionları temizle"""
+        """
+        Son aktivitesinden bu yana session_timeout geçmiş idle sessionları temizle.
+        Kuyruk worker'ı çalışan kanallar atlanır: linger penceresi session_timeout'tan
+        uzun olabilir ve bağlantıyı worker kendisi kapatır.
+        """
+        cutoff = time.monotonic() - self.session_timeout
         expired = []
-        
-        for key, session in self._sessions.items():
-            # Session timeout kontrolü
-            if session.age_seconds > self.session_timeout and not session.is_playing:
-                expired.append(key)
+        for session in self._sessions.pop_expired(cutoff):
+            worker = self._queue_workers.get(session.key)
+            if worker is None or worker.done():
+                expired.append(session.key)
         
         for key in expired:
             try:
@@ -121,7 +280,7 @@ class VoicePool:
     
     def get_guild_sessions(self, guild_id: int) -> list[VoiceSession]:
         """Bir sunucudaki tüm sessionları al"""
-        return [s for s in self._sessions.values() if s.guild_id == guild_id]
+        return self._sessions.guild_sessions(guild_id)
     
     def is_playing(self, guild_id: int, channel_id: int) -> bool:
         """Belirli bir kanalda ses çalınıyor mu?"""
@@ -129,12 +288,29 @@ class VoicePool:
     
     def guild_session_count(self, guild_id: int) -> int:
         """Bir sunucudaki aktif session sayısı"""
-        return len(self.get_guild_sessions(guild_id))
+        return self._sessions.guild_count(guild_id)
+    
+    @property
+    def session_pressure(self) -> float:
+        """Global session bütçesinin doluluk oranı"""
+        if self.max_total_sessions <= 0:
+            return 0.0
+        return len(self._sessions) / self.max_total_sessions
+    
+    def connect_stats(self) -> dict:
+        """Sıcak bağlantı kullanım istatistikleri"""
+        total = self.connect_reuse_hits + self.connect_reuse_misses
+        return {
+            'reuse_hits': self.connect_reuse_hits,
+            'reuse_misses': self.connect_reuse_misses,
+            'reuse_rate': self.connect_reuse_hits / total if total else 0.0,
+        }
     
     async def connect(
         self,
         channel: discord.VoiceChannel,
         user_id: int,
+        trace=NULL_TRACE,
     ) -> Optional[VoiceSession]:
         """
         Ses kanalına bağlan veya mevcut bağlantıyı kullan.
@@ -145,12 +321,20 @@ class VoicePool:
         key = (guild_id, channel_id)
         
         # Channel bazlı lock al
+        lock_started = time.monotonic()
         async with self._channel_locks[key]:
+            trace.add_span('lock_wait', lock_started, time.monotonic())
+            
             # Mevcut session var mı kontrol et
             existing = self._sessions.get(key)
             if existing and existing.voice_client.is_connected():
                 log.debug(f"Mevcut session kullanılıyor: {channel.name}")
+                self._sessions.touch(existing)
+                trace.set(reused_connection=True)
                 return existing
+            if existing and existing.worker and self.fleet:
+                # Bağlantısı kopmuş eski session'ın worker'ını serbest bırak
+                self.fleet.release(existing.worker, guild_id)
             
             # Guild session limiti kontrolü
             if self.guild_session_count(guild_id) >= self.max_sessions_per_guild:
@@ -158,10 +342,27 @@ class VoicePool:
                 # En eski idle session'ı kapat
                 await self._evict_oldest_session(guild_id)
             
+            worker = None
+            connect_channel = channel
+            if self.fleet:
+                worker = await self._acquire_worker(guild_id, channel_id)
+                if worker is None:
+                    log.warning(f"Fleet: sunucuda boşta worker yok: guild={guild_id}")
+                    return None
+                connect_channel = self.fleet.resolve_channel(worker, channel)
+                if connect_channel is None:
+                    log.warning(f"Fleet: worker kanalı göremiyor: {worker.name}, channel={channel_id}")
+                    self.fleet.release(worker, guild_id)
+                    return None
+            
             # Yeni bağlantı oluştur
-            voice_client = await self._connect_with_retry(channel)
+            trace.set(reused_connection=False)
+            with trace.span('handshake'):
+                voice_client = await self._connect_with_retry(connect_channel)
             
             if voice_client is None:
+                if worker:
+                    self.fleet.release(worker, guild_id)
                 return None
             
             # Session oluştur
@@ -170,9 +371,11 @@ class VoicePool:
                 channel_id=channel_id,
                 user_id=user_id,
                 voice_client=voice_client,
+                worker=worker,
             )
             
             self._sessions[key] = session
+            self.stats.inc('sessions_opened')
             log.info(
                 f"Yeni voice session oluşturuldu: {channel.name}",
                 extra={'guild_id': guild_id, 'channel_id': channel_id, 'user_id': user_id}
@@ -186,6 +389,7 @@ class VoicePool:
     ) -> Optional[discord.VoiceClient]:
         """Retry desteği ile ses kanalına bağlan"""
         last_error = None
+        started = time.monotonic()
         
         for attempt in range(1, self.max_retries + 1):
             try:
@@ -197,6 +401,7 @@ class VoicePool:
                 )
                 
                 log.info(f"Ses kanalına bağlandı: {channel.name}")
+                self._record_connect(started, attempt, 'ok')
                 return voice_client
                 
             except asyncio.TimeoutError as e:
@@ -208,6 +413,7 @@ class VoicePool:
                 if "Already connected" in str(e):
                     existing_vc = channel.guild.voice_client
                     if existing_vc and existing_vc.channel.id == channel.id:
+                        self._record_connect(started, attempt, 'ok')
                         return existing_vc
                 log.warning(f"Client exception (deneme {attempt}): {e}")
                 last_error = e
@@ -222,18 +428,27 @@ class VoicePool:
                 await asyncio.sleep(delay)
         
         log.error(f"Bağlantı başarısız: {channel.name}, son hata: {last_error}")
+        self._record_connect(started, self.max_retries, 'failed')
         return None
     
+    @staticmethod
+    def _record_connect(started: float, attempts: int, result: str):
+        CONNECT_SECONDS.labels(result).observe(time.monotonic() - started)
+        CONNECT_ATTEMPTS.observe(attempts)
+    
+    async def _acquire_worker(self, guild_id: int, channel_id: int) -> Optional[VoiceWorker]:
+        """Fleet'ten worker ayır; hepsi doluysa sunucudaki en eski idle session'ı kapatıp tekrar dene"""
+        worker = self.fleet.acquire(guild_id, channel_id)
+        if worker is None and self._sessions.oldest_idle(guild_id):
+            await self._evict_oldest_session(guild_id)
+            worker = self.fleet.acquire(guild_id, channel_id)
+        return worker
+    
     async def _evict_oldest_session(self, guild_id: int):
-        """En eski idle session'ı kapat"""
-        guild_sessions = self.get_guild_sessions(guild_id)
+        """En uzun süredir boşta olan session'ı kapat"""
+        oldest = self._sessions.oldest_idle(guild_id)
         
-        # Oynatma yapmayanları bul ve yaşa göre sırala
-        idle_sessions = [s for s in guild_sessions if not s.is_playing]
-        idle_sessions.sort(key=lambda s: s.started_at)
-        
-        if idle_sessions:
-            oldest = idle_sessions[0]
+        if oldest:
             await self.disconnect(oldest.guild_id, oldest.channel_id)
             log.info(f"Eski session kapatıldı (limit aşımı): channel={oldest.channel_id}")
     
@@ -243,6 +458,7 @@ class VoicePool:
         channel_id: int,
         audio_source: discord.AudioSource,
         wait_for_completion: bool = True,
+        trace=NULL_TRACE,
     ) -> bool:
         """
         Belirtilen kanalda ses çal.
@@ -253,39 +469,53 @@ class VoicePool:
         
         if not session or not session.voice_client.is_connected():
             log.warning(f"Ses çalınamadı: Session bulunamadı veya bağlı değil")
+            trace.finish('not_connected')
             return False
         
         if key in self._active_playbacks:
             log.debug(f"Zaten ses çalınıyor: channel={channel_id}")
+            trace.finish('busy')
             return False
         
+        outcome = 'error'
+        
         try:
             self._active_playbacks.add(key)
-            session.is_playing = True
+            self._sessions.mark_busy(session)
             
             # Playback completion event
             playback_done = asyncio.Event()
             playback_error: Optional[Exception] = None
+            playback_finished: Optional[float] = None
+            loop = asyncio.get_running_loop()
             
             def after_playing(error):
-                nonlocal playback_error
+                # Player thread'inden çağrılır - event loop'a thread-safe bildir
+                nonlocal playback_error, playback_finished
+                playback_finished = time.monotonic()
                 if error:
                     playback_error = error
                     log.error(f"Ses çalma hatası: {error}")
                 else:
                     log.debug("Ses başarıyla çalındı")
-                playback_done.set()
+                loop.call_soon_threadsafe(playback_done.set)
             
             # Ses çal
+            play_started = time.monotonic()
             session.voice_client.play(audio_source, after=after_playing)
+            outcome = 'started'
             
             if wait_for_completion:
                 # Tamamlanmasını bekle (max 30 saniye)
                 try:
                     await asyncio.wait_for(playback_done.wait(), timeout=30.0)
+                    outcome = 'played' if playback_error is None else 'error'
                 except asyncio.TimeoutError:
                     log.warning("Ses çalma timeout")
+                    PLAYBACK_TIMEOUTS.inc()
+                    outcome = 'timeout'
                     session.voice_client.stop()
+                trace.add_span('playback', play_started, playback_finished or time.monotonic())
             
             return playback_error is None
             
@@ -295,7 +525,8 @@ class VoicePool:
             
         finally:
             self._active_playbacks.discard(key)
-            session.is_playing = False
+            self._sessions.mark_idle(session)
+            trace.finish(outcome)
     
     async def enqueue_playback(
         self,
@@ -307,12 +538,32 @@ class VoicePool:
         Worker yoksa otomatik başlatır. Aynı kanala gelen istekler sırayla çalınır.
         """
         key = (channel.guild.id, channel.id)
+        enqueue_started = time.monotonic()
+        
+        # Sıcak bağlantı istatistiği ve join hızı
+        session = self._sessions.get(key)
+        if session and session.voice_client.is_connected():
+            self.connect_reuse_hits += 1
+        else:
+            self.connect_reuse_misses += 1
+        self.linger_policy.record_join(key)
         
         # Kuyruk yoksa oluştur
-        if key not in self._playback_queues:
-            self._playback_queues[key] = asyncio.Queue()
+        queue = self._playback_queues.get(key)
+        if queue is None:
+            queue = PlaybackQueue(self.queue_policy, self.queue_stats, on_drop=self._discard_request)
+            self._playback_queues[key] = queue
+        
+        # Politika isteği reddettiyse (tekrar / örnekleme dışı) hiçbir şey hazırlama
+        accepted = queue.put(request)
+        request.trace.add_span('enqueue', enqueue_started, time.monotonic(), queue_depth=queue.qsize())
+        if not accepted:
+            request.trace.finish('rejected')
+            return
         
-        self._playback_queues[key].put_nowait(request)
+        # Kaynak hazırlığını hemen başlat - worker bağlanırken paralel ilerler
+        if request.prepare_task is None:
+            request.prepare_task = asyncio.create_task(self._prepare_source(request))
         
         # Worker yoksa veya bitti ise başlat
         worker = self._queue_workers.get(key)
@@ -326,70 +577,358 @@ class VoicePool:
         channel: discord.VoiceChannel,
         key: Tuple[int, int],
     ) -> None:
-        """Kanal için kuyruk worker'i: bağlan → sırayla çal → boşsa disconnect"""
+        """Kanal için kuyruk worker'i: bağlan → sırayla çal → linger süresi boyunca bekle → disconnect"""
         guild_id, channel_id = key
         queue = self._playback_queues.get(key)
         if not queue:
             return
         
         try:
-            # Kanala bağlan
-            session = await self.connect(channel, 0)
-            if not session:
-                log.error(f"Queue worker: kanala bağlanılamadı: {channel.name}")
-                return
-            
             while True:
-                try:
-                    # Kuyruktan isteğı al (1sn timeout - eleman yoksa disconnect)
-                    request: PlaybackRequest = await asyncio.wait_for(
-                        queue.get(), timeout=1.0
-                    )
-                except asyncio.TimeoutError:
-                    # Kuyruk boş, disconnect
+                request = await self._wait_next_request(channel, key, queue)
+                if request is None:
+                    # Linger süresi doldu veya kanal boşaldı
                     break
+                trace = request.trace
+                dequeued = time.monotonic()
+                QUEUE_WAIT.observe(dequeued - request.enqueued_at)
+                trace.add_span('queue_wait', request.enqueued_at, dequeued)
                 
-                # Ses kaynağı oluştur ve çal
+                # Kanala bağlan (linger sırasında bağlantı korunduysa mevcut session döner)
+                # Kaynak hazırlığı enqueue sırasında başladı, bu sürede paralel ilerler
+                connect_started = time.monotonic()
+                session = await self.connect(channel, 0, trace=trace)
+                connect_finished = time.monotonic()
+                trace.add_span('connect', connect_started, connect_finished)
+                if not session:
+                    log.error(f"Queue worker: kanala bağlanılamadı: {channel.name}")
+                    self._discard_request(request, 'connect_failed')
+                    return
+                
+                # Hazırlanan ses kaynağını al ve çal
                 try:
-                    audio_source = discord.FFmpegOpusAudio(
-                        request.audio_file,
-                        executable=request.ffmpeg_path,
-                        options=request.ffmpeg_options,
-                    )
-                    await self.play_audio(
-                        guild_id=guild_id,
-                        channel_id=channel_id,
-                        audio_source=audio_source,
-                        wait_for_completion=True,
-                    )
+                    with trace.span('source_wait'):
+                        audio_source = await self._take_prepared_source(request)
+                    trace.add_span('prepare', request.prepare_started, request.prepare_finished)
+                    if self.mixer_enabled:
+                        await self._mix_audio(session, audio_source)
+                        self._record_join_timing(request, connect_started, connect_finished)
+                        trace.finish('mixed')
+                    else:
+                        self._record_join_timing(request, connect_started, connect_finished)
+                        await self.play_audio(
+                            guild_id=guild_id,
+                            channel_id=channel_id,
+                            audio_source=audio_source,
+                            wait_for_completion=True,
+                            trace=trace,
+                        )
                 except Exception as e:
                     log.error(f"Queue worker playback hatası: {e}", exc_info=True)
+                    trace.finish('error')
         
         except asyncio.CancelledError:
             log.debug(f"Queue worker iptal edildi: channel={channel_id}")
         except Exception as e:
             log.error(f"Queue worker hatası: {e}", exc_info=True)
         finally:
+            # Çalınmayacak isteklerin hazırlanmış kaynaklarını bırak
+            for pending in queue.drain():
+                self._discard_request(pending)
+            
             # Disconnect ve temizlik
             await self.disconnect(guild_id, channel_id)
             self._playback_queues.pop(key, None)
             self._queue_workers.pop(key, None)
     
+    async def _wait_next_request(
+        self,
+        channel: discord.VoiceChannel,
+        key: Tuple[int, int],
+        queue: PlaybackQueue,
+    ) -> Optional[PlaybackRequest]:
+        """
+        Kuyruktaki sonraki isteği bekle; kanaldan ayrılmış kullanıcıların isteklerini atla.
+        Linger süresi dolarsa, kanal boşalırsa veya session bütçesi sıkışırsa None döner.
+        """
+        idle_since = time.monotonic()
+        while True:
+            if queue.empty():
+                if key in self._active_playbacks:
+                    # Mixer hâlâ çalıyor - linger süresi çalma bitince başlar
+                    idle_since = time.monotonic()
+                
+                if self._channel_is_empty(channel):
+                    log.debug(f"Kanal boş, bağlantı erken kapatılıyor: {channel.name}")
+                    return None
+                
+                linger = self.linger_policy.linger_seconds(key, self.session_pressure)
+                remaining = idle_since + linger - time.monotonic()
+                if remaining <= 0:
+                    return None
+                
+                try:
+                    request = await asyncio.wait_for(
+                        queue.get(), timeout=min(remaining, LINGER_CHECK_INTERVAL)
+                    )
+                except asyncio.TimeoutError:
+                    continue
+            else:
+                request = queue.get_nowait()
+            
+            if self.queue_policy.drop_departed and not self._member_in_channel(channel, request.user_id):
+                log.debug(f"Kullanıcı kanaldan ayrılmış, ses atlandı: user={request.user_id}")
+                queue.drop_departed(request)
+                continue
+            
+            return request
+    
+    async def _mix_audio(self, session: VoiceSession, audio_source: discord.AudioSource):
+        """Sesi kanalın canlı mixer'ına ekle; mixer yoksa veya kapandıysa yenisini başlat"""
+        key = session.key
+        try:
+            while True:
+                mixer = self._mixers.get(key)
+                
+                if mixer is not None and not mixer.closed:
+                    if mixer.add(audio_source):
+                        return
+                    # Eşzamanlı ses limiti dolu - bir ses bitene kadar bekle
+                    await mixer.wait_for_slot()
+                    continue
+                
+                # Önceki mixer'ın player'ı kapanana kadar bekle
+                if mixer is not None:
+                    await mixer.finished.wait()
+                    continue
+                
+                mixer = MixingAudioSource(asyncio.get_running_loop(), max_voices=self.mixer_max_voices)
+                mixer.add(audio_source)
+                self._start_mixer(session, mixer)
+                return
+        except BaseException:
+            audio_source.cleanup()
+            raise
+    
+    def _start_mixer(self, session: VoiceSession, mixer: MixingAudioSource):
+        """Mixer'ı voice client'ta çalmaya başla"""
+        key = session.key
+        loop = asyncio.get_running_loop()
+        
+        def after_playing(error):
+            # Player thread'inden çağrılır
+            if error:
+                log.error(f"Mixer çalma hatası: {error}")
+            loop.call_soon_threadsafe(self._on_mixer_finished, key, mixer)
+        
+        self._mixers[key] = mixer
+        self._active_playbacks.add(key)
+        self._sessions.mark_busy(session)
+        try:
+            session.voice_client.play(mixer, after=after_playing)
+        except Exception:
+            self._on_mixer_finished(key, mixer)
+            raise
+    
+    def _on_mixer_finished(self, key: Tuple[int, int], mixer: MixingAudioSource):
+        """Mixer'ın player'ı durdu - kanal tekrar boşta"""
+        mixer.finished.set()
+        if self._mixers.get(key) is mixer:
+            del self._mixers[key]
+            self._active_playbacks.discard(key)
+            session = self._sessions.get(key)
+            if session:
+                self._sessions.mark_idle(session)
+    
+    @staticmethod
+    def _member_in_channel(channel: discord.VoiceChannel, user_id: int) -> bool:
+        """Kullanıcı hâlâ kanalda mı?"""
+        return any(m.id == user_id for m in channel.members)
+    
+    def _channel_is_empty(self, channel: discord.VoiceChannel) -> bool:
+        """Kanalda bot olmayan üye kaldı mı?"""
+        return not any(not m.bot for m in channel.members)
+    
+    async def _prepare_source(self, request: PlaybackRequest) -> discord.AudioSource:
+        """Ses kaynağını hazırla; fırtınada kısaltılmış isteklerde süreyi sınırla"""
+        request.prepare_started = time.monotonic()
+        try:
+            source = await self._select_source(request)
+        finally:
+            request.prepare_finished = time.monotonic()
+        
+        if request.max_seconds is not None:
+            source = LimitedAudio(source, max_frames=int(request.max_seconds * 50))
+        return source
+    
+    async def _select_source(self, request: PlaybackRequest) -> discord.AudioSource:
+        """
+        Ses kaynağı seç ve çalmaya hazırla: RAM cache → mmap paket dosyası → WebM demux → FFmpeg.
+        İlk üçü FFmpeg process'i başlatmadan hazır Opus paketlerini çalar.
+        """
+        frames = self.packet_cache.get(request.audio_file)
+        if frames is not None:
+            request.trace.set(source='ram_cache')
+            return CachedOpusAudio(frames)
+        
+        packet_file = await asyncio.to_thread(self._open_packet_file, request.audio_file)
+        if packet_file is not None:
+            request.trace.set(source='packet_file')
+            return MmapOpusAudio(packet_file)
+        
+        frames = await self.packet_cache.load(request.audio_file)
+        if frames is not None:
+            request.trace.set(source='demux')
+            return CachedOpusAudio(frames)
+        
+        request.trace.set(source='ffmpeg')
+        
+        # Global FFmpeg bütçesinden slot al; slot kaynak kapanınca (player thread'inde) bırakılır
+        release = None
+        if self.ffmpeg_scheduler:
+            with request.trace.span('ffmpeg_slot_wait'):
+                await self.ffmpeg_scheduler.acquire(Priority.PLAYBACK)
+            release = lambda: self.ffmpeg_scheduler.release_threadsafe(Priority.PLAYBACK)
+        
+        # FFmpeg başlatma ve ilk frame'ler thread'de; iptal edilirse process sızmasın
+        spawn_started = time.monotonic()
+        future = asyncio.ensure_future(asyncio.to_thread(self._open_ffmpeg_source, request, release))
+        try:
+            source = await asyncio.shield(future)
+            spawn_finished = time.monotonic()
+            FFMPEG_SPAWN.observe(spawn_finished - spawn_started)
+            request.trace.add_span('ffmpeg_spawn', spawn_started, spawn_finished)
+            return source
+        except asyncio.CancelledError:
+            future.add_done_callback(self._cleanup_source_future)
+            raise
+    
+    @staticmethod
+    def _open_ffmpeg_source(
+        request: PlaybackRequest,
+        on_cleanup: Optional[Callable[[], None]] = None,
+    ) -> discord.AudioSource:
+        """FFmpeg kaynağını başlat ve ilk frame'leri önceden oku (blocking)"""
+        try:
+            ffmpeg_source = discord.FFmpegOpusAudio(
+                request.audio_file,
+                executable=request.ffmpeg_path,
+                options=request.ffmpeg_options,
+            )
+        except Exception:
+            if on_cleanup:
+                on_cleanup()
+            raise
+        source = PrebufferedAudio(ffmpeg_source, on_cleanup=on_cleanup)
+        try:
+            source.prebuffer(PREBUFFER_FRAMES)
+        except Exception:
+            source.cleanup()
+            raise
+        return source
+    
+    @staticmethod
+    def _cleanup_source_future(future: asyncio.Future):
+        """İptal edilmiş hazırlığın kaynağını kapat"""
+        if not future.cancelled() and future.exception() is None:
+            future.result().cleanup()
+    
+    async def _take_prepared_source(self, request: PlaybackRequest) -> discord.AudioSource:
+        """İsteğin hazırlanmış kaynağını al (hazırlık başlamadıysa şimdi başlat)"""
+        if request.prepare_task is None:
+            request.prepare_task = asyncio.create_task(self._prepare_source(request))
+        return await request.prepare_task
+    
+    def _discard_request(self, request: PlaybackRequest, outcome: str = 'dropped'):
+        """Çalınmayacak isteğin hazırlığını iptal et / kaynağını kapat"""
+        request.trace.finish(outcome)
+        task = request.prepare_task
+        if task is None:
+            return
+        if task.done():
+            self._cleanup_source_future(task)
+        else:
+            task.cancel()
+    
+    def _record_join_timing(
+        self,
+        request: PlaybackRequest,
+        connect_started: float,
+        connect_finished: float,
+    ):
+        """Bağlantı ile kaynak hazırlığının ne kadar örtüştüğünü kaydet"""
+        now = time.monotonic()
+        overlap = (
+            min(connect_finished, request.prepare_finished)
+            - max(connect_started, request.prepare_started)
+        )
+        timing = JoinTiming(
+            connect_ms=(connect_finished - connect_started) * 1000,
+            prepare_ms=(request.prepare_finished - request.prepare_started) * 1000,
+            overlap_ms=max(0.0, overlap) * 1000,
+            join_to_play_ms=(now - request.enqueued_at) * 1000,
+        )
+        self.join_timings.append(timing)
+        self.stats.observe('connect_ms', timing.connect_ms)
+        self.stats.observe('join_to_play_ms', timing.join_to_play_ms)
+        JOIN_TO_PLAY.observe(now - request.enqueued_at)
+        log.debug(
+            f"Join zamanlaması: connect={timing.connect_ms:.0f}ms "
+            f"prepare={timing.prepare_ms:.0f}ms overlap={timing.overlap_ms:.0f}ms "
+            f"join→play={timing.join_to_play_ms:.0f}ms",
+            extra={'user_id': request.user_id},
+        )
+    
+    def timing_stats(self) -> dict:
+        """Son join'lerin ortalama zamanlamaları (ms)"""
+        count = len(self.join_timings)
+        if not count:
+            return {'count': 0}
+        return {
+            'count': count,
+            'avg_connect_ms': sum(t.connect_ms for t in self.join_timings) / count,
+            'avg_prepare_ms': sum(t.prepare_ms for t in self.join_timings) / count,
+            'avg_overlap_ms': sum(t.overlap_ms for t in self.join_timings) / count,
+            'avg_join_to_play_ms': sum(t.join_to_play_ms for t in self.join_timings) / count,
+        }
+    
+    @staticmethod
+    def _open_packet_file(audio_file: str) -> Optional[PacketFile]:
+        """Ses dosyasının paket dosyasını mmap ile aç (yoksa None)"""
+        try:
+            packet_file = PacketFile(sidecar_path(audio_file))
+            packet_file.prefetch()
+            return packet_file
+        except FileNotFoundError:
+            return None
+        except (OSError, PacketFileError) as e:
+            log.warning(f"Paket dosyası açılamadı: {e}")
+            return None
+    
+    def invalidate_audio(self, audio_file: str):
+        """Ses dosyası değiştiğinde/silindiğinde paket cache'ini temizle"""
+        self.packet_cache.invalidate(audio_file)
+    
     async def disconnect(self, guild_id: int, channel_id: int, force: bool = True):
         """Belirtilen kanaldan bağlantıyı kes"""
         key = (guild_id, channel_id)
         session = self._sessions.pop(key, None)
         
         if session:
+            self.stats.inc('sessions_closed')
             try:
                 if session.voice_client.is_connected():
                     await session.voice_client.disconnect(force=force)
                 log.info(f"Ses kanalından ayrıldı: guild={guild_id}, channel={channel_id}")
             except Exception as e:
                 log.error(f"Disconnect hatası: {e}")
+            finally:
+                if session.worker and self.fleet:
+                    self.fleet.release(session.worker, guild_id)
         
         self._active_playbacks.discard(key)
         self._channel_locks.pop(key, None)
+        self._mixers.pop(key, None)
     
     async def disconnect_guild(self, guild_id: int):
         """Bir sunucudaki tüm bağlantıları kes"""
@@ -433,6 +972,7 @@ class VoicePool:
         self._sessions.clear()
         self._active_playbacks.clear()
         self._channel_locks.clear()
+        self.packet_cache.clear()
         log.info("Voice cleanup tamamlandı")
     
     @property
@@ -444,3 +984,13 @@ class VoicePool:
     def total_playing(self) -> int:
         """Toplam ses çalan session sayısı"""
         return len(self._active_playbacks)
+    
+    @property
+    def max_queue_depth(self) -> int:
+        """En kalabalık kanal kuyruğundaki bekleyen istek (kanal sayısıyla orantılı - sadece metrik okumada)"""
+        return max((q.qsize() for q in self._playback_queues.values()), default=0)
+    
+    @property
+    def queued_channels(self) -> int:
+        """Kuyruğu (worker'ı) olan kanal sayısı"""
+        return len(self._playback_queues)